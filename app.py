@@ -142,7 +142,7 @@ if submitted and user_input and user_input.strip():
     # Get assistant response with conversation history
     with st.spinner("🤔 Thinking..."):
         try:
-            answer = rag.query(user_input.strip(), chat_history=st.session_state['chat_messages'][:-1])
+            answer = rag.query(user_input.strip(), chat_history=st.session_state['chat_messages'][:-1]).answer
         except Exception as e:
             answer = f"Sorry, I encountered an error: {e}"
     
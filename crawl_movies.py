@@ -9,9 +9,12 @@ import os
 from typing import List, Dict
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct, VectorParams, Distance
-from sentence_transformers import SentenceTransformer
 from neo4j import GraphDatabase
 from tqdm import tqdm
+from src.config import Config
+from src.llm_service import GeminiService
+from src.graph_db import Neo4jService, apply_schema
+from src.vector_db import QdrantService, ensure_payload_indexes
 
 # ==========================================
 # CẤU HÌNH
@@ -40,16 +43,19 @@ PROCESSED_FILE = 'processed_movie_ids.log'
 print("⏳ Đang khởi tạo kết nối...")
 
 q_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-embed_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+llm = GeminiService()
 
 if not q_client.collection_exists(COLLECTION_NAME):
     q_client.create_collection(
         collection_name=COLLECTION_NAME,
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+        vectors_config=VectorParams(size=Config.VECTOR_SIZE, distance=Distance.COSINE),
     )
     print(f"✅ Đã tạo collection '{COLLECTION_NAME}'")
+ensure_payload_indexes(q_client, COLLECTION_NAME, QdrantService.PAYLOAD_INDEXES)
 
 n_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+schema = apply_schema(n_driver, Neo4jService.FULLTEXT_INDEXES)
+print(f"✅ Neo4j schema: {len(schema['online'])} indexes online, {len(schema['pending'])} populating")
 
 # ==========================================
 # HÀM XỬ LÝ
@@ -114,18 +120,25 @@ def push_to_qdrant(batch_data: List[Dict]):
         return
     
     texts = [item['text_embed'] for item in batch_data]
-    vectors = embed_model.encode(texts, show_progress_bar=False)
+    vectors = llm.get_embeddings(texts)
     
     points = []
-    for i, item in enumerate(batch_data):
+    for item, vector in zip(batch_data, vectors):
+        if not vector:
+            print(f"   ⚠️ [Qdrant] Bỏ qua phim {item['tmdb_id']} (không tạo được vector).")
+            continue
         payload = {k: v for k, v in item.items() if k != 'text_embed'}
+        # Integer year for the payload index behind the structured search filters
+        payload['year'] = QdrantService.payload_year(item.get('year'))
         
         points.append(PointStruct(
             id=item['tmdb_id'],
-            vector=vectors[i].tolist(),
+            vector=vector,
             payload=payload
         ))
     
+    if not points:
+        return
     q_client.upsert(collection_name=COLLECTION_NAME, points=points)
     print(f"   ✅ [Qdrant] Đã lưu {len(points)} vectors.")
 
@@ -182,10 +182,10 @@ class RetrievalEvaluator:
                 start_time = time.time()
                 
                 # For both RAG types, call query() then extract retrieved IDs
-                _ = rag.query(query)
+                result = rag.query(query)
                 
-                # Get the retrieved movie IDs
-                retrieved_ids = getattr(rag, 'last_movies', [])[:10]
+                # Get the retrieved movie IDs (request-scoped when the pipeline returns a QueryResult)
+                retrieved_ids = list(getattr(result, 'ranked_ids', None) or getattr(rag, 'last_movies', []))[:10]
                 
                 # Convert IDs to document dict format for metric calculation
                 retrieved_docs = [
@@ -90,48 +90,61 @@ class RAGASEvaluator:
         self.system_name = system_name
         self.contexts_cache = []  # Store contexts for RAGAS
         
-    def query_with_context(self, question: str) -> tuple:
+    def prefetch_contexts(self, questions: List[str]) -> List[List[str]]:
+        """
+        Vector contexts for every question up front: one embedding batch and
+        one batched Qdrant request instead of a search per question.
+        Returns one context list per question (empty if its embedding failed).
+        """
+        if not hasattr(self.rag, 'vectordb') or not questions:
+            return [None] * len(questions)
+        
+        query_vecs = self.rag.llm.get_embeddings(questions, task_type="retrieval_query")
+        hit_lists = self.rag.vectordb.search_many(query_vecs, top_k=5)
+        return [self._payload_contexts(hits) for hits in hit_lists]
+    
+    @staticmethod
+    def _payload_contexts(search_results) -> List[str]:
+        """Context strings built from vector search payloads"""
+        contexts = []
+        for item in search_results:
+            payload = item.payload if hasattr(item, 'payload') else item
+            
+            # Build context string from payload
+            context_parts = []
+            if payload.get('title'):
+                context_parts.append(f"Title: {payload['title']}")
+            if payload.get('year'):
+                context_parts.append(f"Year: {payload['year']}")
+            if payload.get('director'):
+                context_parts.append(f"Director: {payload['director']}")
+            if payload.get('genres'):
+                context_parts.append(f"Genres: {', '.join(payload['genres'])}")
+            if payload.get('overview'):
+                context_parts.append(f"Overview: {payload['overview']}")
+            
+            if context_parts:
+                contexts.append(" | ".join(context_parts))
+        return contexts
+    
+    def query_with_context(self, question: str, contexts: List[str] = None) -> tuple:
         """
         Query RAG and capture context for RAGAS evaluation
+        `contexts` are vector contexts from prefetch_contexts(), if already fetched
         Returns: (answer, contexts_list)
         """
         # For SimpleRAG, we need to extract contexts manually
-        if hasattr(self.rag, 'vectordb'):
-            # Get query vector
-            query_vec = self.rag.llm.get_embedding(question, task_type="retrieval_query")
-            
-            if query_vec:
-                # Search vector DB
-                search_results = self.rag.vectordb.search(query_vec, top_k=5)
-                
-                # Extract contexts
-                contexts = []
-                for item in search_results:
-                    payload = item.payload if hasattr(item, 'payload') else item
-                    
-                    # Build context string from payload
-                    context_parts = []
-                    if payload.get('title'):
-                        context_parts.append(f"Title: {payload['title']}")
-                    if payload.get('year'):
-                        context_parts.append(f"Year: {payload['year']}")
-                    if payload.get('director'):
-                        context_parts.append(f"Director: {payload['director']}")
-                    if payload.get('genres'):
-                        context_parts.append(f"Genres: {', '.join(payload['genres'])}")
-                    if payload.get('overview'):
-                        context_parts.append(f"Overview: {payload['overview']}")
-                    
-                    if context_parts:
-                        contexts.append(" | ".join(context_parts))
-            else:
-                contexts = []
+        if contexts is not None:
+            pass
+        elif hasattr(self.rag, 'vectordb'):
+            contexts = self.prefetch_contexts([question])[0]
         else:
             # Fallback: no context extraction
             contexts = ["Context extraction not available for this pipeline"]
         
-        # Get answer
-        answer = self.rag.query(question)
+        # Get answer (GraphRAG returns a QueryResult, SimpleRAG a plain string)
+        result = self.rag.query(question)
+        answer = getattr(result, 'answer', result)
         
         return answer, contexts
     
@@ -157,6 +170,13 @@ class RAGASEvaluator:
         contexts_list = []
         ground_truths = []
         
+        # Vector contexts for all questions in one batched search
+        try:
+            prefetched = self.prefetch_contexts([test_case['query'] for test_case in test_cases])
+        except Exception as e:
+            print(f"  ⚠️ Batched context search failed ({e}), searching per query")
+            prefetched = [None] * len(test_cases)
+        
         for i, test_case in enumerate(test_cases, 1):
             question = test_case['query']
             ground_truth = test_case['ground_truth']
@@ -166,7 +186,7 @@ class RAGASEvaluator:
             try:
                 # Query RAG and get contexts
                 start_time = time.time()
-                answer, contexts = self.query_with_context(question)
+                answer, contexts = self.query_with_context(question, prefetched[i - 1])
                 latency = time.time() - start_time
                 
                 print(f"  ✓ Answered in {latency:.2f}s")
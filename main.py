@@ -28,7 +28,7 @@ def main():
             if not user_input.strip():
                 continue
                 
-            response = rag.query(user_input)
+            response = rag.query(user_input).answer
             print(f"\n🤖 Gemini: {response}\n" + "-"*50)
             
     except KeyboardInterrupt:
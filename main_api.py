@@ -7,6 +7,7 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import os
@@ -96,10 +97,13 @@ async def chat(request: ChatRequest):
                 for msg in request.history
             ]
         
-        answer = rag.query(request.message.strip(), chat_history=chat_history)
+        # The pipeline is synchronous; keep it off the event loop
+        result = await run_in_threadpool(
+            rag.query, request.message.strip(), chat_history=chat_history
+        )
         
         return ChatResponse(
-            message=answer,
+            message=result.answer,
             time=datetime.now().isoformat()
         )
     except Exception as e:
@@ -113,7 +117,8 @@ async def chat(request: ChatRequest):
 @app.get("/api/chat/stream")
 async def chat_stream(message: str, history: Optional[str] = None):
     """
-    Stream chat responses for real-time typing effect.
+    Stream chat responses as Server-Sent Events.
+    Emits the retrieved movies first, then answer chunks as Gemini generates them.
     """
     if not rag:
         raise HTTPException(status_code=500, detail="RAG system not initialized")
@@ -121,19 +126,33 @@ async def chat_stream(message: str, history: Optional[str] = None):
     if not message or not message.strip():
         raise HTTPException(status_code=400, detail="Message cannot be empty")
     
-    async def event_generator():
+    def event_generator():
+        # Sync generator: Starlette iterates it in a worker thread, so the
+        # blocking pipeline never stalls the event loop
         try:
             chat_history = None
             if history:
                 chat_history = json.loads(history)
             
-            answer = rag.query(message.strip(), chat_history=chat_history)
-            
-            # Stream response word by word
-            words = answer.split()
-            for i, word in enumerate(words):
-                chunk = word + (" " if i < len(words) - 1 else "")
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
+            for event in rag.query_stream(message.strip(), chat_history=chat_history):
+                if event['type'] == 'retrieval':
+                    # Sent before generation starts
+                    payload = {'movies': event['movies'], 'method': event['method']}
+                elif event['type'] == 'token':
+                    payload = {'content': event['content']}
+                elif event['type'] == 'reset':
+                    payload = {'reset': True, 'reason': event['reason']}
+                elif event['type'] == 'notice':
+                    payload = {'notice': event['content']}
+                else:
+                    result = event['result']
+                    payload = {
+                        'done': True,
+                        'method': event['method'],
+                        'timings': dict(result.timings),
+                        'cache': dict(result.cache)
+                    }
+                yield f"data: {json.dumps(payload)}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
     
@@ -221,7 +240,7 @@ async def run_ingestion():
     Trigger the ingestion pipeline.
     """
     try:
-        ingest.run_ingestion()
+        await run_in_threadpool(ingest.run_ingestion)
         return {
             "status": "success",
             "message": "Ingestion completed successfully"
@@ -268,6 +287,16 @@ async def health_check():
     }
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Query, cache and Gemini rate-limiter metrics (queue wait, throttle events).
+    """
+    if not rag:
+        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    return rag.get_query_stats()
+
+
 # ============= Image Proxy =============
 @app.get("/api/poster")
 async def get_poster(url: str):
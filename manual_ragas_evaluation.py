@@ -630,19 +630,21 @@ class ManualComparisonEvaluator:
     def query_with_context(self, rag_system, question: str) -> tuple:
         """Query RAG and capture contexts - USE ACTUAL CONTEXTS from RAG system"""
         # Query the system
-        answer = rag_system.query(question)
+        result = rag_system.query(question)
+        # GraphRAG returns a QueryResult, SimpleRAG a plain string
+        answer = getattr(result, 'answer', result)
         
         # Check if fallback was used (for GraphRAG)
-        if hasattr(rag_system, 'last_method'):
-            method = rag_system.last_method
+        if hasattr(result, 'method'):
+            method = result.method
             if method == 'fallback_general_knowledge':
                 print(f"  🌐 Fallback triggered: Used general knowledge (no database context)")
             elif method:
                 print(f"  📊 Method: {method}")
         
         # Get actual contexts used by the RAG system
-        if hasattr(rag_system, 'last_contexts') and rag_system.last_contexts:
-            contexts = rag_system.last_contexts[:10]  # Limit to 10 for token efficiency
+        if getattr(result, 'contexts', None):
+            contexts = list(result.contexts[:10])  # Limit to 10 for token efficiency
             print(f"  ✓ Captured {len(contexts)} actual contexts from RAG system")
         else:
             # Fallback: extract contexts manually (old method)
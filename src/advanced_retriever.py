@@ -7,11 +7,22 @@ Implements techniques from GraphRAG survey paper:
 - Adaptive Retrieval (Smart depth selection)
 """
 
-from typing import List, Dict, Any, Tuple, Set
+from typing import List, Dict, Any, Tuple, Set, Optional
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from neo4j import Query
+from .config import Config
 from .llm_service import GeminiService
 from .vector_db import QdrantService
 from .graph_db import Neo4jService
+from .communities import get_community_index
+from .graph_engine import get_graph_engine, REL_TYPES, PATH_DEGREE_CAPS, EXPANSION_DEGREE_CAPS
+
+
+# Neural and symbolic branches of every HybridRetriever run on this shared pool.
+# Late branches keep running after their timeout, so it leaves headroom for them
+_branch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hybrid-retriever")
 
 
 class EntityLinker:
@@ -51,7 +62,7 @@ Return ONLY valid JSON array."""
         try:
             # Get safety settings from model if available
             safety_settings = getattr(self.llm.model, '_safety_settings', None)
-            response = self.llm.model.generate_content(prompt, safety_settings=safety_settings)
+            response = self.llm.generate(prompt, safety_settings=safety_settings)
             
             # Check for valid response
             try:
@@ -70,6 +81,44 @@ Return ONLY valid JSON array."""
             # Fallback: simple regex-based extraction
             return self._fallback_extraction(query)
     
+    # QueryProcessor entity types -> linker types
+    UPSTREAM_TYPES = {'MOVIE': 'movie', 'PERSON': 'person', 'GENRE': 'genre'}
+    
+    @classmethod
+    def from_query_entities(cls, query_entities: List[Dict]) -> List[Dict]:
+        """
+        Convert QueryProcessor entities ({'text', 'type', 'confidence', 'source'})
+        into linker entities ({'entity', 'type'}).
+        
+        Keyword hits ('phim', 'đạo diễn') and years are not linkable. Capitalized
+        phrases are only a guess at a title, so they are linked against every
+        node type unless another extractor typed the same text.
+        """
+        typed = {}
+        for ent in query_entities or []:
+            text = (ent.get('text') or '').strip()
+            etype = cls.UPSTREAM_TYPES.get(str(ent.get('type', '')).upper())
+            if not text or not etype:
+                continue
+            if etype == 'movie' and ent.get('source') == 'capitalized':
+                etype = 'unknown'
+            key = text.lower()
+            # A concrete type from any extractor beats an untyped guess
+            if key not in typed or typed[key]['type'] == 'unknown':
+                typed[key] = {'entity': text, 'type': etype}
+                # Gazetteer hits already know their catalog ID
+                if ent.get('source') == 'gazetteer' and ent.get('id') is not None:
+                    typed[key]['id'] = ent['id']
+        return list(typed.values())
+    
+    def resolve_entities(self, query: str, query_entities: List[Dict] = None) -> List[Dict]:
+        """Entities found upstream if any; otherwise this linker's own LLM extraction"""
+        entities = self.from_query_entities(query_entities)
+        if entities:
+            print(f"    → Reusing {len(entities)} upstream entities (no extra LLM call)")
+            return entities
+        return self.extract_entities(query)
+    
     def _fallback_extraction(self, query: str) -> List[Dict]:
         """Fallback entity extraction using patterns"""
         entities = []
@@ -90,62 +139,142 @@ Return ONLY valid JSON array."""
         
         return entities
     
-    def link_to_graph(self, entities: List[Dict]) -> List[Dict]:
-        """Link extracted entities to graph nodes"""
+    # Linker type -> full-text indexes searched for it (untyped entities search all)
+    TYPE_INDEXES = {
+        'movie': ['movie_title_fulltext'],
+        'person': ['person_name_fulltext'],
+        'genre': ['genre_name_fulltext'],
+    }
+    
+    LINK_QUERY = """
+    UNWIND $searches AS search
+    CALL {
+        WITH search
+        CALL db.index.fulltext.queryNodes(search.index, search.query) YIELD node, score
+        RETURN node, score
+        ORDER BY score DESC
+        LIMIT $limit
+    }
+    RETURN search.idx AS idx,
+           toLower(labels(node)[0]) AS type,
+           COALESCE(node.title, node.name) AS name,
+           COALESCE(node.id, node.name) AS id,
+           score
+    """
+    
+    # Used only if the full-text indexes are unavailable; still one round trip
+    CONTAINS_QUERY = """
+    UNWIND $searches AS search
+    CALL {
+        WITH search
+        MATCH (n)
+        WHERE (search.type IN ['movie', 'unknown', 'other'] AND n:Movie AND toLower(n.title) CONTAINS search.name)
+           OR (search.type IN ['person', 'unknown', 'other'] AND n:Person AND toLower(n.name) CONTAINS search.name)
+           OR (search.type IN ['genre', 'unknown', 'other'] AND n:Genre AND toLower(n.name) CONTAINS search.name)
+        RETURN n
+        LIMIT $limit
+    }
+    RETURN search.idx AS idx,
+           toLower(labels(n)[0]) AS type,
+           COALESCE(n.title, n.name) AS name,
+           COALESCE(n.id, n.name) AS id,
+           1.0 AS score
+    """
+    
+    _LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+    
+    @classmethod
+    def _lucene_query(cls, name: str) -> str:
+        """Exact phrase (boosted) or all terms, with Lucene syntax escaped"""
+        terms = [cls._LUCENE_SPECIAL.sub(r"\\\1", t) for t in name.lower().split()]
+        terms = [t for t in terms if t]
+        if not terms:
+            return ''
+        phrase = ' '.join(terms)
+        if len(terms) == 1:
+            return f'{phrase}^2 OR {phrase}~1'
+        return f'"{phrase}"^3 OR ({" AND ".join(terms)})'
+    
+    def link_to_graph(self, entities: List[Dict], limit_per_entity: int = 3) -> List[Dict]:
+        """
+        Link extracted entities to graph nodes.
+        
+        Entities that already carry a catalog ID (gazetteer hits) are linked
+        directly; the rest are resolved together in ONE full-text query
+        (UNWIND over all entity/index pairs), ranked by score per entity.
+        """
         linked_nodes = []
+        pending = []
         
         for entity in entities:
-            entity_name = entity['entity']
-            entity_type = entity['type']
-            
-            # Search in graph based on type
-            if entity_type == 'movie':
-                query = """
-                MATCH (m:Movie)
-                WHERE toLower(m.title) CONTAINS toLower($name)
-                RETURN m.title as title, m.id as id, 'movie' as type
-                LIMIT 3
-                """
-            elif entity_type == 'person':
-                query = """
-                MATCH (p:Person)
-                WHERE toLower(p.name) CONTAINS toLower($name)
-                RETURN p.name as name, p.name as id, 'person' as type
-                LIMIT 3
-                """
-            elif entity_type == 'genre':
-                query = """
-                MATCH (g:Genre)
-                WHERE toLower(g.name) CONTAINS toLower($name)
-                RETURN g.name as name, g.name as id, 'genre' as type
-                LIMIT 3
-                """
-            else:
-                # Try all types
-                query = """
-                MATCH (n)
-                WHERE (n:Movie AND toLower(n.title) CONTAINS toLower($name))
-                   OR (n:Person AND toLower(n.name) CONTAINS toLower($name))
-                   OR (n:Genre AND toLower(n.name) CONTAINS toLower($name))
-                RETURN labels(n)[0] as type, 
-                       COALESCE(n.title, n.name) as name,
-                       COALESCE(n.id, n.name) as id
-                LIMIT 3
-                """
-            
+            if entity.get('id') is not None:
+                linked_nodes.append({
+                    'entity': entity['entity'],
+                    'matched_node': {
+                        'name': entity['entity'],
+                        'id': entity['id'],
+                        'type': entity['type'],
+                        'score': 1.0
+                    },
+                    'original_type': entity['type']
+                })
+            elif (entity.get('entity') or '').strip():
+                pending.append(entity)
+        
+        if not pending:
+            return linked_nodes
+        
+        searches = []
+        for idx, entity in enumerate(pending):
+            lucene = self._lucene_query(entity['entity'])
+            indexes = self.TYPE_INDEXES.get(entity.get('type'), list(self.graphdb.FULLTEXT_INDEXES))
+            for index in indexes:
+                if lucene:
+                    searches.append({'idx': idx, 'index': index, 'query': lucene})
+        
+        try:
+            records = self._run_link_query(self.LINK_QUERY, searches, limit_per_entity)
+        except Exception as e:
+            print(f"    ⚠️ Full-text linking unavailable ({str(e)[:80]}), using CONTAINS scan")
+            fallback = [
+                {'idx': idx, 'type': entity.get('type', 'unknown'), 'name': entity['entity'].lower()}
+                for idx, entity in enumerate(pending)
+            ]
             try:
-                with self.graphdb.driver.session() as session:
-                    results = session.run(query, name=entity_name)
-                    for record in results:
-                        linked_nodes.append({
-                            'entity': entity_name,
-                            'matched_node': dict(record),
-                            'original_type': entity_type
-                        })
+                records = self._run_link_query(self.CONTAINS_QUERY, fallback, limit_per_entity)
             except Exception as e:
-                print(f"    ⚠️ Entity linking error for '{entity_name}': {e}")
+                print(f"    ⚠️ Entity linking error: {e}")
+                return linked_nodes
+        
+        # Group per entity; untyped entities merge results from several indexes
+        matches: Dict[int, List[Dict]] = {}
+        for record in records:
+            matches.setdefault(record['idx'], []).append(record)
+        
+        for idx, entity in enumerate(pending):
+            ranked = sorted(matches.get(idx, []), key=lambda r: r['score'], reverse=True)
+            for record in ranked[:limit_per_entity]:
+                matched = {
+                    'name': record['name'],
+                    'id': record['id'],
+                    'type': record['type'],
+                    'score': record['score']
+                }
+                if record['type'] == 'movie':
+                    matched['title'] = record['name']
+                linked_nodes.append({
+                    'entity': entity['entity'],
+                    'matched_node': matched,
+                    'original_type': entity.get('type')
+                })
         
         return linked_nodes
+    
+    def _run_link_query(self, query: str, searches: List[Dict], limit: int) -> List[Dict]:
+        if not searches:
+            return []
+        with self.graphdb.driver.session() as session:
+            return [dict(record) for record in session.run(query, searches=searches, limit=limit)]
 
 
 class GraphTraverser:
@@ -154,41 +283,125 @@ class GraphTraverser:
     def __init__(self, graphdb: Neo4jService):
         self.graphdb = graphdb
     
+    def _engine_for(self, node_ids: List[str]):
+        """
+        In-memory graph if it is loaded and knows the requested nodes; otherwise
+        None and the caller goes to Neo4j (e.g. movies ingested since the snapshot)
+        """
+        try:
+            engine = get_graph_engine(self.graphdb)
+        except Exception as e:
+            print(f"    ⚠️ Graph engine unavailable: {e}")
+            return None
+        if engine is None or not len(engine.lookup(node_ids)):
+            return None
+        return engine
+    
+    # One hop of beam-bounded expansion; the same plan serves every hop and every k.
+    # Frontier nodes over their label's degree cap are only expanded from the seeds
+    EXPAND_HOP_QUERY = """
+    MATCH (n) WHERE elementId(n) IN $frontier
+      AND ($expand_hubs OR size([(n)--() | 1]) <= CASE
+              WHEN n:Genre THEN $genre_cap
+              WHEN n:Person THEN $person_cap
+              ELSE $movie_cap END)
+    MATCH (n)-[r]-(neighbor)
+    WHERE type(r) IN $rel_types AND NOT elementId(neighbor) IN $visited
+    WITH neighbor, count(r) AS links, size([(neighbor)--() | 1]) AS degree
+    ORDER BY links DESC, degree ASC
+    LIMIT $beam_width
+    RETURN elementId(neighbor) AS eid,
+           labels(neighbor)[0] as type,
+           COALESCE(neighbor.title, neighbor.name) as name,
+           COALESCE(neighbor.id, neighbor.name) as id
+    """
+    
+    SEED_QUERY = """
+    MATCH (start) WHERE start.id IN $node_ids OR start.name IN $node_ids
+    RETURN elementId(start) AS eid
+    """
+    
     def traverse_k_hop(self, node_ids: List[str], k: int = 2, 
-                       max_nodes: int = 20) -> List[Dict]:
+                       max_nodes: int = 20, rel_types: List[str] = None,
+                       beam_width: int = None) -> List[Dict]:
         """
-        K-hop neighborhood traversal
-        Returns nodes and relationships within k hops
+        K-hop neighborhood traversal, frontier-limited: each hop keeps at most
+        `beam_width` new nodes, follows only `rel_types` (None = all) and does
+        not expand through Genre/Person hubs past hop 1.
+        Returns nodes within k hops, nearest first
         """
         if not node_ids or k <= 0:
             return []
-        
-        query = f"""
-        MATCH path = (start)-[*1..{k}]-(neighbor)
-        WHERE start.id IN $node_ids OR start.name IN $node_ids
-        WITH DISTINCT neighbor, length(path) as distance
-        ORDER BY distance ASC
-        LIMIT {max_nodes}
-        RETURN 
-            labels(neighbor)[0] as type,
-            COALESCE(neighbor.title, neighbor.name) as name,
-            COALESCE(neighbor.id, neighbor.name) as id,
-            distance
-        """
-        
+        beam_width = beam_width or Config.TRAVERSAL_BEAM_WIDTH
+        
+        engine = self._engine_for(node_ids)
+        if engine is not None:
+            return engine.k_hop(node_ids, k=k, max_nodes=max_nodes,
+                                rel_types=rel_types, beam_width=beam_width)
+        
+        params = {
+            'rel_types': list(rel_types or REL_TYPES),
+            'beam_width': beam_width,
+            'genre_cap': EXPANSION_DEGREE_CAPS['Genre'],
+            'person_cap': EXPANSION_DEGREE_CAPS['Person'],
+            'movie_cap': 2 ** 31
+        }
         try:
+            results = []
             with self.graphdb.driver.session() as session:
-                results = session.run(query, node_ids=node_ids)
-                return [dict(record) for record in results]
+                frontier = [record['eid'] for record in session.run(self.SEED_QUERY, node_ids=node_ids)]
+                visited = list(frontier)
+                for hop in range(1, k + 1):
+                    if not frontier or len(results) >= max_nodes:
+                        break
+                    records = list(session.run(
+                        self.EXPAND_HOP_QUERY,
+                        frontier=frontier,
+                        visited=visited,
+                        expand_hubs=(hop == 1),
+                        **params
+                    ))
+                    frontier = [record['eid'] for record in records]
+                    visited.extend(frontier)
+                    for record in records[:max_nodes - len(results)]:
+                        results.append({
+                            'type': record['type'],
+                            'name': record['name'],
+                            'id': record['id'],
+                            'distance': hop
+                        })
+            return results
         except Exception as e:
             print(f"    ⚠️ Graph traversal error: {e}")
             return []
     
+    def rank_by_ppr(self, node_ids: List[str], top_k: int = 15,
+                    rel_types: List[str] = None) -> List[Dict]:
+        """
+        Movies ranked by Personalized PageRank from the linked entities.
+        Needs the in-memory graph; without it this falls back to k-hop traversal
+        """
+        engine = self._engine_for(node_ids)
+        if engine is None:
+            return self.traverse_k_hop(node_ids, k=2, max_nodes=top_k, rel_types=rel_types)
+        return engine.personalized_pagerank(
+            node_ids,
+            top_k=top_k,
+            alpha=Config.PPR_ALPHA,
+            tol=Config.PPR_TOLERANCE,
+            max_iter=Config.PPR_MAX_ITER,
+            rel_types=rel_types
+        )
+    
     def get_relationships_between(self, node_ids: List[str]) -> List[Dict]:
         """Get all relationships between a set of nodes"""
         if len(node_ids) < 2:
             return []
         
+        engine = self._engine_for(node_ids)
+        if engine is not None:
+            return engine.relationships_between(node_ids, limit=50)
+        
         query = """
         MATCH (n1)-[r]->(n2)
         WHERE (n1.id IN $node_ids OR n1.name IN $node_ids) 
@@ -208,26 +421,56 @@ class GraphTraverser:
             print(f"    ⚠️ Relationship retrieval error: {e}")
             return []
     
+    # Variable-length bounds can't be parameters, so max_length is clamped and
+    # inlined; everything else is passed as parameters
+    PATH_QUERY = """
+    MATCH (start) WHERE start.id = $start_id OR start.name = $start_id
+    MATCH (end) WHERE (end.id = $end_id OR end.name = $end_id) AND end <> start
+    MATCH path = allShortestPaths((start)-[:ACTED_IN|DIRECTED|BELONGS_TO*..{max_length}]-(end))
+    WHERE all(node IN nodes(path)[1..-1] WHERE
+              size([(node)--() | 1]) <= CASE
+                  WHEN node:Genre THEN $genre_cap
+                  WHEN node:Person THEN $person_cap
+                  ELSE $movie_cap END)
+    RETURN [node IN nodes(path) |
+            {{type: labels(node)[0],
+              name: COALESCE(node.title, node.name),
+              id: COALESCE(node.id, node.name)}}] AS path_nodes,
+           [rel IN relationships(path) | type(rel)] AS path_rels,
+           [i IN range(0, length(path) - 1) |
+            CASE WHEN startNode(relationships(path)[i]) = nodes(path)[i]
+                 THEN '->' ELSE '<-' END] AS path_directions,
+           length(path) AS length
+    LIMIT $max_paths
+    """
+    
     def find_paths_between(self, start_id: str, end_id: str, 
-                           max_length: int = 4) -> List[List[Dict]]:
-        """Find paths between two entities"""
-        query = f"""
-        MATCH path)-[*1..{max_length}]-(end)
-        )
-        WHERE (start.id = $start_id OR start.name = $start_id)
-          AND (end.id = $end_id OR end.name = $end_id)
-        RETURN [node in nodes(path) | 
-                {{type: labels(node)[0], 
-                  name: COALESCE(node.title, node.name),
-                  id: COALESCE(node.id, node.name)ode.title, node.name),
-                  id: node.tmdb_id}}] as path_nodes,
-               [rel in relationships(path) | type(rel)] as path_rels
-        LIMIT 3
+                           max_length: int = 4, max_paths: int = 3) -> List[Dict]:
         """
+        Shortest typed paths between two entities: bidirectional BFS on the
+        in-memory graph when loaded, otherwise allShortestPaths in Neo4j.
+        Both skip Genre/Person hubs as intermediate nodes and share a latency budget.
+        """
+        max_length = max(1, min(int(max_length), 6))
+        budget = Config.PATH_FINDING_BUDGET_SECONDS
+        
+        engine = self._engine_for([start_id])
+        if engine is not None and len(engine.lookup([end_id])):
+            return engine.find_paths(start_id, end_id, max_length=max_length,
+                                     max_paths=max_paths, budget_seconds=budget)
         
+        query = Query(self.PATH_QUERY.format(max_length=max_length), timeout=budget)
         try:
             with self.graphdb.driver.session() as session:
-                results = session.run(query, start_id=start_id, end_id=end_id)
+                results = session.run(
+                    query,
+                    start_id=start_id,
+                    end_id=end_id,
+                    max_paths=max_paths,
+                    genre_cap=PATH_DEGREE_CAPS['Genre'],
+                    person_cap=PATH_DEGREE_CAPS['Person'],
+                    movie_cap=2 ** 31
+                )
                 return [dict(record) for record in results]
         except Exception as e:
             print(f"    ⚠️ Path finding error: {e}")
@@ -237,9 +480,58 @@ class GraphTraverser:
 class AdaptiveRetriever:
     """Adaptive Retrieval: Intelligently decide retrieval depth"""
     
+    # Relationship types worth following per query category (missing = all)
+    CATEGORY_REL_TYPES = {
+        'director_filmography': ['DIRECTED', 'ACTED_IN'],
+        'actor_filmography': ['ACTED_IN', 'DIRECTED'],
+        'genre_recommendation': ['BELONGS_TO', 'DIRECTED'],
+    }
+    
+    # Relations found by the query processor -> category, in priority order
+    RELATION_CATEGORIES = [
+        ('SIMILAR_TO', 'similarity_search'),
+        ('DIRECTED_BY', 'director_filmography'),
+        ('ACTED_IN', 'actor_filmography'),
+        ('BELONGS_TO', 'genre_recommendation'),
+    ]
+    
     def __init__(self, llm_service: GeminiService):
         self.llm = llm_service
     
+    def predict_category(self, query_metadata: Dict) -> str:
+        """Category from metadata, else inferred from the extracted relations"""
+        category = query_metadata.get('category') or 'unknown'
+        if category != 'unknown':
+            return category
+        relation_types = {r.get('type') for r in query_metadata.get('relations') or []}
+        for relation, mapped in self.RELATION_CATEGORIES:
+            if relation in relation_types:
+                return mapped
+        return 'unknown'
+    
+    # Broad, catalog-level questions are answered from community summaries
+    GLOBAL_PATTERNS = [
+        'what kinds of', 'what kind of', 'what types of', 'what sorts of',
+        'overview of', 'do you have', 'what genres', 'which genres',
+        'những loại', 'loại phim nào', 'thể loại nào', 'tổng quan', 'có những phim',
+        'các dòng phim'
+    ]
+    
+    def is_global_question(self, query: str, query_metadata: Dict) -> bool:
+        """Catalog-wide question with no specific movie or person to anchor on"""
+        query_lower = query.lower()
+        if not any(pattern in query_lower for pattern in self.GLOBAL_PATTERNS):
+            return False
+        anchored = {'MOVIE', 'PERSON'}
+        return not any(
+            (entity.get('type') or '').upper() in anchored
+            for entity in query_metadata.get('entities') or []
+        )
+    
+    def relation_types_for(self, category: str) -> List[str]:
+        """Relationship types traversal may follow for `category` (None = all)"""
+        return self.CATEGORY_REL_TYPES.get(category)
+    
     def predict_retrieval_depth(self, query: str, query_metadata: Dict) -> int:
         """
         Predict how many hops of graph traversal needed
@@ -294,16 +586,28 @@ class HybridRetriever:
     Main orchestrator for advanced retrieval
     """
     
+    GRAPH_STRATEGIES = ('k_hop', 'ppr')
+    
     def __init__(self, llm: GeminiService, vectordb: QdrantService, 
-                 graphdb: Neo4jService):
+                 graphdb: Neo4jService, graph_strategy: str = None):
         self.llm = llm
         self.vectordb = vectordb
         self.graphdb = graphdb
         
+        # How the symbolic branch expands linked entities: k-hop traversal or PPR
+        self.graph_strategy = graph_strategy or Config.GRAPH_RETRIEVAL_STRATEGY
+        if self.graph_strategy not in self.GRAPH_STRATEGIES:
+            print(f"  ⚠️ Unknown graph strategy '{self.graph_strategy}', using k_hop")
+            self.graph_strategy = 'k_hop'
+        
         # Sub-components
         self.entity_linker = EntityLinker(llm, graphdb)
         self.graph_traverser = GraphTraverser(graphdb)
         self.adaptive_retriever = AdaptiveRetriever(llm)
+        
+        # Neural and symbolic branches run side by side on the shared pool
+        self.vector_timeout = Config.HYBRID_VECTOR_TIMEOUT
+        self.graph_timeout = Config.HYBRID_GRAPH_TIMEOUT
     
     def retrieve(self, query: str, query_metadata: Dict = None, 
                  top_k_vector: int = 5) -> Dict:
@@ -315,6 +619,9 @@ class HybridRetriever:
         2. Neural retrieval: Vector search for semantic similarity
         3. Symbolic retrieval: Entity linking + graph traversal
         4. Hybrid fusion: Combine results
+        
+        Steps 2 and 3 are independent and run concurrently, each with its own
+        timeout; whatever a late branch has finished by then is still fused.
         """
         if query_metadata is None:
             query_metadata = {}
@@ -327,119 +634,347 @@ class HybridRetriever:
             print(f"    → Skipping retrieval (high internal confidence)")
             return {'contexts': [], 'method': 'internal_knowledge'}
         
+        category = self.adaptive_retriever.predict_category(query_metadata)
         retrieval_depth = self.adaptive_retriever.predict_retrieval_depth(
-            query, query_metadata
+            query, {**query_metadata, 'category': category}
+        )
+        rel_types = self.adaptive_retriever.relation_types_for(category)
+        print(f"    → Predicted depth: {retrieval_depth} hops ({category}, "
+              f"{'/'.join(rel_types) if rel_types else 'all relationships'})")
+        
+        # Steps 2 + 3: both branches in parallel; each fills its own partial dict
+        neural = {'vector_results': []}
+        symbolic = {'graph_results': [], 'linked_nodes': [], 'relationships': [], 'paths': [],
+                    'communities': []}
+        
+        # Global questions read precomputed community summaries instead of expanding the graph
+        community_index = None
+        if self.adaptive_retriever.is_global_question(query, query_metadata):
+            community_index = get_community_index()
+        if community_index is not None:
+            print(f"    → Global question: using community summaries")
+            graph_branch = (self._community_branch, (query, community_index, symbolic))
+        else:
+            graph_branch = (self._symbolic_branch,
+                            (query, retrieval_depth, symbolic, query_metadata.get('entities'), rel_types))
+        
+        branches = {
+            'vector': (self._neural_branch, (query, top_k_vector, neural, query_metadata.get('filters')),
+                       self.vector_timeout),
+            'graph': (*graph_branch, self.graph_timeout),
+        }
+        
+        started_at = time.perf_counter()
+        futures = {
+            name: _branch_executor.submit(self._timed, fn, *args)
+            for name, (fn, args, _) in branches.items()
+        }
+        
+        branch_timings = {}
+        timed_out = []
+        for name, future in futures.items():
+            remaining = branches[name][2] - (time.perf_counter() - started_at)
+            try:
+                branch_timings[name] = future.result(timeout=max(0.0, remaining))
+            except FuturesTimeout:
+                timed_out.append(name)
+                branch_timings[name] = time.perf_counter() - started_at
+                print(f"    ⚠️ {name.capitalize()} branch exceeded {branches[name][2]:.1f}s - using partial results")
+            except Exception as e:
+                branch_timings[name] = time.perf_counter() - started_at
+                print(f"    ⚠️ {name.capitalize()} branch failed: {e}")
+        
+        # Snapshot: a late branch may still be writing into its dict
+        vector_results = list(neural['vector_results'])
+        graph_results = list(symbolic['graph_results'])
+        linked_nodes = list(symbolic['linked_nodes'])
+        paths = list(symbolic['paths'])
+        communities = list(symbolic['communities'])
+        
+        # Step 4: Hybrid fusion - one ranked, deduplicated candidate list
+        fused = self._fuse_results(
+            vector_results, 
+            graph_results,
+            linked_nodes,
+            paths,
+            communities
         )
-        print(f"    → Predicted depth: {retrieval_depth} hops")
         
-        # Step 2: Neural retrieval (Vector search)
+        print(f"    ✓ Total contexts: {len(fused)} (fused from "
+              f"{len(vector_results) + len(graph_results) + len(linked_nodes) + len(paths) + len(communities)} results)")
+        
+        return {
+            'contexts': [candidate['context'] for candidate in fused],
+            'candidates': fused,
+            'vector_count': len(vector_results),
+            'graph_count': len(graph_results),
+            'linked_entities': len(linked_nodes),
+            'path_count': len(paths),
+            'community_count': len(communities),
+            'retrieval_depth': retrieval_depth,
+            'category': category,
+            'graph_strategy': self.graph_strategy,
+            'ranked': [
+                {'id': c['id'], 'score': c['score'], 'title': c.get('name', ''),
+                 'sources': list(c['sources'])}
+                for c in fused if c['type'] == 'movie' and c.get('id') is not None
+            ],
+            'branch_timings': branch_timings,
+            'timed_out': timed_out,
+            'method': 'hybrid'
+        }
+    
+    @staticmethod
+    def _timed(fn, *args) -> float:
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+    
+    def _neural_branch(self, query: str, top_k_vector: int, partial: Dict,
+                       filters: Dict = None) -> None:
+        """
+        Step 2: Neural retrieval (vector search); results land in partial['vector_results'].
+        `filters` (year range, genres) restrict the search; it is rerun without
+        them when nothing qualifies.
+        """
         print(f"    → Neural retrieval (vector search)...")
         query_embedding = self.llm.get_embedding(query, task_type="retrieval_query")
         vector_results = []
         
         if query_embedding:
-            search_results = self.vectordb.search(query_embedding, top_k=top_k_vector)
+            payload_fields = ['title', 'overview', 'tmdb_id', 'movie_id', 'id']
+            search_results = self.vectordb.search(
+                query_embedding, top_k=top_k_vector,
+                payload_fields=payload_fields, filters=filters
+            )
+            if filters and not search_results:
+                print(f"    ⚠️ No vector matches with filters {filters} - searching without them")
+                search_results = self.vectordb.search(
+                    query_embedding, top_k=top_k_vector, payload_fields=payload_fields
+                )
             for item in search_results:
                 if hasattr(item, 'payload') and item.payload:
                     vector_results.append({
                         'title': item.payload.get('title', ''),
                         'overview': item.payload.get('overview', ''),
                         'tmdb_id': item.payload.get('tmdb_id', ''),
+                        'movie_id': item.payload.get('movie_id') or item.payload.get('tmdb_id') or item.payload.get('id'),
                         'score': item.score if hasattr(item, 'score') else 0,
                         'source': 'vector'
                     })
         
+        partial['vector_results'] = vector_results
         print(f"    → Found {len(vector_results)} vector results")
-        
-        # Step 3: Symbolic retrieval (Entity linking + Graph traversal)
+    
+    def _community_branch(self, query: str, community_index, partial: Dict, top_k: int = 3) -> None:
+        """Step 3 for global questions: closest precomputed community summaries"""
+        print(f"    → Community retrieval (precomputed summaries)...")
+        query_embedding = self.llm.get_embedding(query, task_type="retrieval_query")
+        partial['communities'] = community_index.search(query_embedding, top_k=top_k)
+        print(f"    → Found {len(partial['communities'])} relevant communities")
+    
+    def _symbolic_branch(self, query: str, retrieval_depth: int, partial: Dict,
+                         query_entities: List[Dict] = None, rel_types: List[str] = None) -> None:
+        """
+        Step 3: Symbolic retrieval (entity linking + graph traversal).
+        Each sub-step publishes into `partial` as soon as it completes, so a
+        timeout after linking still yields the linked entities.
+        Entities extracted upstream (query_metadata['entities']) are reused.
+        """
         print(f"    → Symbolic retrieval (entity linking + traversal)...")
         
         # 3a. Entity linking
-        entities = self.entity_linker.extract_entities(query)
+        entities = self.entity_linker.resolve_entities(query, query_entities)
         print(f"    → Extracted {len(entities)} entities: {[e['entity'] for e in entities]}")
         
         linked_nodes = self.entity_linker.link_to_graph(entities)
+        partial['linked_nodes'] = linked_nodes
         print(f"    → Linked to {len(linked_nodes)} graph nodes")
         
-        graph_results = []
+        if not linked_nodes:
+            return
         
         # 3b. Graph traversal
-        if linked_nodes:
-            # Get node IDs for traversal
-            start_node_ids = [
-                node['matched_node'].get('id')
-                for node in linked_nodes
-                if 'matched_node' in node and node['matched_node'].get('id')
-            ]
-            
-            if start_node_ids:
-                # K-hop traversal
-                neighbors = self.graph_traverser.traverse_k_hop(
-                    start_node_ids, 
-                    k=retrieval_depth,
-                    max_nodes=15
-                )
-                
-                for neighbor in neighbors:
-                    graph_results.append({
-                        'name': neighbor.get('name', ''),
-                        'type': neighbor.get('type', ''),
-                        'id': neighbor.get('id', ''),
-                        'distance': neighbor.get('distance', 0),
-                        'source': 'graph'
-                    })
-                
-                print(f"    → Found {len(graph_results)} graph neighbors")
-                
-                # Get relationships for context
-                all_node_ids = start_node_ids + [n.get('id') for n in neighbors]
-                relationships = self.graph_traverser.get_relationships_between(all_node_ids)
-                print(f"    → Found {len(relationships)} relationships")
-        
-        # Step 4: Hybrid fusion - Combine and format results
-        combined_contexts = self._fuse_results(
-            vector_results, 
-            graph_results,
-            linked_nodes
-        )
-        
-        print(f"    ✓ Total contexts: {len(combined_contexts)}")
-        
-        return {
-            'contexts': combined_contexts,
-            'vector_count': len(vector_results),
-            'graph_count': len(graph_results),
-            'linked_entities': len(linked_nodes),
-            'retrieval_depth': retrieval_depth,
-            'method': 'hybrid'
-        }
+        # Get node IDs for traversal
+        start_node_ids = [
+            node['matched_node'].get('id')
+            for node in linked_nodes
+            if 'matched_node' in node and node['matched_node'].get('id')
+        ]
+        if not start_node_ids:
+            return
+        
+        # "How are X and Y connected": shortest paths between the first two entities
+        if len(start_node_ids) >= 2:
+            partial['paths'] = self.graph_traverser.find_paths_between(
+                start_node_ids[0], start_node_ids[1],
+                max_length=max(2, retrieval_depth + 1)
+            )
+            print(f"    → Found {len(partial['paths'])} paths between linked entities")
+        
+        if self.graph_strategy == 'ppr':
+            # Personalized PageRank: movies scored by walk proximity to all seeds
+            neighbors = self.graph_traverser.rank_by_ppr(
+                start_node_ids,
+                top_k=15,
+                rel_types=rel_types
+            )
+        else:
+            # K-hop traversal
+            neighbors = self.graph_traverser.traverse_k_hop(
+                start_node_ids, 
+                k=retrieval_depth,
+                max_nodes=15,
+                rel_types=rel_types
+            )
+        
+        partial['graph_results'] = [
+            {
+                'name': neighbor.get('name', ''),
+                'type': neighbor.get('type', ''),
+                'id': neighbor.get('id', ''),
+                'distance': neighbor.get('distance', 0),
+                'score': neighbor.get('score'),
+                'source': 'graph'
+            }
+            for neighbor in neighbors
+        ]
+        print(f"    → Found {len(partial['graph_results'])} graph neighbors ({self.graph_strategy})")
+        
+        # Get relationships for context
+        all_node_ids = start_node_ids + [n.get('id') for n in neighbors]
+        partial['relationships'] = self.graph_traverser.get_relationships_between(all_node_ids)
+        print(f"    → Found {len(partial['relationships'])} relationships")
+    
+    # Source tags in rendering priority: a candidate found by several sources
+    # is rendered by the first of them
+    FUSION_SOURCES = ('community', 'path', 'vector', 'entity', 'graph')
+    
+    @staticmethod
+    def _candidate_key(node_type: str, node_id: Any) -> Optional[str]:
+        """Canonical 'type:id' key; vector hits and Movie nodes share 'movie:<id>'"""
+        if node_id is None or node_id == '':
+            return None
+        return f"{str(node_type or 'movie').lower()}:{str(node_id).casefold()}"
     
     def _fuse_results(self, vector_results: List[Dict], 
                      graph_results: List[Dict],
-                     linked_entities: List[Dict]) -> List[str]:
-        """Fuse vector and graph results into unified context"""
-        contexts = []
-        
-        # Add vector results (semantic matches)
-        for result in vector_results[:5]:  # Top 5
-            ctx = f"[Vector Match] {result['title']}"
-            if result.get('overview'):
-                ctx += f": {result['overview'][:200]}"
-            contexts.append(ctx)
-        
-        # Add linked entities info
-        for entity in linked_entities[:3]:  # Top 3
-            matched = entity.get('matched_node', {})
-            if matched:
-                ctx = f"[Entity Linked] {matched.get('name', '')}"
-                contexts.append(ctx)
-        
-        # Add graph neighbors
-        for result in graph_results[:5]:  # Top 5
-            ctx = f"[Graph {result['distance']}-hop] {result['type']}: {result['name']}"
-            contexts.append(ctx)
+                     linked_entities: List[Dict],
+                     paths: List[Dict] = None,
+                     communities: List[Dict] = None) -> List[Dict]:
+        """
+        Weighted reciprocal rank fusion into one ranked candidate list.
         
-        return contexts
+        Each source ranks its own results; candidates are deduplicated by
+        canonical ID and score sum(weight / (FUSION_RRF_K + rank)) over the
+        sources that found them. Every candidate keeps the raw per-source
+        scores and one rendered context line; only the top
+        FUSION_MAX_CONTEXTS are returned.
+        """
+        weights = {
+            'community': Config.FUSION_WEIGHT_COMMUNITY,
+            'path': Config.FUSION_WEIGHT_PATH,
+            'vector': Config.FUSION_WEIGHT_VECTOR,
+            'entity': Config.FUSION_WEIGHT_ENTITY,
+            'graph': Config.FUSION_WEIGHT_GRAPH,
+        }
+        k = Config.FUSION_RRF_K
+        candidates: Dict[str, Dict] = {}
+        
+        def add(key, source, rank, raw_score, **fields):
+            if key is None:
+                return
+            candidate = candidates.setdefault(key, {'key': key, 'score': 0.0, 'sources': {}})
+            if source in candidate['sources']:
+                return  # a source counts once, at its best rank
+            candidate['sources'][source] = raw_score
+            candidate['score'] += weights[source] / (k + rank)
+            for field, value in fields.items():
+                if value not in (None, '') and candidate.get(field) in (None, ''):
+                    candidate[field] = value
+        
+        # Community summaries (global questions)
+        for rank, community in enumerate(communities or [], 1):
+            add(f"community:{community['id']}", 'community', rank, community.get('score'),
+                type='community', id=community['id'], name=community['summary'])
+        
+        # Connection paths between linked entities
+        for rank, path in enumerate(paths or [], 1):
+            text = self.format_path(path)
+            add(f"path:{text}", 'path', rank, path.get('length', len(path['path_rels'])),
+                type='path', id=None, name=text)
+        
+        # Vector results (semantic matches)
+        for rank, result in enumerate(vector_results, 1):
+            add(self._candidate_key('movie', result.get('movie_id') or result.get('title')),
+                'vector', rank, result.get('score'),
+                type='movie', id=result.get('movie_id'), name=result.get('title'),
+                overview=result.get('overview'))
+        
+        # Linked entities: ranked within each extracted entity, so every
+        # entity's best match shares rank 1
+        per_entity: Dict[str, int] = {}
+        for entity in linked_entities:
+            matched = entity.get('matched_node', {})
+            if not matched:
+                continue
+            rank = per_entity[entity.get('entity')] = per_entity.get(entity.get('entity'), 0) + 1
+            add(self._candidate_key(matched.get('type'), matched.get('id')),
+                'entity', rank, matched.get('score'),
+                type=str(matched.get('type') or '').lower(), id=matched.get('id'),
+                name=matched.get('name'))
+        
+        # Graph neighbors (already ordered by hop distance or PPR score)
+        for rank, result in enumerate(graph_results, 1):
+            add(self._candidate_key(result.get('type'), result.get('id')),
+                'graph', rank, result.get('score') if result.get('score') is not None else result.get('distance'),
+                type=str(result.get('type') or '').lower(), id=result.get('id'),
+                name=result.get('name'), graph=result)
+        
+        fused = sorted(candidates.values(), key=lambda c: c['score'], reverse=True)
+        fused = fused[:Config.FUSION_MAX_CONTEXTS]
+        for candidate in fused:
+            candidate['context'] = self._render_candidate(candidate)
+        return fused
+    
+    def _render_candidate(self, candidate: Dict) -> str:
+        """One tagged context line, tagged by the candidate's highest-priority source"""
+        sources = candidate['sources']
+        source = next(s for s in self.FUSION_SOURCES if s in sources)
+        if source == 'community':
+            ctx = f"[Community] {candidate['name']}"
+        elif source == 'path':
+            ctx = f"[Graph Path] {candidate['name']}"
+        elif source == 'vector':
+            ctx = f"[Vector Match] {candidate['name']}"
+            if candidate.get('overview'):
+                ctx += f": {candidate['overview'][:200]}"
+        elif source == 'entity':
+            ctx = f"[Entity Linked] {candidate['name']}"
+        else:
+            result = candidate['graph']
+            if result.get('score') is not None:
+                ctx = f"[Graph PPR {result['score']:.3f}] {result['type']}: {result['name']}"
+            else:
+                ctx = f"[Graph {result['distance']}-hop] {result['type']}: {result['name']}"
+        if len(sources) > 1:
+            ctx += f" (found by {' + '.join(sources)})"
+        return ctx
+    
+    @staticmethod
+    def format_path(path: Dict) -> str:
+        """Christian Bale -[ACTED_IN]-> The Dark Knight Rises <-[ACTED_IN]- Tom Hardy"""
+        nodes = path['path_nodes']
+        directions = path.get('path_directions') or ['-'] * len(path['path_rels'])
+        text = nodes[0]['name']
+        for node, rel, direction in zip(nodes[1:], path['path_rels'], directions):
+            if direction == '->':
+                text += f" -[{rel}]-> {node['name']}"
+            elif direction == '<-':
+                text += f" <-[{rel}]- {node['name']}"
+            else:
+                text += f" -[{rel}]- {node['name']}"
+        return text
 
 
 def create_advanced_retriever(llm, vectordb, graphdb) -> HybridRetriever:
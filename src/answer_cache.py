@@ -0,0 +1,193 @@
+"""
+Semantic Answer Cache
+Sits in front of GraphRAG.query so rephrasings of a recent question are
+answered without another round of LLM calls:
+- Key: normalized question embedding; a hit needs cosine similarity >= threshold
+- Chat history must be compatible (same recent-history signature)
+- The question scope must match: same catalog entities and year range, so
+  "kinh dị 2010" never answers "kinh dị 2012" however close the embeddings are
+- Entries expire after a TTL and whenever the index generation changes
+- Lookup is a single vectorized NumPy scan over all cached embeddings
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from .config import Config
+from .index_version import get_index_generation
+
+
+class SemanticAnswerCache:
+    """In-memory cache of final answers keyed by question embedding"""
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600,
+                 max_entries: int = 1000, history_messages: int = 8):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.history_messages = history_messages
+        self._lock = threading.Lock()
+
+        # Parallel arrays: row i of _vectors belongs to _entries[i]
+        self._vectors: Optional[np.ndarray] = None
+        self._created_at = np.empty(0, dtype=np.float64)
+        self._generations = np.empty(0, dtype=np.int64)
+        self._history_keys: List[str] = []
+        self._scope_keys: List[str] = []
+        self._entries: List[Dict[str, Any]] = []
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def history_key(self, chat_history: Optional[List[Dict]]) -> str:
+        """Signature of the history window the answer prompt actually sees"""
+        if not chat_history:
+            return ""
+        recent = chat_history[-self.history_messages:]
+        text = "\n".join(
+            f"{msg.get('role', '')}:{' '.join((msg.get('content') or '').lower().split())}"
+            for msg in recent
+        )
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def scope_key(scope: Optional[Dict[str, Any]]) -> str:
+        """Signature of a question's scope ({'entity_ids', 'year_range'})"""
+        if not scope:
+            return ""
+        return json.dumps(scope, sort_keys=True, default=str)
+
+    @staticmethod
+    def _normalize(vector) -> Optional[np.ndarray]:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if vec.ndim != 1 or norm == 0:
+            return None
+        return vec / norm
+
+    def _drop_stale(self, now: float, generation: int) -> None:
+        """Remove expired or previous-generation entries (lock held)"""
+        if not self._entries:
+            return
+        keep = (now - self._created_at <= self.ttl_seconds) & (self._generations == generation)
+        if keep.all():
+            return
+        self.stats['invalidations'] += int((~keep).sum())
+        self._filter(keep)
+
+    def _filter(self, keep: np.ndarray) -> None:
+        indices = np.flatnonzero(keep)
+        self._vectors = self._vectors[indices] if len(indices) else None
+        self._created_at = self._created_at[indices]
+        self._generations = self._generations[indices]
+        self._history_keys = [self._history_keys[i] for i in indices]
+        self._scope_keys = [self._scope_keys[i] for i in indices]
+        self._entries = [self._entries[i] for i in indices]
+
+    def lookup(self, embedding, chat_history: Optional[List[Dict]] = None,
+               scope: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Cached entry for the most similar question with the same history and scope, or None"""
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        history_key = self.history_key(chat_history)
+        scope_key = self.scope_key(scope)
+
+        with self._lock:
+            self._drop_stale(time.time(), get_index_generation())
+            if not self._entries or self._vectors.shape[1] != query.shape[0]:
+                self.stats['misses'] += 1
+                return None
+
+            similarities = self._vectors @ query
+            compatible = np.fromiter(
+                (h == history_key and s == scope_key
+                 for h, s in zip(self._history_keys, self._scope_keys)),
+                dtype=bool, count=len(self._history_keys)
+            )
+            similarities = np.where(compatible, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.stats['misses'] += 1
+                return None
+
+            self.stats['hits'] += 1
+            entry = dict(self._entries[best])
+            entry['similarity'] = float(similarities[best])
+            return entry
+
+    def store(self, embedding, chat_history: Optional[List[Dict]], entry: Dict[str, Any],
+              scope: Optional[Dict[str, Any]] = None) -> None:
+        """Cache `entry` (answer, method, movies, contexts, question) for this embedding"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        with self._lock:
+            now = time.time()
+            generation = get_index_generation()
+            self._drop_stale(now, generation)
+            if self._vectors is not None and self._vectors.shape[1] != vector.shape[0]:
+                self._clear_locked()
+
+            if len(self._entries) >= self.max_entries:
+                # Oldest entries go first
+                overflow = len(self._entries) - self.max_entries + 1
+                keep = np.ones(len(self._entries), dtype=bool)
+                keep[np.argsort(self._created_at)[:overflow]] = False
+                self._filter(keep)
+                self.stats['evictions'] += overflow
+
+            row = vector[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._created_at = np.append(self._created_at, now)
+            self._generations = np.append(self._generations, generation)
+            self._history_keys.append(self.history_key(chat_history))
+            self._scope_keys.append(self.scope_key(scope))
+            self._entries.append(dict(entry))
+            self.stats['stores'] += 1
+
+    def _clear_locked(self) -> None:
+        self._vectors = None
+        self._created_at = np.empty(0, dtype=np.float64)
+        self._generations = np.empty(0, dtype=np.int64)
+        self._history_keys = []
+        self._scope_keys = []
+        self._entries = []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] / lookups * 100) if lookups > 0 else 0
+        return {
+            **self.stats,
+            'hit_rate': f"{hit_rate:.1f}%",
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'index_generation': get_index_generation()
+        }
+
+
+def create_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Answer cache configured from Config, or None if disabled"""
+    if not Config.ANSWER_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(
+        threshold=Config.ANSWER_CACHE_THRESHOLD,
+        ttl_seconds=Config.ANSWER_CACHE_TTL_SECONDS,
+        max_entries=Config.ANSWER_CACHE_MAX_ENTRIES
+    )
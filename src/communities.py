@@ -0,0 +1,375 @@
+"""
+Movie Communities for Global Questions
+Offline job that clusters the movie graph and indexes one compact summary per
+community, so broad questions ("what kinds of 90s thrillers do you have") are
+answered from a few precomputed summaries instead of expanding hundreds of nodes:
+- Movie-movie projection of the graph: shared director, shared cast, and
+  shared genre pairs between movies of the same era
+- Louvain modularity clustering (pure Python; no graph library needed)
+- Deterministic summary per community: era, genres, directors, cast, examples
+- Summaries embedded once and searched with a NumPy cosine scan at query time
+
+Build with:  python -m src.communities
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from .config import Config
+from .graph_engine import GraphEngine, LABELS
+from .index_version import get_index_generation
+
+
+# Projection edge weights
+DIRECTOR_WEIGHT = 2.0
+CAST_WEIGHT = 1.0
+GENRE_PAIR_WEIGHT = 0.3
+
+# People credited on more movies than this are hubs, not evidence of similarity
+PERSON_HUB_SIZE = 40
+# Genre edges: movies sharing a genre pair are linked to their nearest-in-time peers
+GENRE_NEIGHBORS = 8
+GENRE_MAX_YEAR_GAP = 10
+
+MIN_COMMUNITY_SIZE = 3
+
+
+# ------------------------------------------
+# Graph projection + Louvain
+# ------------------------------------------
+
+def movie_projection(engine: GraphEngine) -> Dict[int, Dict[int, float]]:
+    """Weighted undirected movie-movie graph; keys are engine node indices"""
+    movie_label = LABELS.index('Movie')
+    movies = np.flatnonzero(engine.labels == movie_label)
+    adjacency: Dict[int, Dict[int, float]] = {int(m): {} for m in movies}
+
+    def link(a: int, b: int, weight: float) -> None:
+        adjacency[a][b] = adjacency[a].get(b, 0.0) + weight
+        adjacency[b][a] = adjacency[b].get(a, 0.0) + weight
+
+    # People: adjacency['Person' -> Movie] lives in the 'out' CSR
+    for rel, weight in (('DIRECTED', DIRECTOR_WEIGHT), ('ACTED_IN', CAST_WEIGHT)):
+        if rel not in engine.adjacency:
+            continue
+        indptr, indices = engine.adjacency[rel]['out']
+        for person in np.flatnonzero(np.diff(indptr) > 1):
+            credited = indices[indptr[person]:indptr[person + 1]]
+            if len(credited) > PERSON_HUB_SIZE:
+                continue
+            for a, b in combinations(sorted(set(int(m) for m in credited)), 2):
+                link(a, b, weight)
+
+    # Genre pairs: movies sharing two genres, linked to a few peers closest in year
+    if 'BELONGS_TO' in engine.adjacency:
+        indptr, indices = engine.adjacency['BELONGS_TO']['out']
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        for movie in adjacency:
+            genres = sorted(int(g) for g in indices[indptr[movie]:indptr[movie + 1]])
+            for pair in combinations(genres, 2):
+                buckets[pair].append(movie)
+        for members in buckets.values():
+            members.sort(key=lambda m: engine.years[m])
+            for position, movie in enumerate(members):
+                for peer in members[position + 1:position + 1 + GENRE_NEIGHBORS]:
+                    if abs(int(engine.years[peer]) - int(engine.years[movie])) > GENRE_MAX_YEAR_GAP:
+                        break
+                    link(movie, peer, GENRE_PAIR_WEIGHT)
+    return adjacency
+
+
+def _move_nodes(adjacency: List[Dict[int, float]], resolution: float, rng: random.Random) -> tuple:
+    """Louvain phase 1: greedy local moves until no node improves modularity"""
+    n = len(adjacency)
+    community = list(range(n))
+    degree = [sum(neighbors.values()) for neighbors in adjacency]
+    total = list(degree)
+    two_m = sum(degree)
+    if two_m == 0:
+        return community, False
+
+    order = list(range(n))
+    rng.shuffle(order)
+    moved_any, improved = False, True
+    while improved:
+        improved = False
+        for node in order:
+            current = community[node]
+            links: Dict[int, float] = {}
+            for neighbor, weight in adjacency[node].items():
+                if neighbor != node:
+                    links[community[neighbor]] = links.get(community[neighbor], 0.0) + weight
+
+            total[current] -= degree[node]
+            best = current
+            best_gain = links.get(current, 0.0) - resolution * total[current] * degree[node] / two_m
+            for candidate, weight in links.items():
+                gain = weight - resolution * total[candidate] * degree[node] / two_m
+                if gain > best_gain + 1e-12:
+                    best, best_gain = candidate, gain
+            total[best] += degree[node]
+            if best != current:
+                community[node] = best
+                improved = moved_any = True
+    return community, moved_any
+
+
+def louvain(adjacency: Dict[int, Dict[int, float]], resolution: float = 1.0,
+            seed: int = 42, max_levels: int = 10) -> Dict[int, int]:
+    """Louvain community detection; returns {node: community id}"""
+    nodes = list(adjacency)
+    position = {node: i for i, node in enumerate(nodes)}
+    level_graph = [
+        {position[neighbor]: weight for neighbor, weight in adjacency[node].items()}
+        for node in nodes
+    ]
+    membership = list(range(len(nodes)))
+    rng = random.Random(seed)
+
+    for _ in range(max_levels):
+        community, moved = _move_nodes(level_graph, resolution, rng)
+        if not moved:
+            break
+        # Phase 2: collapse each community into one node
+        relabel = {c: i for i, c in enumerate(dict.fromkeys(community))}
+        membership = [relabel[community[m]] for m in membership]
+        aggregated: List[Dict[int, float]] = [dict() for _ in relabel]
+        for node, neighbors in enumerate(level_graph):
+            source = relabel[community[node]]
+            for neighbor, weight in neighbors.items():
+                target = relabel[community[neighbor]]
+                aggregated[source][target] = aggregated[source].get(target, 0.0) + weight
+        level_graph = aggregated
+
+    return {node: membership[i] for i, node in enumerate(nodes)}
+
+
+# ------------------------------------------
+# Summaries
+# ------------------------------------------
+
+def summarize_community(engine: GraphEngine, community_id: int, members: List[int],
+                        adjacency: Dict[int, Dict[int, float]]) -> Dict[str, Any]:
+    """Compact, deterministic description of one community"""
+    member_set = set(members)
+    genres, directors, cast = Counter(), Counter(), Counter()
+    for movie in members:
+        for rel, counter, direction in (('BELONGS_TO', genres, 'out'),
+                                        ('DIRECTED', directors, 'in'),
+                                        ('ACTED_IN', cast, 'in')):
+            if rel not in engine.adjacency:
+                continue
+            indptr, indices = engine.adjacency[rel][direction]
+            counter.update(engine.names[int(i)] for i in indices[indptr[movie]:indptr[movie + 1]])
+
+    years = sorted(int(engine.years[m]) for m in members if engine.years[m])
+    # Most central members first: strongest ties inside the community
+    central = sorted(
+        members,
+        key=lambda m: -sum(w for n, w in adjacency[m].items() if n in member_set)
+    )
+    examples = [
+        f"{engine.names[m]} ({engine.years[m]})" if engine.years[m] else engine.names[m]
+        for m in central[:6]
+    ]
+
+    top_genres = [name for name, _ in genres.most_common(3)]
+    top_directors = [name for name, count in directors.most_common(3) if count > 1 or len(members) <= 5]
+    top_cast = [name for name, count in cast.most_common(5) if count > 1]
+    era = f"{years[0]}-{years[-1]}" if years else "unknown years"
+    decades = [f"{decade}s" for decade, _ in Counter(y // 10 * 10 for y in years).most_common(2)]
+
+    text = f"{len(members)} movies ({era}), mostly {', '.join(top_genres) or 'mixed genres'}."
+    if decades:
+        text += f" Mainly from the {' and '.join(decades)}."
+    if top_directors:
+        text += f" Directors: {', '.join(top_directors)}."
+    if top_cast:
+        text += f" Frequent cast: {', '.join(top_cast)}."
+    text += f" Examples: {', '.join(examples)}."
+
+    return {
+        'id': community_id,
+        'size': len(members),
+        'years': [years[0], years[-1]] if years else None,
+        'decades': decades,
+        'genres': top_genres,
+        'directors': top_directors,
+        'cast': top_cast,
+        'movie_ids': [engine.keys[m] for m in central],
+        'summary': text
+    }
+
+
+# ------------------------------------------
+# Index
+# ------------------------------------------
+
+class CommunityIndex:
+    """Community summaries plus their normalized embeddings"""
+
+    def __init__(self, communities: List[Dict[str, Any]], embeddings: np.ndarray = None,
+                 generation: int = 0):
+        self.communities = communities
+        self.generation = generation
+        self.embeddings = None
+        if embeddings is not None and len(embeddings):
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self.embeddings = vectors / np.where(norms == 0, 1.0, norms)
+
+    def search(self, embedding, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Communities whose summaries are closest to the query embedding"""
+        if self.embeddings is None or embedding is None:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if query.shape[0] != self.embeddings.shape[1] or norm == 0:
+            return []
+        scores = self.embeddings @ (query / norm)
+        results = []
+        for i in np.argsort(-scores)[:top_k]:
+            community = dict(self.communities[int(i)])
+            community['score'] = float(scores[i])
+            results.append(community)
+        return results
+
+    def save(self, path: str) -> None:
+        """Vectors first, then the JSON via rename: a new JSON mtime means a complete index"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        vectors_path = f"{os.path.splitext(path)[0]}.npy"
+        if self.embeddings is not None:
+            np.save(vectors_path, self.embeddings)
+        elif os.path.exists(vectors_path):
+            os.remove(vectors_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'generation': self.generation, 'communities': self.communities},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CommunityIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        vectors_path = f"{os.path.splitext(path)[0]}.npy"
+        embeddings = np.load(vectors_path) if os.path.exists(vectors_path) else None
+        return cls(data['communities'], embeddings, data.get('generation', 0))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'communities': len(self.communities),
+            'generation': self.generation,
+            'stale': self.generation != get_index_generation()
+        }
+
+
+def build_communities(engine: GraphEngine, llm=None, resolution: float = 1.0) -> CommunityIndex:
+    """Cluster the movie graph, summarize each community and (with `llm`) embed the summaries"""
+    start = time.perf_counter()
+    adjacency = movie_projection(engine)
+    membership = louvain(adjacency, resolution=resolution)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for movie, community in membership.items():
+        groups[community].append(movie)
+    ordered = sorted((m for m in groups.values() if len(m) >= MIN_COMMUNITY_SIZE), key=len, reverse=True)
+    communities = [
+        summarize_community(engine, i, members, adjacency)
+        for i, members in enumerate(ordered)
+    ]
+    print(f"  ✓ {len(communities)} communities (≥{MIN_COMMUNITY_SIZE} movies) from "
+          f"{len(adjacency)} movies in {time.perf_counter() - start:.2f}s")
+
+    embeddings = None
+    if llm is not None and communities:
+        vectors = llm.get_embeddings([c['summary'] for c in communities])
+        # Drop communities whose summary failed to embed
+        keep = [i for i, vector in enumerate(vectors) if vector]
+        communities = [communities[i] for i in keep]
+        embeddings = np.asarray([vectors[i] for i in keep], dtype=np.float32) if keep else None
+    return CommunityIndex(communities, embeddings, engine.generation)
+
+
+_shared_index = None
+_shared_index_mtime = None
+_stale_warned_generation = None
+_shared_index_lock = threading.Lock()
+
+
+def get_community_index() -> Optional[CommunityIndex]:
+    """
+    Process-wide community index loaded from COMMUNITY_INDEX_PATH, or None.
+    Reloaded whenever the file changes on disk (e.g. `python -m src.communities`
+    next to a running API); a stale index is reported once per generation.
+    """
+    global _shared_index, _shared_index_mtime, _stale_warned_generation
+    if not Config.COMMUNITY_SUMMARIES_ENABLED:
+        return None
+    path = Config.COMMUNITY_INDEX_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    with _shared_index_lock:
+        if mtime != _shared_index_mtime:
+            _shared_index_mtime = mtime
+            _shared_index = None
+            if mtime is not None:
+                try:
+                    _shared_index = CommunityIndex.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"  ⚠️ Could not load community summaries: {e}")
+
+        generation = get_index_generation()
+        if (_shared_index is not None and _shared_index.generation != generation
+                and _stale_warned_generation != generation):
+            _stale_warned_generation = generation
+            print("  ⚠️ Community summaries predate the last ingestion - "
+                  "rerun `python -m src.communities`")
+        return _shared_index
+
+
+def main():
+    import argparse
+    from .graph_db import Neo4jService
+    from .llm_service import GeminiService
+
+    parser = argparse.ArgumentParser(description="Build community summaries for global questions")
+    parser.add_argument('--resolution', type=float, default=1.0,
+                        help="Louvain resolution; higher gives more, smaller communities")
+    args = parser.parse_args()
+
+    print("🏘️ Building movie communities...")
+    graphdb = None
+    try:
+        graphdb = Neo4jService()
+    except Exception as e:
+        print(f"  ⚠️ Neo4j unavailable ({e}), using crawled data")
+    engine = GraphEngine.load(graphdb)
+    if engine is None:
+        print("Error: no graph source available (Neo4j or crawled_data)")
+        return
+
+    index = build_communities(engine, GeminiService(), resolution=args.resolution)
+    index.save(Config.COMMUNITY_INDEX_PATH)
+    for community in index.communities[:5]:
+        print(f"  • {community['summary'][:160]}")
+    print(f"COMMUNITY SUMMARIES SAVED to {Config.COMMUNITY_INDEX_PATH}")
+    if graphdb:
+        graphdb.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,4 +24,91 @@ class Config:
     CHAT_MODEL = "models/gemini-2.5-flash"  # Stable, reliable model
     # Alternative: "models/gemini-2.0-flash-exp" for faster responses
     
-    VECTOR_SIZE = 768  # Embedding dimension (adjust to your embedding model)
\ No newline at end of file
+    VECTOR_SIZE = 768  # Embedding dimension (adjust to your embedding model)
+    EMBEDDING_BATCH_SIZE = 100  # Max texts per batchEmbedContents request (Gemini limit)
+
+    # Persistent embedding cache (SQLite, float32 blobs, LRU eviction)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+    # Process-wide Gemini rate limits per model (requests / tokens per minute)
+    RATE_LIMITS = {
+        EMBEDDING_MODEL: {
+            'rpm': int(os.getenv("EMBEDDING_RPM", "1500")),
+            'tpm': int(os.getenv("EMBEDDING_TPM", "1000000")),
+        },
+        CHAT_MODEL: {
+            'rpm': int(os.getenv("CHAT_RPM", "10")),
+            'tpm': int(os.getenv("CHAT_TPM", "250000")),
+        },
+    }
+
+    # Max concurrent in-flight async Gemini calls per GeminiService instance
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+    # Answer prompt token budgets (static prefix + history + retrieved context + question)
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+    PROMPT_HISTORY_TOKEN_BUDGET = int(os.getenv("PROMPT_HISTORY_TOKEN_BUDGET", "600"))
+
+    # Provider-side caching of the static prompt prefix (Gemini CachedContent).
+    # Off by default: the model must support caching and the prefix must meet its minimum size
+    PROMPT_PREFIX_CACHE_ENABLED = os.getenv("PROMPT_PREFIX_CACHE_ENABLED", "false").lower() == "true"
+    PROMPT_CACHE_TTL_MINUTES = int(os.getenv("PROMPT_CACHE_TTL_MINUTES", "60"))
+
+    # Bumped by ingestion; caches built from the indexes are invalidated when it changes
+    INDEX_GENERATION_PATH = os.getenv("INDEX_GENERATION_PATH", ".cache/index_generation")
+
+    # Semantic answer cache in front of GraphRAG.query
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+    # Per-branch timeouts (seconds) for the concurrent neural/symbolic hybrid retrieval
+    HYBRID_VECTOR_TIMEOUT = float(os.getenv("HYBRID_VECTOR_TIMEOUT", "8"))
+    HYBRID_GRAPH_TIMEOUT = float(os.getenv("HYBRID_GRAPH_TIMEOUT", "12"))
+
+    # Catalog gazetteer NER (built from crawled_data/movies, else Neo4j)
+    GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() == "true"
+    GAZETTEER_DATA_DIR = os.getenv("GAZETTEER_DATA_DIR", "crawled_data/movies")
+
+    # Neo4j ingestion: movies written per UNWIND transaction
+    GRAPH_WRITE_BATCH_SIZE = int(os.getenv("GRAPH_WRITE_BATCH_SIZE", "500"))
+
+    # Rendered per-movie graph context (LRU, invalidated by ingestion)
+    GRAPH_CONTEXT_CACHE_ENABLED = os.getenv("GRAPH_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+    GRAPH_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CONTEXT_CACHE_MAX_ENTRIES", "5000"))
+    GRAPH_CONTEXT_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CONTEXT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # In-process CSR graph for traversal queries (Neo4j stays the source of truth)
+    GRAPH_ENGINE_ENABLED = os.getenv("GRAPH_ENGINE_ENABLED", "true").lower() == "true"
+    GRAPH_ENGINE_DATA_DIR = os.getenv("GRAPH_ENGINE_DATA_DIR", "crawled_data/movies")
+    # Retry Neo4j this often while serving a crawled_data fallback (or nothing)
+    GRAPH_ENGINE_RETRY_SECONDS = float(os.getenv("GRAPH_ENGINE_RETRY_SECONDS", "60"))
+    PATH_FINDING_BUDGET_SECONDS = float(os.getenv("PATH_FINDING_BUDGET_SECONDS", "0.25"))
+    TRAVERSAL_BEAM_WIDTH = int(os.getenv("TRAVERSAL_BEAM_WIDTH", "25"))
+
+    # Graph branch of the hybrid retriever: "k_hop" traversal or "ppr" (Personalized PageRank)
+    GRAPH_RETRIEVAL_STRATEGY = os.getenv("GRAPH_RETRIEVAL_STRATEGY", "k_hop").lower()
+    PPR_ALPHA = float(os.getenv("PPR_ALPHA", "0.25"))
+    PPR_TOLERANCE = float(os.getenv("PPR_TOLERANCE", "1e-4"))
+    PPR_MAX_ITER = int(os.getenv("PPR_MAX_ITER", "50"))
+
+    # Precomputed community summaries for broad questions (python -m src.communities)
+    COMMUNITY_SUMMARIES_ENABLED = os.getenv("COMMUNITY_SUMMARIES_ENABLED", "true").lower() == "true"
+    COMMUNITY_INDEX_PATH = os.getenv("COMMUNITY_INDEX_PATH", ".cache/communities.json")
+
+    # Weighted reciprocal rank fusion of the hybrid retriever's sources:
+    # score = sum(weight / (FUSION_RRF_K + rank)) over the sources that found a candidate
+    FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", "60"))
+    FUSION_WEIGHT_VECTOR = float(os.getenv("FUSION_WEIGHT_VECTOR", "1.0"))
+    FUSION_WEIGHT_ENTITY = float(os.getenv("FUSION_WEIGHT_ENTITY", "1.0"))
+    FUSION_WEIGHT_GRAPH = float(os.getenv("FUSION_WEIGHT_GRAPH", "0.7"))
+    FUSION_WEIGHT_PATH = float(os.getenv("FUSION_WEIGHT_PATH", "1.2"))
+    FUSION_WEIGHT_COMMUNITY = float(os.getenv("FUSION_WEIGHT_COMMUNITY", "1.5"))
+    FUSION_MAX_CONTEXTS = int(os.getenv("FUSION_MAX_CONTEXTS", "10"))
+
+    # Vector search restricted by the query's year range and genres (payload indexes);
+    # falls back to an unfiltered search when the filtered one finds nothing
+    VECTOR_FILTERS_ENABLED = os.getenv("VECTOR_FILTERS_ENABLED", "true").lower() == "true"
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Persistent Embedding Cache
+Content-addressed on-disk cache for Gemini embeddings:
+- Key: (model, task_type, SHA-256 of normalized text)
+- Value: float32 vector stored as a compact SQLite blob
+- LRU eviction once the entry limit is exceeded
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Any
+
+from .config import Config
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embedding vectors"""
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivially different texts share an entry"""
+        return ' '.join(str(text).split())
+
+    @classmethod
+    def make_key(cls, model: str, task_type: str, text: str) -> str:
+        digest = hashlib.sha256(cls.normalize(text).encode('utf-8')).hexdigest()
+        return f"{model}|{task_type}|{digest}"
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array('f', vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array('f')
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for `texts`; returns a list aligned with input (None = miss)"""
+        keys = [self.make_key(model, task_type, text) for text in texts]
+        found = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            hits = sum(1 for key in keys if key in found)
+            self.stats['hits'] += hits
+            self.stats['misses'] += len(keys) - hits
+
+        return [self._decode(found[key]) if key in found else None for key in keys]
+
+    def get(self, model: str, task_type: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, task_type, [text])[0]
+
+    def put_many(self, model: str, task_type: str, texts: List[str],
+                 vectors: List[Optional[List[float]]]) -> None:
+        """Store vectors for `texts`, skipping failed (None) entries"""
+        now = time.time()
+        rows = [
+            (self.make_key(model, task_type, text), self._encode(vector), now)
+            for text, vector in zip(texts, vectors)
+            if vector
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self.stats['writes'] += self._conn.total_changes - before
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._evict_if_needed()
+
+    def put(self, model: str, task_type: str, text: str, vector: List[float]) -> None:
+        self.put_many(model, task_type, [text], [vector])
+
+    def _evict_if_needed(self) -> None:
+        """Drop least recently used entries beyond max_entries (lock held)"""
+        overflow = self._size - self.max_entries
+        if overflow <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        )
+        self._conn.commit()
+        self._size -= overflow
+        self.stats['evictions'] += overflow
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] / lookups * 100) if lookups > 0 else 0
+        return {
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses'],
+            'hit_rate': f"{hit_rate:.1f}%",
+            'writes': self.stats['writes'],
+            'evictions': self.stats['evictions'],
+            'size': self._size,
+            'max_entries': self.max_entries
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_cache_failed = False
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide embedding cache shared by every GeminiService instance.
+    Returns None if caching is disabled or the cache file cannot be opened.
+    """
+    global _shared_cache, _shared_cache_failed
+    if not Config.EMBEDDING_CACHE_ENABLED or _shared_cache_failed:
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = EmbeddingCache(
+                    Config.EMBEDDING_CACHE_PATH,
+                    max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Embedding cache disabled ({e})")
+                _shared_cache_failed = True
+                return None
+        return _shared_cache
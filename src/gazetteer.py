@@ -0,0 +1,448 @@
+"""
+Gazetteer NER
+Dictionary-based entity recognition over the movie catalog:
+- Aho-Corasick automaton over movie titles, original titles, person names
+  and genre names (plus Vietnamese / colloquial genre aliases)
+- Built from crawled_data/movies/*.json or, if that is missing, from Neo4j
+- One linear pass over the query, no LLM call; longest match wins
+- Refreshed incrementally: new movies go into a small delta automaton that is
+  merged into the main one once it grows. Automata are rebuilt under the lock
+  and swapped in, so lookups only ever read finished snapshots
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import Config
+from .index_version import get_index_generation
+
+
+# Vietnamese and colloquial aliases -> TMDB genre names
+GENRE_ALIASES = {
+    'Action': ['hành động', 'phim hành động', 'action'],
+    'Adventure': ['phiêu lưu', 'mạo hiểm'],
+    'Animation': ['hoạt hình', 'anime', 'cartoon'],
+    'Comedy': ['hài', 'hài hước', 'phim hài', 'hài kịch'],
+    'Crime': ['hình sự', 'tội phạm', 'băng đảng'],
+    'Documentary': ['tài liệu', 'phim tài liệu'],
+    'Drama': ['chính kịch', 'tâm lý', 'tâm lý xã hội'],
+    'Family': ['gia đình'],
+    'Fantasy': ['giả tưởng', 'kỳ ảo', 'thần thoại'],
+    'History': ['lịch sử', 'cổ trang'],
+    'Horror': ['kinh dị', 'phim ma', 'ma quái'],
+    'Music': ['âm nhạc', 'ca nhạc', 'nhạc kịch'],
+    'Mystery': ['bí ẩn', 'trinh thám', 'huyền bí'],
+    'Romance': ['lãng mạn', 'tình cảm', 'romantic'],
+    'Science Fiction': ['khoa học viễn tưởng', 'viễn tưởng', 'sci-fi', 'scifi', 'sci fi'],
+    'TV Movie': ['phim truyền hình'],
+    'Thriller': ['giật gân', 'ly kỳ', 'hồi hộp'],
+    'War': ['chiến tranh'],
+    'Western': ['miền tây', 'cao bồi'],
+}
+
+# How many billed cast members per movie become PERSON entries
+CAST_PER_MOVIE = 10
+
+# Single-word titles/names shorter than this are too ambiguous ("Up", "Her")
+MIN_SINGLE_WORD_LENGTH = 4
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse whitespace; diacritics are kept"""
+    return ' '.join(unicodedata.normalize('NFC', str(text)).casefold().split())
+
+
+def strip_diacritics(text: str) -> str:
+    """'kinh dị' -> 'kinh di' (for users typing Vietnamese without accents)"""
+    decomposed = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton mapping patterns to payload lists"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]  # (pattern length, payload)
+        self._built = True
+        self.size = 0
+
+    def add(self, pattern: str, payload: Any) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if not self._out[node]:
+            self.size += 1
+        self._out[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self) -> None:
+        """Compute failure links (BFS); called lazily before the first search"""
+        queue = deque()
+        self._fail[0] = 0
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every pattern occurrence in text"""
+        if not self._built:
+            self.build()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            out_node = node
+            while out_node:
+                for length, payload in self._out[out_node]:
+                    yield i - length + 1, i + 1, payload
+                out_node = self._fail[out_node]
+
+
+class Gazetteer:
+    """Catalog-backed NER; use get_gazetteer() for the shared instance"""
+
+    def __init__(self, data_dir: str = None, graphdb=None, delta_merge_size: int = 2000):
+        self.data_dir = data_dir or Config.GAZETTEER_DATA_DIR
+        self.graphdb = graphdb
+        self.delta_merge_size = delta_merge_size
+        self._lock = threading.Lock()
+
+        # Canonical entries: normalized pattern -> list of entries
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._base = AhoCorasick()
+        self._delta = AhoCorasick()
+        self._delta_patterns: List[str] = []
+
+        self._movie_ids = set()
+        self._file_mtimes: Dict[str, float] = {}
+        self.generation = None
+        self.source = None
+        self._refreshing = False
+
+        self.stats = {
+            'patterns': 0,
+            'movies': 0,
+            'lookups': 0,
+            'build_seconds': 0.0,
+            'refreshes': 0
+        }
+
+    # ------------------------------------------
+    # Building
+    # ------------------------------------------
+
+    def _add_pattern(self, surface: str, entry: Dict[str, Any]) -> None:
+        """Register `surface` for `entry`; new patterns wait in the delta list (lock held)"""
+        pattern = normalize(surface)
+        if not pattern:
+            return
+        if ' ' not in pattern and len(pattern) < MIN_SINGLE_WORD_LENGTH and entry['type'] != 'GENRE':
+            return
+        known = self._entries.setdefault(pattern, [])
+        if any(e['type'] == entry['type'] and e['id'] == entry['id'] for e in known):
+            return
+        known.append(entry)
+        if len(known) == 1:
+            self._delta_patterns.append(pattern)
+
+    def _add_genres(self) -> None:
+        for genre, aliases in GENRE_ALIASES.items():
+            entry = {'text': genre, 'type': 'GENRE', 'id': genre}
+            self._add_pattern(genre, entry)
+            for alias in aliases:
+                self._add_pattern(alias, entry)
+                plain = strip_diacritics(alias)
+                # Short stripped forms collide with ordinary words ("hai" = two)
+                if plain != alias and len(plain) >= 6:
+                    self._add_pattern(plain, entry)
+
+    def _add_movie(self, movie: Dict[str, Any], credits: Dict[str, Any] = None) -> None:
+        """Index one movie; accepts crawled TMDB objects and flat ingest records"""
+        movie_id = movie.get('tmdb_id') or movie.get('id') or movie.get('movie_id')
+        title = movie.get('title')
+        if title:
+            self._add_pattern(title, {'text': title, 'type': 'MOVIE', 'id': movie_id})
+        original = movie.get('original_title')
+        if original and original != title:
+            self._add_pattern(original, {'text': title or original, 'type': 'MOVIE', 'id': movie_id})
+
+        for genre in movie.get('genres') or []:
+            name = genre.get('name') if isinstance(genre, dict) else genre
+            if name:
+                self._add_pattern(name, {'text': name, 'type': 'GENRE', 'id': name})
+
+        names = []
+        if credits:
+            names.extend(c.get('name') for c in credits.get('cast', [])[:CAST_PER_MOVIE])
+            names.extend(c.get('name') for c in credits.get('crew', []) if c.get('job') == 'Director')
+        names.extend(movie.get('cast') or [])
+        if movie.get('director'):
+            names.append(movie['director'])
+        for name in names:
+            if name:
+                self._add_pattern(name, {'text': name, 'type': 'PERSON', 'id': name})
+
+        if movie_id is not None:
+            # Crawled ids are ints, ids written by ingest may be strings
+            self._movie_ids.add(str(movie_id))
+
+    def _publish_delta(self, force: bool = False) -> None:
+        """
+        Swap in freshly built automata for the pending delta patterns (lock held).
+        Once the delta is large (or `force`) it is folded into a new main automaton.
+        """
+        if self._delta_patterns and (force or len(self._delta_patterns) >= self.delta_merge_size):
+            base = AhoCorasick()
+            for pattern in self._entries:
+                base.add(pattern, pattern)
+            base.build()
+            self._base = base
+            self._delta = AhoCorasick()
+            self._delta_patterns = []
+            return
+        delta = AhoCorasick()
+        for pattern in self._delta_patterns:
+            delta.add(pattern, pattern)
+        delta.build()
+        self._delta = delta
+
+    @staticmethod
+    def _read_crawled_files(paths: List[str]) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """(path, mtime, data) for every readable crawled movie file"""
+        loaded = []
+        for path in paths:
+            try:
+                mtime = os.path.getmtime(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ Gazetteer skipped {path}: {e}")
+                continue
+            loaded.append((path, mtime, data))
+        return loaded
+
+    def _add_crawled_files(self, files: List[Tuple[str, float, Dict[str, Any]]]) -> int:
+        for path, mtime, data in files:
+            self._file_mtimes[path] = mtime
+            self._add_movie(data.get('movie', data), data.get('credits'))
+        return len(files)
+
+    # Pattern comprehensions keep one row per movie (no genre x cast x director rows)
+    NEO4J_MOVIES_QUERY = """
+    MATCH (m:Movie)
+    WHERE NOT toString(m.id) IN $exclude_ids
+    RETURN m.id AS id, m.title AS title,
+           [(m)-[:BELONGS_TO]->(g:Genre) | g.name] AS genres,
+           [(p:Person)-[:ACTED_IN]->(m) | p.name] AS cast,
+           head([(d:Person)-[:DIRECTED]->(m) | d.name]) AS director
+    """
+
+    def _fetch_from_neo4j(self, exclude_ids: List[str]) -> List[Dict[str, Any]]:
+        """Movies not in `exclude_ids` (compared as strings) as flat records"""
+        with self.graphdb.driver.session() as session:
+            return [dict(record) for record in session.run(self.NEO4J_MOVIES_QUERY, exclude_ids=exclude_ids)]
+
+    def build(self) -> 'Gazetteer':
+        """Full build from crawled_data (preferred) or Neo4j"""
+        start = time.perf_counter()
+        with self._lock:
+            self._entries = {}
+            self._base = AhoCorasick()
+            self._delta = AhoCorasick()
+            self._delta_patterns = []
+            self._movie_ids = set()
+            self._file_mtimes = {}
+
+            self._add_genres()
+            paths = sorted(glob.glob(os.path.join(self.data_dir, '*.json')))
+            if paths:
+                self.source = 'crawled_data'
+                self._add_crawled_files(self._read_crawled_files(paths))
+            elif self.graphdb is not None:
+                self.source = 'neo4j'
+                try:
+                    for record in self._fetch_from_neo4j([]):
+                        self._add_movie(record)
+                except Exception as e:
+                    print(f"  ⚠️ Gazetteer could not read Neo4j: {e}")
+            self._publish_delta(force=True)
+            self.generation = get_index_generation()
+
+            self.stats['patterns'] = len(self._entries)
+            self.stats['movies'] = len(self._movie_ids)
+            self.stats['build_seconds'] = time.perf_counter() - start
+        print(f"  ✓ Gazetteer: {self.stats['patterns']} patterns from {self.stats['movies']} movies "
+              f"({self.source or 'genres only'}, {self.stats['build_seconds']:.2f}s)")
+        return self
+
+    def add_movies(self, movies: List[Dict[str, Any]]) -> None:
+        """Incrementally index newly ingested movies (flat or crawled format)"""
+        with self._lock:
+            for movie in movies:
+                if 'movie' in movie:
+                    self._add_movie(movie['movie'], movie.get('credits'))
+                else:
+                    self._add_movie(movie)
+            self._publish_delta()
+            self.stats['patterns'] = len(self._entries)
+            self.stats['movies'] = len(self._movie_ids)
+
+    def refresh(self) -> None:
+        """
+        Pick up movies added since the last build (new/changed files or Neo4j nodes).
+        Files and Neo4j are read without the lock; only indexing holds it.
+        """
+        generation = get_index_generation()
+        with self._lock:
+            file_mtimes = dict(self._file_mtimes)
+            known_ids = list(self._movie_ids)
+
+        changed = []
+        for path in glob.glob(os.path.join(self.data_dir, '*.json')):
+            try:
+                if file_mtimes.get(path) != os.path.getmtime(path):
+                    changed.append(path)
+            except OSError:
+                continue
+        files = self._read_crawled_files(changed)
+        records = []
+        if self.graphdb is not None:
+            try:
+                records = self._fetch_from_neo4j(known_ids)
+            except Exception as e:
+                print(f"  ⚠️ Gazetteer refresh from Neo4j failed: {e}")
+
+        with self._lock:
+            added = self._add_crawled_files(files)
+            for record in records:
+                self._add_movie(record)
+            added += len(records)
+            self._publish_delta()
+            self.generation = generation
+            self.stats['patterns'] = len(self._entries)
+            self.stats['movies'] = len(self._movie_ids)
+            self.stats['refreshes'] += 1
+        if added:
+            print(f"  ✓ Gazetteer refreshed with {added} movies")
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"  ⚠️ Gazetteer refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _schedule_refresh(self) -> None:
+        """Start one background refresh; lookups keep using the current snapshot"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True,
+                         name="gazetteer-refresh").start()
+
+    # ------------------------------------------
+    # Lookup
+    # ------------------------------------------
+
+    def extract(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Entities in `query` as QueryProcessor entities
+        ({'text', 'type', 'confidence', 'source', 'id', 'span'}).
+        Overlapping matches resolve to the longest, then leftmost, one.
+        A generation change schedules a background refresh; this lookup is not held up.
+        """
+        if self.generation is not None and get_index_generation() != self.generation:
+            self._schedule_refresh()
+
+        text = normalize(query)
+        with self._lock:
+            base, delta, entries = self._base, self._delta, self._entries
+            self.stats['lookups'] += 1
+
+        candidates = []
+        for automaton in (base, delta):
+            for start, end, pattern in automaton.iter_matches(text):
+                # Whole words only
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum():
+                    continue
+                candidates.append((start, end, pattern))
+
+        candidates.sort(key=lambda c: (-(c[1] - c[0]), c[0]))
+        taken = []
+        entities = []
+        for start, end, pattern in candidates:
+            if any(start < t_end and t_start < end for t_start, t_end in taken):
+                continue
+            taken.append((start, end))
+            multi_word = ' ' in pattern
+            for entry in list(entries.get(pattern, [])):
+                entities.append({
+                    'text': entry['text'],
+                    'type': entry['type'],
+                    'confidence': 0.95 if multi_word or entry['type'] == 'GENRE' else 0.75,
+                    'source': 'gazetteer',
+                    'id': entry['id'],
+                    'span': (start, end)
+                })
+
+        entities.sort(key=lambda e: e['span'][0])
+        return entities
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'source': self.source, 'generation': self.generation}
+
+
+_shared_gazetteer = None
+_shared_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer(graphdb=None) -> Optional[Gazetteer]:
+    """
+    Process-wide gazetteer, built on first use. Returns None if disabled.
+    `graphdb` is used as a source (and for refreshes) when crawled_data is absent.
+    """
+    global _shared_gazetteer
+    if not Config.GAZETTEER_ENABLED:
+        return None
+    with _shared_gazetteer_lock:
+        if _shared_gazetteer is None:
+            _shared_gazetteer = Gazetteer(graphdb=graphdb).build()
+        elif graphdb is not None and _shared_gazetteer.graphdb is None:
+            _shared_gazetteer.graphdb = graphdb
+        return _shared_gazetteer
+
+
+def peek_gazetteer() -> Optional[Gazetteer]:
+    """The shared gazetteer if this process already built one (never builds)"""
+    return _shared_gazetteer
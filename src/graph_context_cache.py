@@ -0,0 +1,145 @@
+"""
+Graph Context Cache
+Bounded LRU of rendered per-movie context blocks (title, synopsis, director
+works, cast) so popular movies aren't re-enriched from Neo4j on every query:
+- Key: movie ID; each entry records the index generation it was rendered at
+- Entries from an older generation are treated as misses and dropped
+- Ingestion invalidates the IDs it rewrites plus their director's other
+  movies (in-process) and bumps the generation (other processes)
+- Bounded by entry count and rendered bytes; exports hit ratio and bytes used
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .config import Config
+from .index_version import get_index_generation
+
+
+class GraphContextCache:
+    """Process-wide LRU of rendered movie blocks; use get_graph_context_cache()"""
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # movie key -> (generation, year, block, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[int, Any, str, int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def _key(movie_id) -> str:
+        # Retrievers hand over ints or strings for the same movie
+        return str(movie_id)
+
+    def _remove(self, key: str) -> None:
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def lookup_many(self, movie_ids: Iterable) -> Tuple[Dict[str, Tuple[Any, str]], List]:
+        """
+        Split `movie_ids` into cached blocks and misses.
+
+        Returns:
+            ({movie key: (year, block)}, [movie ids to fetch])
+        """
+        generation = get_index_generation()
+        hits, misses = {}, []
+        with self._lock:
+            for movie_id in movie_ids:
+                key = self._key(movie_id)
+                if key in hits:
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] != generation:
+                    self._remove(key)
+                    self.stats['invalidations'] += 1
+                    entry = None
+                if entry is None:
+                    self.stats['misses'] += 1
+                    misses.append(movie_id)
+                    continue
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                hits[key] = (entry[1], entry[2])
+        return hits, misses
+
+    def store(self, movie_id, year, block: str, generation: Optional[int] = None) -> None:
+        """
+        Cache a rendered block. Pass the generation read *before* querying Neo4j
+        so a block fetched during an ingestion isn't stamped with the new generation.
+        """
+        if generation is None:
+            generation = get_index_generation()
+        key = self._key(movie_id)
+        size = len(block.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, year, block, size)
+            self._bytes += size
+            self.stats['stores'] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, movie_ids: Iterable) -> int:
+        """Drop cached blocks for movies that were just rewritten"""
+        removed = 0
+        with self._lock:
+            for movie_id in movie_ids:
+                key = self._key(movie_id)
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            self.stats['invalidations'] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_ratio = (self.stats['hits'] / lookups) if lookups > 0 else 0.0
+        return {
+            **self.stats,
+            'hit_ratio': round(hit_ratio, 4),
+            'size': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes
+        }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_graph_context_cache() -> Optional[GraphContextCache]:
+    """Process-wide cache shared by every Neo4jService, or None if disabled"""
+    global _shared_cache
+    if not Config.GRAPH_CONTEXT_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = GraphContextCache(
+                max_entries=Config.GRAPH_CONTEXT_CACHE_MAX_ENTRIES,
+                max_bytes=Config.GRAPH_CONTEXT_CACHE_MAX_BYTES
+            )
+        return _shared_cache
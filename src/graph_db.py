@@ -1,117 +1,271 @@
 from neo4j import GraphDatabase
 from .config import Config
+from .graph_context_cache import get_graph_context_cache
+from .index_version import get_index_generation
+
+# Uniqueness constraints back every MERGE and `m.id IN $movie_ids` lookup
+SCHEMA_CONSTRAINTS = {
+    'movie_id_unique': "CREATE CONSTRAINT movie_id_unique IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
+    'person_name_unique': "CREATE CONSTRAINT person_name_unique IF NOT EXISTS FOR (p:Person) REQUIRE p.name IS UNIQUE",
+    'genre_name_unique': "CREATE CONSTRAINT genre_name_unique IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+}
+
+SCHEMA_INDEXES = {
+    'movie_year': "CREATE INDEX movie_year IF NOT EXISTS FOR (m:Movie) ON (m.year)",
+}
+
+
+def apply_schema(driver, fulltext_indexes, wait_seconds=0):
+    """
+    Create constraints and indexes on `driver` (idempotent) and report index states.
+
+    Returns:
+        {'created': [names], 'errors': {name: message},
+         'indexes': {name: state}, 'online': [names], 'pending': [names]}
+    """
+    statements = dict(SCHEMA_CONSTRAINTS)
+    statements.update(SCHEMA_INDEXES)
+    for name, (label, prop) in fulltext_indexes.items():
+        statements[name] = (
+            f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON EACH [n.{prop}]"
+        )
+
+    report = {'created': [], 'errors': {}, 'indexes': {}, 'online': [], 'pending': []}
+    with driver.session() as session:
+        for name, statement in statements.items():
+            try:
+                summary = session.run(statement).consume()
+                counters = summary.counters
+                if counters.constraints_added or counters.indexes_added:
+                    report['created'].append(name)
+            except Exception as e:
+                # e.g. duplicate nodes prevent a uniqueness constraint
+                report['errors'][name] = str(e)
+
+        if wait_seconds:
+            try:
+                session.run("CALL db.awaitIndexes($seconds)", seconds=wait_seconds).consume()
+            except Exception as e:
+                print(f"⚠️ Timed out waiting for indexes: {e}")
+
+        records = session.run("SHOW INDEXES YIELD name, state")
+        report['indexes'] = {record['name']: record['state'] for record in records}
+
+    for name in statements:
+        # Constraints are backed by an index of the same name
+        state = report['indexes'].get(name)
+        if state == 'ONLINE':
+            report['online'].append(name)
+        elif name not in report['errors']:
+            report['pending'].append(name)
+    return report
+
 
 class Neo4jService:
+    # Full-text indexes used for entity linking: index name -> (label, property)
+    FULLTEXT_INDEXES = {
+        'movie_title_fulltext': ('Movie', 'title'),
+        'person_name_fulltext': ('Person', 'name'),
+        'genre_name_fulltext': ('Genre', 'name'),
+    }
+
     def __init__(self):
         self.driver = GraphDatabase.driver(
             Config.NEO4J_URI, 
             auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD)
         )
+        self.context_cache = get_graph_context_cache()
 
     def close(self):
         self.driver.close()
 
-    def add_movie_data(self, movie):
-        # Create Movie node, Person nodes (director/actors) and Genre relationships
-        query = """
-        MERGE (m:Movie {id: $id})
-        SET m.title = $title,
-            m.year = $year,
-            m.overview = $overview
-
-        // Genres
-        WITH m
-        UNWIND $genres AS g_name
+    def ensure_schema(self, wait_seconds=0):
+        """
+        Idempotently create uniqueness constraints (Movie.id, Person.name,
+        Genre.name), the Movie.year range index and the full-text linking
+        indexes, then print and return which indexes are online.
+        """
+        report = apply_schema(self.driver, self.FULLTEXT_INDEXES, wait_seconds=wait_seconds)
+
+        if report['created']:
+            print(f"  ✓ Neo4j schema created: {', '.join(report['created'])}")
+        print(f"  ✓ Neo4j indexes online: {len(report['online'])}/{len(report['online']) + len(report['pending']) + len(report['errors'])}")
+        if report['pending']:
+            print(f"  ⏳ Still populating: {', '.join(report['pending'])}")
+        for name, error in report['errors'].items():
+            print(f"  ⚠️ Could not create {name}: {error[:120]}")
+        return report
+
+    # One row per movie; unit subqueries keep the outer row when a list is empty.
+    # Also returns the other movies of each written movie's director: their
+    # cached "Director's other works" line may now be stale
+    WRITE_MOVIES_QUERY = """
+    UNWIND $movies AS row
+    MERGE (m:Movie {id: row.id})
+    SET m.title = row.title,
+        m.year = row.year,
+        m.overview = row.overview
+
+    WITH m, row
+    CALL {
+        WITH m, row
+        UNWIND row.genres AS g_name
         MERGE (g:Genre {name: g_name})
         MERGE (m)-[:BELONGS_TO]->(g)
-
-        // Cast
-        WITH m
-        UNWIND $cast AS actor_name
+    }
+    CALL {
+        WITH m, row
+        UNWIND row.cast AS actor_name
         MERGE (p:Person {name: actor_name})
         MERGE (p)-[:ACTED_IN]->(m)
+    }
+    CALL {
+        WITH m, row
+        WITH m, row
+        WHERE row.director IS NOT NULL
+        MERGE (d:Person {name: row.director})
+        MERGE (d)-[:DIRECTED]->(m)
+    }
+    WITH m
+    OPTIONAL MATCH (m)<-[:DIRECTED]-(:Person)-[:DIRECTED]->(other:Movie)
+    WHERE other <> m
+    RETURN count(DISTINCT m) AS written, collect(DISTINCT other.id) AS co_directed
+    """
 
-        // Director
-        WITH m
-        WITH m, $director AS director_name
-        CALL {
-            WITH director_name, m
-            WHERE director_name IS NOT NULL
-            MERGE (d:Person {name: director_name})
-            MERGE (d)-[:DIRECTED]->(m)
-            RETURN d
+    @staticmethod
+    def _movie_row(movie):
+        year_str = movie.get("release_date", "")
+        year = year_str[:4] if year_str and len(year_str) >= 4 else movie.get('year', 'Unknown')
+        return {
+            'id': movie.get("tmdb_id") or movie.get("id"),
+            'title': movie.get("title", "Untitled"),
+            'year': year,
+            'overview': movie.get("overview", ""),
+            'genres': [g for g in (movie.get("genres") or []) if g],
+            'cast': [c for c in (movie.get("cast") or []) if c],
+            'director': movie.get("director") or None,
         }
-        RETURN m
+
+    def _write_movie_rows(self, rows):
+        # execute_write retries transient errors (deadlocks on shared Person/Genre
+        # nodes, leader switches) with backoff before giving up
+        def work(tx):
+            record = tx.run(self.WRITE_MOVIES_QUERY, movies=rows).single()
+            return record['written'], record['co_directed']
+
+        with self.driver.session() as session:
+            written, co_directed = session.execute_write(work)
+        if self.context_cache:
+            self.context_cache.invalidate([row['id'] for row in rows] + list(co_directed))
+        return written
+
+    def add_movie_data(self, movie):
+        # Create Movie node, Person nodes (director/actors) and Genre relationships
+        self._write_movie_rows([self._movie_row(movie)])
+
+    def add_movies_batch(self, movies, batch_size=None):
         """
+        Write movies in one UNWIND transaction per batch.
+        A batch that still fails after the driver's retries is written movie by
+        movie so one bad record doesn't drop its neighbours.
 
-        year_str = movie.get("release_date", "")
-        year = year_str[:4] if year_str and len(year_str) >= 4 else movie.get('year', 'Unknown')
+        Returns:
+            {'written': int, 'batches': int, 'failed': [movie ids]}
+        """
+        batch_size = batch_size or Config.GRAPH_WRITE_BATCH_SIZE
+        rows = [self._movie_row(movie) for movie in movies]
+        rows = [row for row in rows if row['id'] is not None]
+
+        report = {'written': 0, 'batches': 0, 'failed': []}
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            report['batches'] += 1
+            try:
+                report['written'] += self._write_movie_rows(batch)
+                continue
+            except Exception as e:
+                print(f"  ⚠️ Graph batch of {len(batch)} failed ({e}), writing one by one")
+
+            for row in batch:
+                try:
+                    report['written'] += self._write_movie_rows([row])
+                except Exception as e:
+                    print(f"  ⚠️ Error writing movie '{row['title']}': {e}")
+                    report['failed'].append(row['id'])
+        return report
 
+    # One row per movie: pattern comprehensions are evaluated per movie and
+    # sliced, so genres x directors x cast x filmographies never multiply into rows
+    GRAPH_CONTEXT_QUERY = """
+    MATCH (m:Movie) WHERE m.id IN $movie_ids
+    RETURN m.id as Id,
+           m.title as Title,
+           m.year as Year,
+           m.overview as Overview,
+           head([(d:Person)-[:DIRECTED]->(m) | d.name]) as Director,
+           [(m)-[:BELONGS_TO]->(g:Genre) | g.name] as Genres,
+           [(p:Person)-[:ACTED_IN]->(m) | p.name][..$cast_limit] as Cast,
+           // Other movies by the same director (for thematic context)
+           [(m)<-[:DIRECTED]-(:Person)-[:DIRECTED]->(other:Movie)
+               WHERE other <> m | other.title][..$works_limit] as DirectorWorks
+    ORDER BY m.year DESC
+    """
+
+    CAST_LIMIT = 8
+    DIRECTOR_WORKS_LIMIT = 4
+
+    @staticmethod
+    def _render_context(record):
+        # Build rich context with multiple details
+        info = f"**{record['Title']}** ({record['Year']})\n"
+
+        if record['Overview'] and len(record['Overview'].strip()) > 10:
+            # Include brief synopsis
+            overview = record['Overview'].strip()
+            if len(overview) > 200:
+                overview = overview[:200] + "..."
+            info += f"About: {overview}\n"
+
+        if record['Director']:
+            info += f"Director: {record['Director']}\n"
+            director_works = record['DirectorWorks']
+            if director_works:
+                info += f"Director's other works: {', '.join(director_works[:3])}\n"
+
+        if record['Genres']:
+            info += f"Genres: {', '.join(record['Genres'])}\n"
+
+        if record['Cast']:
+            # Show notable cast
+            top_cast = record['Cast'][:5]
+            info += f"Starring: {', '.join(top_cast)}\n"
+
+        return info
+
+    def _fetch_context_records(self, movie_ids):
         with self.driver.session() as session:
-            session.run(query,
-                        id=movie.get("tmdb_id") or movie.get("id"),
-                        title=movie.get("title", "Untitled"),
-                        year=year,
-                        overview=movie.get("overview", ""),
-                        genres=movie.get("genres", []),
-                        cast=movie.get("cast", []),
-                        director=movie.get("director")
-            )
+            return list(session.run(
+                self.GRAPH_CONTEXT_QUERY,
+                movie_ids=movie_ids,
+                cast_limit=self.CAST_LIMIT,
+                works_limit=self.DIRECTOR_WORKS_LIMIT
+            ))
 
     def get_graph_context(self, movie_ids):
         # Retrieve enriched context with director, cast, genres, synopsis, and related works
-        query = """
-        MATCH (m:Movie) WHERE m.id IN $movie_ids
-        OPTIONAL MATCH (m)-[:BELONGS_TO]->(g:Genre)
-        OPTIONAL MATCH (d:Person)-[:DIRECTED]->(m)
-        OPTIONAL MATCH (p:Person)-[:ACTED_IN]->(m)
-
-        // Find other movies by same director (for thematic context)
-        OPTIONAL MATCH (d)-[:DIRECTED]->(other:Movie)
-        WHERE other.id <> m.id
-
-        // Find co-stars for casting context
-        OPTIONAL MATCH (p)-[:ACTED_IN]->(otherFilm:Movie)
-        WHERE otherFilm.id <> m.id
-
-        RETURN m.title as Title,
-               m.year as Year,
-               m.overview as Overview,
-               d.name as Director,
-               collect(DISTINCT g.name) as Genres,
-               collect(DISTINCT p.name)[..8] as Cast,
-               collect(DISTINCT other.title)[..4] as DirectorWorks
-        ORDER BY m.year DESC
-        """
+        if not self.context_cache:
+            records = self._fetch_context_records(movie_ids)
+            return "\n".join(self._render_context(record) for record in records)
 
-        results = []
-        with self.driver.session() as session:
-            data = session.run(query, movie_ids=movie_ids)
-            for record in data:
-                # Build rich context with multiple details
-                info = f"**{record['Title']}** ({record['Year']})\n"
-                
-                if record['Overview'] and len(record['Overview'].strip()) > 10:
-                    # Include brief synopsis
-                    overview = record['Overview'].strip()
-                    if len(overview) > 200:
-                        overview = overview[:200] + "..."
-                    info += f"About: {overview}\n"
-                
-                if record['Director']:
-                    info += f"Director: {record['Director']}\n"
-                    director_works = record['DirectorWorks']
-                    if director_works:
-                        info += f"Director's other works: {', '.join(director_works[:3])}\n"
-                
-                if record['Genres']:
-                    info += f"Genres: {', '.join(record['Genres'])}\n"
-                
-                if record['Cast']:
-                    # Show notable cast
-                    top_cast = record['Cast'][:5]
-                    info += f"Starring: {', '.join(top_cast)}\n"
-                
-                results.append(info)
-
-        return "\n".join(results)
\ No newline at end of file
+        # Only movies missing from the rendered-block cache go to Neo4j, in one query
+        generation = get_index_generation()
+        blocks, misses = self.context_cache.lookup_many(movie_ids)
+        if misses:
+            for record in self._fetch_context_records(misses):
+                block = self._render_context(record)
+                self.context_cache.store(record['Id'], record['Year'], block, generation)
+                blocks[str(record['Id'])] = (record['Year'], block)
+
+        # Same order as the query's ORDER BY m.year DESC
+        ordered = sorted(blocks.values(), key=lambda item: str(item[0] or ''), reverse=True)
+        return "\n".join(block for _, block in ordered)
@@ -0,0 +1,589 @@
+"""
+In-Process Graph Engine
+Read-only copy of the Movie/Person/Genre graph for traversal queries:
+- NumPy CSR adjacency per relationship type, in both directions
+- Node label/key/name arrays; keys are Movie.id or Person/Genre name, as in Cypher
+- Loaded from Neo4j (source of truth) or, if that fails, crawled_data/movies;
+  such a fallback snapshot is provisional and Neo4j is retried on a timer
+- Rebuilt in the background when the index generation changes (ingestion);
+  the previous snapshot keeps serving until the new one is ready
+Answers k-hop, relationship and path queries without a Cypher round trip.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import numpy as np
+
+from .config import Config
+from .index_version import get_index_generation
+
+
+LABELS = ('Movie', 'Person', 'Genre')
+REL_TYPES = ('ACTED_IN', 'DIRECTED', 'BELONGS_TO')
+CAST_PER_MOVIE = 10
+
+# Path finding doesn't pass *through* nodes above these degrees (endpoints are
+# exempt): "both are Dramas" is not a useful connection
+PATH_DEGREE_CAPS = {'Genre': 50, 'Person': 500}
+
+# k-hop expansion returns hub nodes but only expands through them from the seeds
+# (e.g. a Genre reached at hop 1 is not expanded into every movie of that genre)
+EXPANSION_DEGREE_CAPS = {'Genre': 50, 'Person': 200}
+
+# Random-walk edge weights for Personalized PageRank: genre edges are weak
+# evidence that two movies are related, people are strong evidence
+PPR_REL_WEIGHTS = {'ACTED_IN': 1.0, 'DIRECTED': 1.5, 'BELONGS_TO': 0.25}
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def _build_csr(src: np.ndarray, dst: np.ndarray, n_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, indices) with the neighbors of node i in indices[indptr[i]:indptr[i+1]]"""
+    order = np.argsort(src, kind='stable')
+    indices = dst[order].astype(np.int32)
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    return indptr, indices
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized CSR row gather: (owner of each edge, neighbor) for all frontier rows"""
+    starts = indptr[frontier]
+    lengths = indptr[frontier + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return _EMPTY, _EMPTY
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(frontier, lengths), indices[np.repeat(starts, lengths) + offsets]
+
+
+class GraphBuilder:
+    """Collects nodes/edges from any source before freezing them into a GraphEngine"""
+
+    def __init__(self):
+        self.labels: List[int] = []
+        self.keys: List[Any] = []
+        self.names: List[str] = []
+        self.years: Dict[int, int] = {}
+        self._index: Dict[Tuple[int, str], int] = {}
+        self.edges: Dict[str, Tuple[List[int], List[int]]] = {rel: ([], []) for rel in REL_TYPES}
+
+    def add_node(self, label: str, key, name: str = None) -> int:
+        label_id = LABELS.index(label)
+        index_key = (label_id, str(key))
+        index = self._index.get(index_key)
+        if index is None:
+            index = len(self.keys)
+            self._index[index_key] = index
+            self.labels.append(label_id)
+            self.keys.append(key)
+            self.names.append(name if name is not None else str(key))
+        elif name and self.names[index] == str(key):
+            self.names[index] = name
+        return index
+
+    def set_year(self, index: int, year) -> None:
+        """Release year of a Movie node (ignored if missing or malformed)"""
+        try:
+            self.years[index] = int(str(year)[:4])
+        except (TypeError, ValueError):
+            pass
+
+    def add_edge(self, src: int, rel: str, dst: int) -> None:
+        if rel in self.edges:
+            sources, targets = self.edges[rel]
+            sources.append(src)
+            targets.append(dst)
+
+    def add_movie(self, movie: Dict[str, Any], credits: Dict[str, Any] = None) -> None:
+        """Add one crawled TMDB movie (or flat ingest record) with its genres and people"""
+        movie_id = movie.get('tmdb_id') or movie.get('id') or movie.get('movie_id')
+        if movie_id is None:
+            return
+        m = self.add_node('Movie', movie_id, movie.get('title'))
+        self.set_year(m, movie.get('release_date') or movie.get('year'))
+
+        for genre in movie.get('genres') or []:
+            name = genre.get('name') if isinstance(genre, dict) else genre
+            if name:
+                self.add_edge(m, 'BELONGS_TO', self.add_node('Genre', name))
+
+        cast = list(movie.get('cast') or [])
+        directors = [movie['director']] if movie.get('director') else []
+        if credits:
+            cast.extend(c.get('name') for c in credits.get('cast', [])[:CAST_PER_MOVIE])
+            directors.extend(c.get('name') for c in credits.get('crew', []) if c.get('job') == 'Director')
+        for name in dict.fromkeys(cast):
+            if name:
+                self.add_edge(self.add_node('Person', name), 'ACTED_IN', m)
+        for name in dict.fromkeys(directors):
+            if name:
+                self.add_edge(self.add_node('Person', name), 'DIRECTED', m)
+
+
+class GraphEngine:
+    """Immutable CSR snapshot of the movie graph; use get_graph_engine()"""
+
+    def __init__(self, builder: GraphBuilder, source: str = None, generation: int = 0):
+        self.source = source
+        self.generation = generation
+        # True when Neo4j was configured but unreadable and crawled_data stood in
+        self.provisional = False
+        self.built_at = time.monotonic()
+        self.n_nodes = len(builder.keys)
+        self.labels = np.asarray(builder.labels, dtype=np.int8)
+        self.keys = builder.keys
+        self.names = builder.names
+        # Release year per node (0 = unknown / not a movie)
+        self.years = np.zeros(self.n_nodes, dtype=np.int16)
+        for index, year in builder.years.items():
+            self.years[index] = year
+
+        # Cypher matched `n.id IN $ids OR n.name IN $ids`, so a key may hit several labels
+        self._lookup: Dict[str, List[int]] = {}
+        self._lookup_folded: Dict[str, List[int]] = {}
+        for index, key in enumerate(self.keys):
+            self._lookup.setdefault(str(key), []).append(index)
+            self._lookup_folded.setdefault(str(key).casefold(), []).append(index)
+
+        # rel type -> {'out': (indptr, indices), 'in': (indptr, indices)}
+        self.adjacency: Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+        self.edge_counts: Dict[str, int] = {}
+        for rel, (sources, targets) in builder.edges.items():
+            src = np.asarray(sources, dtype=np.int64)
+            dst = np.asarray(targets, dtype=np.int64)
+            self.adjacency[rel] = {
+                'out': _build_csr(src, dst, self.n_nodes),
+                'in': _build_csr(dst, src, self.n_nodes),
+            }
+            self.edge_counts[rel] = len(sources)
+
+        self.degrees = np.zeros(self.n_nodes, dtype=np.int64)
+        for directions in self.adjacency.values():
+            for indptr, _ in directions.values():
+                self.degrees += np.diff(indptr)
+
+        # Transition matrices for PPR, built on first use per rel-type set
+        self._transitions: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    # ------------------------------------------
+    # Loading
+    # ------------------------------------------
+
+    @classmethod
+    def from_neo4j(cls, graphdb, generation: int = 0) -> 'GraphEngine':
+        nodes_query = """
+        MATCH (n) WHERE n:Movie OR n:Person OR n:Genre
+        RETURN elementId(n) AS eid,
+               CASE WHEN n:Movie THEN 'Movie' WHEN n:Person THEN 'Person' ELSE 'Genre' END AS label,
+               COALESCE(n.id, n.name) AS key,
+               COALESCE(n.title, n.name) AS name,
+               n.year AS year
+        """
+        edges_query = """
+        MATCH (a)-[r:ACTED_IN|DIRECTED|BELONGS_TO]->(b)
+        RETURN elementId(a) AS src, type(r) AS rel, elementId(b) AS dst
+        """
+        builder = GraphBuilder()
+        by_element = {}
+        with graphdb.driver.session() as session:
+            for record in session.run(nodes_query):
+                if record['key'] is not None:
+                    index = builder.add_node(record['label'], record['key'], record['name'])
+                    by_element[record['eid']] = index
+                    if record['label'] == 'Movie':
+                        builder.set_year(index, record['year'])
+            for record in session.run(edges_query):
+                src, dst = by_element.get(record['src']), by_element.get(record['dst'])
+                if src is not None and dst is not None:
+                    builder.add_edge(src, record['rel'], dst)
+        return cls(builder, source='neo4j', generation=generation)
+
+    @classmethod
+    def from_crawled_data(cls, data_dir: str, generation: int = 0) -> 'GraphEngine':
+        builder = GraphBuilder()
+        for path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ Graph engine skipped {path}: {e}")
+                continue
+            builder.add_movie(data.get('movie', data), data.get('credits'))
+        return cls(builder, source='crawled_data', generation=generation)
+
+    @classmethod
+    def load(cls, graphdb=None, data_dir: str = None) -> Optional['GraphEngine']:
+        """
+        Neo4j first (source of truth), crawled_data as a fallback. The fallback
+        is marked provisional when Neo4j was configured but could not be read.
+        """
+        generation = get_index_generation()
+        if graphdb is not None:
+            try:
+                return cls.from_neo4j(graphdb, generation)
+            except Exception as e:
+                print(f"  ⚠️ Graph engine could not read Neo4j: {e}")
+        data_dir = data_dir or Config.GRAPH_ENGINE_DATA_DIR
+        if glob.glob(os.path.join(data_dir, '*.json')):
+            engine = cls.from_crawled_data(data_dir, generation)
+            engine.provisional = graphdb is not None
+            return engine
+        return None
+
+    # ------------------------------------------
+    # Helpers
+    # ------------------------------------------
+
+    def lookup(self, keys: Iterable) -> np.ndarray:
+        """Node indices for Movie ids / Person or Genre names"""
+        found = []
+        for key in keys:
+            if key is not None:
+                # Exact key first; entity text from users is often differently cased
+                found.extend(self._lookup.get(str(key)) or self._lookup_folded.get(str(key).casefold(), ()))
+        return np.unique(np.asarray(found, dtype=np.int64))
+
+    def node(self, index: int) -> Dict[str, Any]:
+        return {'type': LABELS[self.labels[index]], 'name': self.names[index], 'id': self.keys[index]}
+
+    def _rel_types(self, rel_types: Optional[Iterable[str]]) -> List[str]:
+        if rel_types is None:
+            return list(self.adjacency)
+        return [rel for rel in rel_types if rel in self.adjacency]
+
+    def _neighbor_edges(self, frontier: np.ndarray, rel_types: Iterable[str] = None) -> np.ndarray:
+        """Neighbor of every edge (either direction) leaving the frontier; repeats kept"""
+        found = []
+        for rel in self._rel_types(rel_types):
+            for direction in ('out', 'in'):
+                _, targets = _gather(*self.adjacency[rel][direction], frontier)
+                found.append(targets)
+        if not found:
+            return _EMPTY
+        return np.concatenate(found)
+
+    def neighbors(self, frontier: np.ndarray, rel_types: Iterable[str] = None) -> np.ndarray:
+        """All nodes adjacent (either direction) to any frontier node"""
+        return np.unique(self._neighbor_edges(frontier, rel_types))
+
+    def _node_caps(self, caps: Dict[str, int]) -> np.ndarray:
+        """Per-node degree cap from per-label caps (no cap -> int64 max)"""
+        unlimited = np.iinfo(np.int64).max
+        by_label = np.array([caps.get(label, unlimited) for label in LABELS], dtype=np.int64)
+        return by_label[self.labels]
+
+    def _edges_of(self, index: int, rel_types: Iterable[str] = None) -> Iterable[Tuple[int, str, bool]]:
+        """(neighbor, rel type, is_outgoing) for one node"""
+        for rel in self._rel_types(rel_types):
+            for direction in ('out', 'in'):
+                indptr, indices = self.adjacency[rel][direction]
+                for neighbor in indices[indptr[index]:indptr[index + 1]]:
+                    yield int(neighbor), rel, direction == 'out'
+
+    # ------------------------------------------
+    # Queries (same result shapes as GraphTraverser's Cypher)
+    # ------------------------------------------
+
+    def k_hop(self, node_ids: List, k: int = 2, max_nodes: int = 20,
+              rel_types: Iterable[str] = None, beam_width: int = None,
+              degree_caps: Dict[str, int] = None) -> List[Dict]:
+        """
+        Nodes within k hops of the seeds, nearest first.
+        Each hop keeps at most `beam_width` new nodes - those with the most links
+        into the current frontier, then the most specific (lowest degree) - and
+        nodes over the per-label degree caps are returned but not expanded past hop 1.
+        """
+        seeds = self.lookup(node_ids)
+        if not len(seeds) or k <= 0:
+            return []
+        node_caps = self._node_caps(EXPANSION_DEGREE_CAPS if degree_caps is None else degree_caps)
+
+        distance = np.full(self.n_nodes, -1, dtype=np.int16)
+        distance[seeds] = 0
+        frontier = seeds
+        results = []
+        for hop in range(1, k + 1):
+            if hop > 1:
+                frontier = frontier[self.degrees[frontier] <= node_caps[frontier]]
+            targets = self._neighbor_edges(frontier, rel_types)
+            if not len(targets):
+                break
+            candidates, links = np.unique(targets, return_counts=True)
+            fresh = distance[candidates] < 0
+            candidates, links = candidates[fresh], links[fresh]
+            order = np.lexsort((self.degrees[candidates], -links))
+            frontier = candidates[order[:beam_width] if beam_width else order]
+            if not len(frontier):
+                break
+            distance[frontier] = hop
+            for index in frontier[:max_nodes - len(results)]:
+                node = self.node(int(index))
+                node['distance'] = hop
+                results.append(node)
+            if len(results) >= max_nodes:
+                break
+        return results
+
+    def relationships_between(self, node_ids: List, limit: int = 50) -> List[Dict]:
+        """Directed relationships whose endpoints are both in node_ids"""
+        members = self.lookup(node_ids)
+        if len(members) < 2:
+            return []
+        in_set = np.zeros(self.n_nodes, dtype=bool)
+        in_set[members] = True
+
+        results = []
+        for rel, directions in self.adjacency.items():
+            sources, targets = _gather(*directions['out'], members)
+            keep = in_set[targets]
+            for src, dst in zip(sources[keep], targets[keep]):
+                results.append({
+                    'relationship': rel,
+                    'source': self.names[src],
+                    'target': self.names[dst]
+                })
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _over_cap(self, index: int, caps: Dict[str, int]) -> bool:
+        cap = caps.get(LABELS[self.labels[index]])
+        return cap is not None and self.degrees[index] > cap
+
+    def _expand(self, layer: List[int], parents: Dict, rel_types, caps: Dict[str, int],
+                endpoints: set) -> List[int]:
+        """One BFS layer; parents[node] collects every (parent, rel, parent->node?) edge"""
+        next_layer: Dict[int, List[Tuple[int, str, bool]]] = {}
+        for index in layer:
+            if index not in endpoints and self._over_cap(index, caps):
+                continue
+            for neighbor, rel, outgoing in self._edges_of(index, rel_types):
+                if neighbor in parents and neighbor not in next_layer:
+                    continue
+                next_layer.setdefault(neighbor, []).append((index, rel, outgoing))
+        parents.update(next_layer)
+        return list(next_layer)
+
+    @classmethod
+    def _walk(cls, parents: Dict, index: int):
+        """Yield (nodes, rels, outgoing flags) from a BFS root to `index`"""
+        if not parents[index]:
+            yield [index], [], []
+            return
+        for parent, rel, outgoing in parents[index]:
+            for nodes, rels, flags in cls._walk(parents, parent):
+                yield nodes + [index], rels + [rel], flags + [outgoing]
+
+    def find_paths(self, start_id, end_id, max_length: int = 4, max_paths: int = 3,
+                   rel_types: Iterable[str] = None, degree_caps: Dict[str, int] = None,
+                   budget_seconds: float = None) -> List[Dict]:
+        """
+        Shortest paths between two entities by bidirectional BFS.
+        Each round expands the cheaper frontier (summed degree); intermediate
+        nodes above the per-label degree caps are not expanded through.
+
+        Returns:
+            [{'path_nodes': [{type, name, id}], 'path_rels': [rel types],
+              'path_directions': ['->' | '<-'], 'length': int}]
+        """
+        starts = [int(i) for i in self.lookup([start_id])]
+        ends = [int(i) for i in self.lookup([end_id])]
+        if not starts or not ends:
+            return []
+        caps = PATH_DEGREE_CAPS if degree_caps is None else degree_caps
+        deadline = time.perf_counter() + budget_seconds if budget_seconds else None
+        endpoints = set(starts) | set(ends)
+
+        forward = {index: [] for index in starts}
+        backward = {index: [] for index in ends}
+        depth = {'forward': {index: 0 for index in starts}, 'backward': {index: 0 for index in ends}}
+        forward_layer, backward_layer = list(forward), list(backward)
+        forward_depth = backward_depth = 0
+        meets = [index for index in forward if index in backward]
+
+        while not meets and forward_layer and backward_layer and forward_depth + backward_depth < max_length:
+            if deadline and time.perf_counter() > deadline:
+                break
+            if self.degrees[forward_layer].sum() <= self.degrees[backward_layer].sum():
+                forward_layer = self._expand(forward_layer, forward, rel_types, caps, endpoints)
+                forward_depth += 1
+                depth['forward'].update((index, forward_depth) for index in forward_layer)
+                meets = [index for index in forward_layer if index in backward]
+            else:
+                backward_layer = self._expand(backward_layer, backward, rel_types, caps, endpoints)
+                backward_depth += 1
+                depth['backward'].update((index, backward_depth) for index in backward_layer)
+                meets = [index for index in backward_layer if index in forward]
+            # A path may not meet *in* a hub either
+            meets = [index for index in meets if index in endpoints or not self._over_cap(index, caps)]
+
+        if not meets:
+            return []
+        lengths = {index: depth['forward'][index] + depth['backward'][index] for index in meets}
+        shortest = min(lengths.values())
+
+        paths = []
+        for meet in (index for index in meets if lengths[index] == shortest):
+            for head_nodes, head_rels, head_flags in self._walk(forward, meet):
+                for tail_nodes, tail_rels, tail_flags in self._walk(backward, meet):
+                    # head runs start -> meet; tail runs end -> meet, so reverse it
+                    nodes = head_nodes + tail_nodes[::-1][1:]
+                    directions = ['->' if flag else '<-' for flag in head_flags]
+                    directions += ['<-' if flag else '->' for flag in tail_flags[::-1]]
+                    paths.append({
+                        'path_nodes': [self.node(index) for index in nodes],
+                        'path_rels': head_rels + tail_rels[::-1],
+                        'path_directions': directions,
+                        'length': len(nodes) - 1
+                    })
+                    if len(paths) >= max_paths:
+                        return paths
+        return paths
+
+    def _transition(self, rel_types: Iterable[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse random-walk transition over undirected edges as COO arrays
+        (source, target, probability); rows sum to 1 for non-isolated nodes
+        """
+        key = tuple(sorted(self._rel_types(rel_types)))
+        cached = self._transitions.get(key)
+        if cached is not None:
+            return cached
+
+        sources, targets, weights = [], [], []
+        rows = np.arange(self.n_nodes, dtype=np.int64)
+        for rel in key:
+            for direction in ('out', 'in'):
+                indptr, indices = self.adjacency[rel][direction]
+                sources.append(np.repeat(rows, np.diff(indptr)))
+                targets.append(indices.astype(np.int64))
+                weights.append(np.full(len(indices), PPR_REL_WEIGHTS.get(rel, 1.0)))
+        if sources:
+            src, dst, weight = np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+        else:
+            src = dst = np.empty(0, dtype=np.int64)
+            weight = np.empty(0)
+        out_weight = np.bincount(src, weights=weight, minlength=self.n_nodes)
+        probability = weight / out_weight[src] if len(src) else weight
+
+        self._transitions[key] = (src, dst, probability)
+        return self._transitions[key]
+
+    def personalized_pagerank(self, node_ids: List, top_k: int = 15, alpha: float = 0.25,
+                              tol: float = 1e-4, max_iter: int = 50,
+                              rel_types: Iterable[str] = None, label: str = 'Movie') -> List[Dict]:
+        """
+        Rank `label` nodes by Personalized PageRank seeded uniformly on node_ids.
+        Power iteration r <- alpha*s + (1-alpha)*P^T r until the L1 change < tol;
+        walk mass stranded on isolated nodes returns to the seeds.
+        """
+        seeds = self.lookup(node_ids)
+        if not len(seeds):
+            return []
+        src, dst, probability = self._transition(rel_types)
+
+        restart = np.zeros(self.n_nodes)
+        restart[seeds] = 1.0 / len(seeds)
+        dangling = np.bincount(src, minlength=self.n_nodes) == 0
+
+        rank = restart.copy()
+        iterations = 0
+        for iterations in range(1, max_iter + 1):
+            spread = np.bincount(dst, weights=probability * rank[src], minlength=self.n_nodes)
+            updated = alpha * restart + (1 - alpha) * (spread + rank[dangling].sum() * restart)
+            delta = np.abs(updated - rank).sum()
+            rank = updated
+            if delta < tol:
+                break
+
+        candidates = np.flatnonzero((self.labels == LABELS.index(label)) & (rank > 0))
+        candidates = candidates[~np.isin(candidates, seeds)]
+        top = candidates[np.argsort(-rank[candidates], kind='stable')[:top_k]]
+        results = []
+        for index in top:
+            node = self.node(int(index))
+            node['score'] = float(rank[index])
+            node['iterations'] = iterations
+            results.append(node)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        nbytes = self.labels.nbytes + sum(
+            indptr.nbytes + indices.nbytes
+            for directions in self.adjacency.values()
+            for indptr, indices in directions.values()
+        )
+        return {
+            'nodes': self.n_nodes,
+            'edges': dict(self.edge_counts),
+            'adjacency_bytes': int(nbytes),
+            'source': self.source,
+            'provisional': self.provisional,
+            'generation': self.generation
+        }
+
+
+_shared_engine: Optional[GraphEngine] = None
+_shared_engine_lock = threading.Lock()
+_rebuilding = False
+_failed_generation = None
+_failed_at = 0.0
+
+
+def _rebuild(graphdb) -> None:
+    global _shared_engine, _rebuilding, _failed_generation, _failed_at
+    try:
+        start = time.perf_counter()
+        engine = GraphEngine.load(graphdb)
+        if engine is None:
+            # Don't retry on every query: next ingestion or after GRAPH_ENGINE_RETRY_SECONDS
+            _failed_generation = get_index_generation()
+            _failed_at = time.monotonic()
+        else:
+            _shared_engine = engine
+            print(f"  ✓ Graph engine: {engine.n_nodes} nodes, {sum(engine.edge_counts.values())} edges "
+                  f"({engine.source}, generation {engine.generation}, {time.perf_counter() - start:.2f}s)")
+    finally:
+        _rebuilding = False
+
+
+def get_graph_engine(graphdb=None) -> Optional[GraphEngine]:
+    """
+    Process-wide graph snapshot, built in the background on first use. Returns
+    None (callers use Cypher) if disabled, while the first build runs, or if no
+    source is available. A generation change triggers a background rebuild,
+    and so does a provisional (crawled_data) snapshot once GRAPH_ENGINE_RETRY_SECONDS
+    have passed, until Neo4j can be read again.
+    """
+    global _rebuilding
+    if not Config.GRAPH_ENGINE_ENABLED:
+        return None
+    retry_after = Config.GRAPH_ENGINE_RETRY_SECONDS
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            if _rebuilding or (_failed_generation == get_index_generation()
+                               and time.monotonic() - _failed_at < retry_after):
+                return None
+            _rebuilding = True
+            threading.Thread(target=_rebuild, args=(graphdb,), daemon=True,
+                             name="graph-engine-rebuild").start()
+        elif not _rebuilding and (
+            _shared_engine.generation != get_index_generation()
+            or (_shared_engine.provisional and graphdb is not None
+                and time.monotonic() - _shared_engine.built_at >= retry_after)
+        ):
+            _rebuilding = True
+            threading.Thread(target=_rebuild, args=(graphdb,), daemon=True,
+                             name="graph-engine-rebuild").start()
+        return _shared_engine
+
+
+def peek_graph_engine() -> Optional[GraphEngine]:
+    """The shared graph snapshot if this process already built one (never builds)"""
+    return _shared_engine
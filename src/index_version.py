@@ -0,0 +1,67 @@
+"""
+Index Generation Stamp
+A counter persisted under .cache/ that ingestion bumps after writing to
+Qdrant/Neo4j. Caches built from the indexes (answers, contexts, in-memory
+graphs) record the generation they were built at and treat anything older
+as stale - also across processes, e.g. `python -m src.ingest` next to a
+running API.
+"""
+
+import os
+import threading
+
+from .config import Config
+
+
+_lock = threading.Lock()
+_cached_generation = 0
+_cached_mtime = None
+
+
+def get_index_generation() -> int:
+    """Current generation; re-reads the stamp file only when it changed on disk"""
+    global _cached_generation, _cached_mtime
+    path = Config.INDEX_GENERATION_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return _cached_generation
+
+    with _lock:
+        if mtime != _cached_mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _cached_generation = int(f.read().strip() or 0)
+                _cached_mtime = mtime
+            except (OSError, ValueError):
+                pass
+        return _cached_generation
+
+
+def bump_index_generation() -> int:
+    """Mark the indexes as changed; returns the new generation"""
+    global _cached_generation, _cached_mtime
+    path = Config.INDEX_GENERATION_PATH
+    with _lock:
+        generation = _cached_generation
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                generation = max(generation, int(f.read().strip() or 0))
+        except (OSError, ValueError):
+            pass
+        generation += 1
+        _cached_generation = generation
+
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(generation))
+            os.replace(tmp_path, path)
+            _cached_mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            # In-process caches still see the bump
+            print(f"⚠️ Could not persist index generation ({e})")
+        return generation
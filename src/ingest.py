@@ -4,10 +4,22 @@ from qdrant_client.models import PointStruct
 from .llm_service import GeminiService
 from .vector_db import QdrantService
 from .graph_db import Neo4jService
+from .config import Config
+from .index_version import bump_index_generation
+from .gazetteer import peek_gazetteer
 from tqdm import tqdm
 
 DATA_FILE = "notebooks/movies.json"
 
+def _flush_graph(graphdb, pending, stats):
+    if not pending:
+        return
+    report = graphdb.add_movies_batch(pending, Config.GRAPH_WRITE_BATCH_SIZE)
+    for key in ('written', 'batches'):
+        stats[key] += report[key]
+    stats['failed'].extend(report['failed'])
+    pending.clear()
+
 def run_ingestion():
     if not os.path.exists(DATA_FILE):
         print(f"Error: File '{DATA_FILE}' not found. Please run the data crawl notebook first!")
@@ -26,61 +38,75 @@ def run_ingestion():
     llm = GeminiService()
     vectordb = QdrantService()
     graphdb = Neo4jService()
+    # Constraints must exist before the MERGEs below, or every write scans the label
+    graphdb.ensure_schema()
+
+    batch_size = Config.EMBEDDING_BATCH_SIZE # One embedding request + one Qdrant upsert per batch
+    graph_batch_size = Config.GRAPH_WRITE_BATCH_SIZE # One Neo4j transaction per graph batch
+    pending_graph = []
+    graph_stats = {'written': 0, 'batches': 0, 'failed': []}
+
+    for i in tqdm(range(0, len(raw_movies), batch_size), desc="Ingesting"):
+        batch = raw_movies[i:i + batch_size]
+
+        # Skip movies without description (can't create vector)
+        embeddable = [movie for movie in batch if movie.get("overview")]
 
-    batch_points = []
-    batch_size = 20 # Batch together for faster Qdrant insertion
+        # 1. Create Vector Embeddings (Title + Overview + Genres) in one batch request
+        texts_to_embed = [
+            f"Title: {movie.get('title', 'No Title')}. Genres: {movie.get('genres')}. Overview: {movie.get('overview')}"
+            for movie in embeddable
+        ]
+        embeddings = llm.get_embeddings(texts_to_embed)
 
-    for movie in tqdm(raw_movies, desc="Ingesting"):
-        try:
-            title = movie.get("title", "No Title")
-            overview = movie.get("overview", "")
-            
-            # Skip if no description available (can't create vector)
-            if not overview:
+        batch_points = []
+        for movie, embedding in zip(embeddable, embeddings):
+            if not embedding:
                 continue
+            # Use tmdb id if present, else hash
+            original_id = movie.get('tmdb_id') or movie.get('id') or movie.get('movie_id') or movie.get('movieId')
+            point_id = int(original_id) if isinstance(original_id, int) else (hash(str(original_id)) & ((1<<64)-1))
 
-            # 1. Create Vector Embedding (Title + Overview + Genres)
-            text_to_embed = f"Title: {title}. Genres: {movie.get('genres')}. Overview: {overview}"
-            embedding = llm.get_embedding(text_to_embed)
-            
-            if embedding:
-                # Use tmdb id if present, else hash
-                original_id = movie.get('tmdb_id') or movie.get('id') or movie.get('movie_id') or movie.get('movieId')
-                point_id = int(original_id) if isinstance(original_id, int) else (hash(str(original_id)) & ((1<<64)-1))
-
-                batch_points.append(PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload={
-                        "movie_id": original_id,
-                        "title": title,
-                        "year": movie.get('year') or movie.get('release_year')
-                    }
-                ))
-
-            # 2. Save to Graph Database
-            # Use add_movie_data if available
+            batch_points.append(PointStruct(
+                id=point_id,
+                vector=embedding,
+                payload={
+                    "movie_id": original_id,
+                    "title": movie.get("title", "No Title"),
+                    # year/genres/rating back the structured search filters (integer year index)
+                    "year": QdrantService.payload_year(
+                        movie.get('year') or movie.get('release_year') or movie.get('release_date')
+                    ),
+                    "genres": [g for g in (movie.get("genres") or []) if g],
+                    "rating": movie.get("rating", movie.get("vote_average"))
+                }
+            ))
+
+        # 2. Queue for the graph; written in large UNWIND transactions below
+        pending_graph.extend(embeddable)
+        if len(pending_graph) >= graph_batch_size:
+            _flush_graph(graphdb, pending_graph, graph_stats)
+
+        # Keep this process's gazetteer in step (other processes refresh on the generation bump)
+        gazetteer = peek_gazetteer()
+        if gazetteer:
+            gazetteer.add_movies(embeddable)
+
+        # Insert Batch
+        if batch_points:
             try:
-                graphdb.add_movie_data(movie)
-            except AttributeError:
-                # fallback to older method name if present
-                if hasattr(graphdb, 'add_book_data'):
-                    graphdb.add_book_data(movie)
-
-            # Insert Batch if full
-            if len(batch_points) >= batch_size:
                 vectordb.upsert_vectors(batch_points)
-                batch_points = []
+            except Exception as e:
+                print(f"Error upserting batch of {len(batch_points)} vectors: {e}")
 
-        except Exception as e:
-            print(f"Error processing movie '{title}': {e}")
-
-    # Insert remaining
-    if batch_points:
-        vectordb.upsert_vectors(batch_points)
-        
+    _flush_graph(graphdb, pending_graph, graph_stats)
     graphdb.close()
-    print("DATA INGESTION COMPLETED!")
+    print(f"🕸️ Graph: {graph_stats['written']} movies in {graph_stats['batches']} transactions"
+          f" ({len(graph_stats['failed'])} failed)")
+
+    # Answer/context caches built from the old indexes are now stale
+    generation = bump_index_generation()
+    print(f"DATA INGESTION COMPLETED! (index generation {generation})")
 
 if __name__ == "__main__":
     run_ingestion()
\ No newline at end of file
@@ -1,8 +1,13 @@
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from .config import Config
+from .embedding_cache import get_embedding_cache
+from .rate_limiter import get_rate_limiter, is_quota_error, estimate_tokens
+from .prompt_builder import PromptBuilder, PrefixCache
+import asyncio
+import threading
 import time
-import random
+import weakref
 
 class GeminiService:
     def __init__(self):
@@ -19,169 +24,171 @@ class GeminiService:
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
         }
 
+        # Persistent embedding cache shared across instances (None if disabled)
+        self.embedding_cache = get_embedding_cache()
+
+        # Process-wide RPM/TPM limiter shared across instances and threads
+        self.rate_limiter = get_rate_limiter()
+
+        # Caps in-flight async calls; one semaphore per event loop (asyncio primitives bind to a loop)
+        self.max_concurrency = Config.GEMINI_MAX_CONCURRENCY
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._async_semaphores_lock = threading.Lock()
+
+        # Token-budgeted answer prompts; static prefix optionally cached on the provider
+        self.prompt_builder = PromptBuilder()
+        self.prefix_cache = (
+            PrefixCache(Config.CHAT_MODEL, self.safety_settings, Config.PROMPT_CACHE_TTL_MINUTES)
+            if Config.PROMPT_PREFIX_CACHE_ENABLED else None
+        )
+
     def get_embedding(self, text, task_type="retrieval_document"):
+        if self.embedding_cache:
+            cached = self.embedding_cache.get(Config.EMBEDDING_MODEL, task_type, text)
+            if cached is not None:
+                return cached
+
         # Try up to 5 times if error occurs
         retries = 5
         for attempt in range(retries):
             try:
+                self.rate_limiter.acquire(Config.EMBEDDING_MODEL, estimate_tokens(text))
                 result = genai.embed_content(
                     model=Config.EMBEDDING_MODEL,
                     content=text,
                     task_type=task_type
                 )
-                return result['embedding']
+                embedding = result['embedding']
+                if self.embedding_cache:
+                    self.embedding_cache.put(Config.EMBEDDING_MODEL, task_type, text, embedding)
+                return embedding
             except Exception as e:
-                error_msg = str(e)
-                if "429" in error_msg or "quota" in error_msg.lower():
-                    wait_time = 20 + random.randint(1, 5) 
-                    print(f"\n⚠️ Quota exceeded (429). Waiting {wait_time}s to recover...")
-                    time.sleep(wait_time)
+                if is_quota_error(e):
+                    wait_time = self.rate_limiter.on_throttle(Config.EMBEDDING_MODEL, attempt, e)
+                    print(f"\n⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s to recover...")
                 else:
-                    print(f"⚠️ Other error: {e}. Retrying in 2s...")
-                    time.sleep(2)
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                    print(f"⚠️ Other error: {e}. Retrying in {wait_time:.1f}s...")
+                if attempt < retries - 1:
+                    time.sleep(wait_time)
         
         print("❌ Failed after multiple retries.")
         return None
 
+    def get_embeddings(self, texts, task_type="retrieval_document"):
+        """
+        Embed many texts with batchEmbedContents requests.
+
+        Cached texts are served from the embedding cache; the rest are chunked to
+        Config.EMBEDDING_BATCH_SIZE per request. When a chunk fails, only that
+        chunk is retried; chunks that succeeded are kept.
+
+        Returns:
+            List aligned with `texts`; an entry is None if its chunk never succeeded.
+        """
+        texts = list(texts)
+        if not self.embedding_cache:
+            return self._embed_batch(texts, task_type)
+
+        embeddings = self.embedding_cache.get_many(Config.EMBEDDING_MODEL, task_type, texts)
+        # Embed each distinct normalized text once, sending its first original text
+        missing = {}
+        for i, vector in enumerate(embeddings):
+            if vector is None:
+                missing.setdefault(self.embedding_cache.normalize(texts[i]), []).append(i)
+        if missing:
+            groups = list(missing.values())
+            missing_texts = [texts[indices[0]] for indices in groups]
+            fresh = self._embed_batch(missing_texts, task_type)
+            self.embedding_cache.put_many(Config.EMBEDDING_MODEL, task_type, missing_texts, fresh)
+            for indices, vector in zip(groups, fresh):
+                for i in indices:
+                    embeddings[i] = vector
+        return embeddings
+
+    def _embed_batch(self, texts, task_type):
+        """Uncached batch embedding with per-chunk retries (see get_embeddings)"""
+        embeddings = [None] * len(texts)
+        if not texts:
+            return embeddings
+
+        batch_size = Config.EMBEDDING_BATCH_SIZE
+        pending = [(start, texts[start:start + batch_size])
+                   for start in range(0, len(texts), batch_size)]
+
+        retries = 5
+        for attempt in range(retries):
+            failed = []
+            quota_error = None
+            for start, chunk in pending:
+                try:
+                    self.rate_limiter.acquire(Config.EMBEDDING_MODEL, estimate_tokens(chunk))
+                    result = genai.embed_content(
+                        model=Config.EMBEDDING_MODEL,
+                        content=chunk,
+                        task_type=task_type
+                    )
+                    embeddings[start:start + len(chunk)] = result['embedding']
+                except Exception as e:
+                    if is_quota_error(e):
+                        quota_error = e
+                    else:
+                        print(f"⚠️ Batch embedding error ({len(chunk)} texts): {e}")
+                    failed.append((start, chunk))
+
+            if not failed:
+                return embeddings
+
+            pending = failed
+            if attempt < retries - 1:
+                if quota_error is not None:
+                    wait_time = self.rate_limiter.on_throttle(Config.EMBEDDING_MODEL, attempt, quota_error)
+                    print(f"\n⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s before retrying {len(pending)} chunk(s)...")
+                else:
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                    print(f"⚠️ Retrying {len(pending)} failed chunk(s) in {wait_time:.1f}s...")
+                time.sleep(wait_time)
+
+        failed_count = sum(len(chunk) for _, chunk in pending)
+        print(f"❌ Failed to embed {failed_count}/{len(texts)} texts after multiple retries.")
+        return embeddings
+
+    def _prepare_answer_request(self, context, question, context_provided=True, chat_history=None):
+        """
+        Model + prompt for generate_answer/agenerate_answer/generate_answer_stream,
+        built once per call (not per retry). With provider-side prefix caching the
+        static prefix lives in the cached model and only the dynamic suffix is sent.
+        """
+        built = self.prompt_builder.build_answer_prompt(
+            context, question, context_provided, chat_history
+        )
+        if self.prefix_cache:
+            cached_model = self.prefix_cache.get_model(built['mode'])
+            if cached_model is not None:
+                return cached_model, built['dynamic']
+        return self.model, built['prompt']
+
+    def _answer_generation_config(self):
+        # LOWER temperature for less creativity = less hallucination
+        return genai.types.GenerationConfig(
+            temperature=0.3,  # ⚡ Giảm từ default (0.7) xuống 0.3
+            top_p=0.8,        # Giảm diversity
+            top_k=20,         # Giảm candidate pool
+            max_output_tokens=2048,  # Increased from 800 for complete answers
+        )
+
     def generate_answer(self, context, question, context_provided=True, ask_followups=False, chat_history=None):
         # Retry with safety handling
+        model, prompt = self._prepare_answer_request(context, question, context_provided, chat_history)
+        generation_config = self._answer_generation_config()
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                # Build GROUNDED prompt - minimize hallucination
-                if context_provided and context:
-                    context_block = f"🎬 Retrieved Movie Information:\n{context}\n"
-                    context_note = (
-                        "**CRITICAL ANTI-HALLUCINATION RULES:**\n"
-                        "1. PRIMARY SOURCE: Use ONLY information from the Retrieved Movie Information above\n"
-                        "2. FACTUAL ACCURACY: Every specific detail (dates, names, plots) MUST come from provided context\n"
-                        "3. NO SPECULATION: Do not add information not present in context (release dates, cast, plot details)\n"
-                        "4. IF UNCERTAIN: Say 'Based on available information...' or admit when information is incomplete\n"
-                        "5. CITATIONS: When mentioning specifics, they must be verifiable from context\n"
-                        "6. GENERAL KNOWLEDGE: Only use for broad film concepts (genres, styles) - NOT specific film facts\n\n"
-                        "✅ ALLOWED: 'This is an action movie' (genre classification from context)\n"
-                        "❌ FORBIDDEN: 'Releases in December 2025' (unless explicitly in context)\n"
-                        "❌ FORBIDDEN: 'James Cameron promised...' (unless quote in context)\n"
-                        "❌ FORBIDDEN: 'Oona Chaplin stars in it' (unless listed in context cast)"
-                    )
-                else:
-                    context_block = ""
-                    context_note = (
-                        "**NO CONTEXT MODE:**\n"
-                        "No specific movie information was retrieved. You can provide:\n"
-                        "- General film recommendations (common knowledge films)\n"
-                        "- Genre definitions and characteristics\n"
-                        "- BUT: Be honest that you don't have specific database details\n"
-                        "- Say: 'I couldn't find specific information, but I can suggest...'"
-                    )
-
-                # Format conversation history for context
-                history_block = ""
-                if chat_history and len(chat_history) > 0:
-                    # Get last 4 exchanges to keep context window manageable
-                    recent_history = chat_history[-8:] if len(chat_history) > 8 else chat_history
-                    history_lines = []
-                    for msg in recent_history:
-                        role = "Assistant" if msg.get('role') == 'assistant' else "You"
-                        content = msg.get('content', '').strip()
-                        # Truncate long messages but preserve key info
-                        if len(content) > 150:
-                            content = content[:150] + "..."
-                        history_lines.append(f"{role}: {content}")
-                    if history_lines:
-                        history_block = "Recent conversation:\n" + "\n".join(history_lines) + "\n\n"
-
-                # Few-shot examples showing hybrid knowledge usage
-                # Few-shot examples showing GROUNDED responses
-                examples = """
-Example 1 (GROUNDED - using context facts only):
-Retrieved Context: "Title: Titanic. Year: 1997. Director: James Cameron. Overview: Epic romance and disaster on the Titanic ship in 1912..."
-Q: "When was Titanic released?"
-A: "Titanic was released in 1997, directed by James Cameron. The film tells the tragic love story of Jack and Rose during the 1912 Titanic disaster."
-
-Example 2 (HONEST when info missing):
-Retrieved Context: "Title: Avatar: Fire and Ash. Overview: The Sully family explores the Ash People tribe..."
-Q: "When does Avatar Fire and Ash come out?"
-A: "Based on available information, *Avatar: Fire and Ash* is the third film in the Avatar series, focusing on the Ash People tribe. However, I couldn't find the exact release date in the data. You can check IMDB or the official page for the precise release date."
-
-Example 3 (AVOID speculation):
-Retrieved Context: "Title: Inception. Director: Christopher Nolan. Cast: Leonardo DiCaprio, Tom Hardy..."
-Q: "Is there a sequel to Inception?"
-A: "Based on available information about *Inception* (2010), the film was directed by Christopher Nolan starring Leonardo DiCaprio and Tom Hardy. I don't see any information about a sequel in the data. To date, Inception remains a standalone film."
-
-Example 4 (GENERAL recommendation - allowed):
-Retrieved Context: [No specific match]
-Q: "Good romantic movies?"
-A: "I couldn't find specific information, but I can suggest some classic romance films:
-- *Before Sunrise* (1995) - Richard Linklater
-- *Eternal Sunshine of the Spotless Mind* (2004) - Michel Gondry  
-- *La La Land* (2016) - Damien Chazelle
-
-These are well-known romance films with emotional depth. You can search for them to learn more details!"
-
-Example 5 (STICK TO CONTEXT):
-Retrieved Context: "Title: The Dark Knight. Year: 2008. Cast: Christian Bale (Batman), Heath Ledger (Joker)..."
-Q: "Did The Dark Knight win Oscars?"
-A: "Based on available information, *The Dark Knight* (2008) stars Christian Bale and Heath Ledger. Regarding Oscar awards, I don't see specific information in the data.
-
-(Note: In reality Heath Ledger won Best Supporting Actor Oscar, but this info isn't in context so we don't mention it)"
-"""
-
-                prompt = f"""You are a GROUNDED film assistant. Your primary goal is FACTUAL ACCURACY.
-
-Your personality:
-- Honest and careful with facts
-- Use ONLY information from provided context for specific details
-- Admit when you don't have complete information
-- Friendly but prioritize accuracy over confidence
-- Always respond in English
-
-{history_block}
-{context_block}
-
-User's question: {question}
-
-{context_note}
-
-Guidelines for GROUNDED response:
-1. **Factual Discipline**:
-   - Specific facts (dates, names, plots) → MUST be in context
-   - If not in context → Say "I couldn't find information about..." or "Based on available data..."
-   - Never fabricate release dates, cast members, or plot details
-   
-2. **What you CAN use from general knowledge**:
-   - Genre definitions (e.g., "Action movies typically have...")
-   - Film theory concepts (e.g., "Cinematography is...")
-   - Common film recommendations (widely known classics)
-   
-3. **What you MUST NOT invent**:
-   - Release dates for specific films
-   - Cast and crew details
-   - Plot specifics or quotes
-   - Award wins or nominations
-   - Production details or budgets
-
-4. **Response structure**:
-   - Lead with facts from context
-   - Clearly indicate when extrapolating: "Based on the information..."
-   - If missing info: "I couldn't find information about [X] in the data"
-   - End with helpful suggestion if needed
-
-{examples}
-
-Now answer the user's question following these ANTI-HALLUCINATION rules strictly.
-
-Response (in English, grounded in provided context):"""
-                
-                # LOWER temperature for less creativity = less hallucination
-                generation_config = genai.types.GenerationConfig(
-                    temperature=0.3,  # ⚡ Giảm từ default (0.7) xuống 0.3
-                    top_p=0.8,        # Giảm diversity
-                    top_k=20,         # Giảm candidate pool
-                    max_output_tokens=2048,  # Increased from 800 for complete answers
+                self.rate_limiter.acquire(
+                    Config.CHAT_MODEL,
+                    estimate_tokens(prompt) + generation_config.max_output_tokens
                 )
-                
-                response = self.model.generate_content(
+                response = model.generate_content(
                     prompt,
                     generation_config=generation_config,
                     safety_settings=self.safety_settings
@@ -190,6 +197,214 @@ Response (in English, grounded in provided context):"""
                 return response.text.strip()
                     
             except Exception as e:
-                print(f"⚠️ Error during chat: {e}. Waiting 5s...")
-                time.sleep(5)
-        return "Sorry, the system is currently overloaded. Please try again later."
\ No newline at end of file
+                if is_quota_error(e):
+                    wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                else:
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                print(f"⚠️ Error during chat: {e}. Waiting {wait_time:.1f}s...")
+                if attempt < max_retries - 1:
+                    time.sleep(wait_time)
+        return "Sorry, the system is currently overloaded. Please try again later."
+
+    def generate(self, prompt, generation_config=None, safety_settings=None, max_retries=3):
+        """
+        Rate-limited generate_content for callers with their own prompts.
+
+        Quota errors (429) are retried with backoff; any other error is raised
+        so the caller keeps its own handling (e.g. blocked responses).
+        """
+        max_output = getattr(generation_config, 'max_output_tokens', None) or 0
+        for attempt in range(max_retries):
+            self.rate_limiter.acquire(Config.CHAT_MODEL, estimate_tokens(prompt) + max_output)
+            try:
+                return self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings
+                )
+            except Exception as e:
+                if not is_quota_error(e) or attempt == max_retries - 1:
+                    raise
+                wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                print(f"⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s...")
+                time.sleep(wait_time)
+
+    @staticmethod
+    def _chunk_text(chunk):
+        """Text of a streamed chunk; empty if the chunk was blocked or has no parts"""
+        try:
+            return chunk.text
+        except ValueError:
+            return ""
+
+    def generate_answer_stream(self, context, question, context_provided=True, chat_history=None):
+        """
+        Streaming generate_answer: yields text chunks as Gemini produces them.
+        Errors before the first chunk are retried like generate_answer; once
+        text has been sent the stream just ends.
+        """
+        model, prompt = self._prepare_answer_request(context, question, context_provided, chat_history)
+        generation_config = self._answer_generation_config()
+        max_retries = 3
+        for attempt in range(max_retries):
+            started = False
+            try:
+                self.rate_limiter.acquire(
+                    Config.CHAT_MODEL,
+                    estimate_tokens(prompt) + generation_config.max_output_tokens
+                )
+                response = model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=self.safety_settings,
+                    stream=True
+                )
+                for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        started = True
+                        yield text
+                if started:
+                    return
+                raise ValueError("Empty response")
+
+            except Exception as e:
+                if started:
+                    print(f"⚠️ Stream interrupted: {e}")
+                    return
+                if is_quota_error(e):
+                    wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                else:
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                print(f"⚠️ Error during chat: {e}. Waiting {wait_time:.1f}s...")
+                if attempt < max_retries - 1:
+                    time.sleep(wait_time)
+        yield "Sorry, the system is currently overloaded. Please try again later."
+
+    def generate_stream(self, prompt, generation_config=None, safety_settings=None, max_retries=3):
+        """
+        Streaming generate(): yields text chunks. Quota errors before the first
+        chunk are retried; any other error is raised to the caller.
+        """
+        max_output = getattr(generation_config, 'max_output_tokens', None) or 0
+        for attempt in range(max_retries):
+            self.rate_limiter.acquire(Config.CHAT_MODEL, estimate_tokens(prompt) + max_output)
+            started = False
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                    stream=True
+                )
+                for chunk in response:
+                    text = self._chunk_text(chunk)
+                    if text:
+                        started = True
+                        yield text
+                return
+            except Exception as e:
+                if started or not is_quota_error(e) or attempt == max_retries - 1:
+                    raise
+                wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                print(f"⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s...")
+                time.sleep(wait_time)
+
+    # ==========================================
+    # ASYNC API - same retry/safety semantics as the sync methods
+    # ==========================================
+
+    @property
+    def async_semaphore(self):
+        """Concurrency cap for the running event loop (must be called inside it)"""
+        loop = asyncio.get_running_loop()
+        with self._async_semaphores_lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._async_semaphores[loop] = semaphore
+            return semaphore
+
+    async def aget_embedding(self, text, task_type="retrieval_document"):
+        # SQLite reads/writes (with commits) run off the event loop
+        if self.embedding_cache:
+            cached = await asyncio.to_thread(self.embedding_cache.get, Config.EMBEDDING_MODEL, task_type, text)
+            if cached is not None:
+                return cached
+
+        retries = 5
+        for attempt in range(retries):
+            try:
+                await self.rate_limiter.aacquire(Config.EMBEDDING_MODEL, estimate_tokens(text))
+                async with self.async_semaphore:
+                    result = await genai.embed_content_async(
+                        model=Config.EMBEDDING_MODEL,
+                        content=text,
+                        task_type=task_type
+                    )
+                embedding = result['embedding']
+                if self.embedding_cache:
+                    await asyncio.to_thread(
+                        self.embedding_cache.put, Config.EMBEDDING_MODEL, task_type, text, embedding
+                    )
+                return embedding
+            except Exception as e:
+                if is_quota_error(e):
+                    wait_time = self.rate_limiter.on_throttle(Config.EMBEDDING_MODEL, attempt, e)
+                    print(f"\n⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s to recover...")
+                else:
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                    print(f"⚠️ Other error: {e}. Retrying in {wait_time:.1f}s...")
+                if attempt < retries - 1:
+                    await asyncio.sleep(wait_time)
+
+        print("❌ Failed after multiple retries.")
+        return None
+
+    async def agenerate_answer(self, context, question, context_provided=True, ask_followups=False, chat_history=None):
+        model, prompt = self._prepare_answer_request(context, question, context_provided, chat_history)
+        generation_config = self._answer_generation_config()
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                await self.rate_limiter.aacquire(
+                    Config.CHAT_MODEL,
+                    estimate_tokens(prompt) + generation_config.max_output_tokens
+                )
+                async with self.async_semaphore:
+                    response = await model.generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        safety_settings=self.safety_settings
+                    )
+
+                return response.text.strip()
+
+            except Exception as e:
+                if is_quota_error(e):
+                    wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                else:
+                    wait_time = self.rate_limiter.backoff_delay(attempt)
+                print(f"⚠️ Error during chat: {e}. Waiting {wait_time:.1f}s...")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(wait_time)
+        return "Sorry, the system is currently overloaded. Please try again later."
+
+    async def agenerate(self, prompt, generation_config=None, safety_settings=None, max_retries=3):
+        """Async generate(): quota errors are retried, anything else is raised"""
+        max_output = getattr(generation_config, 'max_output_tokens', None) or 0
+        for attempt in range(max_retries):
+            await self.rate_limiter.aacquire(Config.CHAT_MODEL, estimate_tokens(prompt) + max_output)
+            try:
+                async with self.async_semaphore:
+                    return await self.model.generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        safety_settings=safety_settings
+                    )
+            except Exception as e:
+                if not is_quota_error(e) or attempt == max_retries - 1:
+                    raise
+                wait_time = self.rate_limiter.on_throttle(Config.CHAT_MODEL, attempt, e)
+                print(f"⚠️ Quota exceeded (429). Waiting {wait_time:.1f}s...")
+                await asyncio.sleep(wait_time)
@@ -0,0 +1,343 @@
+"""
+Prompt Builder for grounded answer generation
+- The persona, anti-hallucination rules, guidelines and few-shot examples never
+  change, so they are assembled once per mode into a static prefix
+- Optionally the prefix is uploaded once as a Gemini cached content
+  (provider-side context caching) and only the dynamic suffix is sent
+- Every section is measured in tokens; chat history and context blocks are
+  trimmed to a configurable budget
+"""
+
+import datetime
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from .config import Config
+from .rate_limiter import estimate_tokens
+
+
+CONTEXT_RULES = (
+    "**CRITICAL ANTI-HALLUCINATION RULES:**\n"
+    "1. PRIMARY SOURCE: Use ONLY information from the Retrieved Movie Information below\n"
+    "2. FACTUAL ACCURACY: Every specific detail (dates, names, plots) MUST come from provided context\n"
+    "3. NO SPECULATION: Do not add information not present in context (release dates, cast, plot details)\n"
+    "4. IF UNCERTAIN: Say 'Based on available information...' or admit when information is incomplete\n"
+    "5. CITATIONS: When mentioning specifics, they must be verifiable from context\n"
+    "6. GENERAL KNOWLEDGE: Only use for broad film concepts (genres, styles) - NOT specific film facts\n\n"
+    "✅ ALLOWED: 'This is an action movie' (genre classification from context)\n"
+    "❌ FORBIDDEN: 'Releases in December 2025' (unless explicitly in context)\n"
+    "❌ FORBIDDEN: 'James Cameron promised...' (unless quote in context)\n"
+    "❌ FORBIDDEN: 'Oona Chaplin stars in it' (unless listed in context cast)"
+)
+
+NO_CONTEXT_RULES = (
+    "**NO CONTEXT MODE:**\n"
+    "No specific movie information was retrieved. You can provide:\n"
+    "- General film recommendations (common knowledge films)\n"
+    "- Genre definitions and characteristics\n"
+    "- BUT: Be honest that you don't have specific database details\n"
+    "- Say: 'I couldn't find specific information, but I can suggest...'"
+)
+
+# Few-shot examples showing GROUNDED responses
+EXAMPLES = """
+Example 1 (GROUNDED - using context facts only):
+Retrieved Context: "Title: Titanic. Year: 1997. Director: James Cameron. Overview: Epic romance and disaster on the Titanic ship in 1912..."
+Q: "When was Titanic released?"
+A: "Titanic was released in 1997, directed by James Cameron. The film tells the tragic love story of Jack and Rose during the 1912 Titanic disaster."
+
+Example 2 (HONEST when info missing):
+Retrieved Context: "Title: Avatar: Fire and Ash. Overview: The Sully family explores the Ash People tribe..."
+Q: "When does Avatar Fire and Ash come out?"
+A: "Based on available information, *Avatar: Fire and Ash* is the third film in the Avatar series, focusing on the Ash People tribe. However, I couldn't find the exact release date in the data. You can check IMDB or the official page for the precise release date."
+
+Example 3 (AVOID speculation):
+Retrieved Context: "Title: Inception. Director: Christopher Nolan. Cast: Leonardo DiCaprio, Tom Hardy..."
+Q: "Is there a sequel to Inception?"
+A: "Based on available information about *Inception* (2010), the film was directed by Christopher Nolan starring Leonardo DiCaprio and Tom Hardy. I don't see any information about a sequel in the data. To date, Inception remains a standalone film."
+
+Example 4 (GENERAL recommendation - allowed):
+Retrieved Context: [No specific match]
+Q: "Good romantic movies?"
+A: "I couldn't find specific information, but I can suggest some classic romance films:
+- *Before Sunrise* (1995) - Richard Linklater
+- *Eternal Sunshine of the Spotless Mind* (2004) - Michel Gondry  
+- *La La Land* (2016) - Damien Chazelle
+
+These are well-known romance films with emotional depth. You can search for them to learn more details!"
+
+Example 5 (STICK TO CONTEXT):
+Retrieved Context: "Title: The Dark Knight. Year: 2008. Cast: Christian Bale (Batman), Heath Ledger (Joker)..."
+Q: "Did The Dark Knight win Oscars?"
+A: "Based on available information, *The Dark Knight* (2008) stars Christian Bale and Heath Ledger. Regarding Oscar awards, I don't see specific information in the data.
+
+(Note: In reality Heath Ledger won Best Supporting Actor Oscar, but this info isn't in context so we don't mention it)"
+"""
+
+STATIC_TEMPLATE = """You are a GROUNDED film assistant. Your primary goal is FACTUAL ACCURACY.
+
+Your personality:
+- Honest and careful with facts
+- Use ONLY information from provided context for specific details
+- Admit when you don't have complete information
+- Friendly but prioritize accuracy over confidence
+- Always respond in English
+
+{rules}
+
+Guidelines for GROUNDED response:
+1. **Factual Discipline**:
+   - Specific facts (dates, names, plots) → MUST be in context
+   - If not in context → Say "I couldn't find information about..." or "Based on available data..."
+   - Never fabricate release dates, cast members, or plot details
+   
+2. **What you CAN use from general knowledge**:
+   - Genre definitions (e.g., "Action movies typically have...")
+   - Film theory concepts (e.g., "Cinematography is...")
+   - Common film recommendations (widely known classics)
+   
+3. **What you MUST NOT invent**:
+   - Release dates for specific films
+   - Cast and crew details
+   - Plot specifics or quotes
+   - Award wins or nominations
+   - Production details or budgets
+
+4. **Response structure**:
+   - Lead with facts from context
+   - Clearly indicate when extrapolating: "Based on the information..."
+   - If missing info: "I couldn't find information about [X] in the data"
+   - End with helpful suggestion if needed
+{examples}"""
+
+DYNAMIC_TEMPLATE = """{history_block}{context_block}
+User's question: {question}
+
+Now answer the user's question following these ANTI-HALLUCINATION rules strictly.
+
+Response (in English, grounded in provided context):"""
+
+TRUNCATION_MARKER = "..."
+
+
+class PromptBuilder:
+    """Assembles answer prompts as static prefix + budgeted dynamic suffix"""
+
+    # Static prefixes are identical for every instance, so build them once per process
+    _static_prefixes: Dict[str, str] = {}
+    _static_tokens: Dict[str, int] = {}
+    _prefix_lock = threading.Lock()
+
+    def __init__(self, token_budget: int = None, history_budget: int = None,
+                 history_messages: int = 8, history_message_chars: int = 150):
+        self.token_budget = token_budget or Config.PROMPT_TOKEN_BUDGET
+        self.history_budget = history_budget or Config.PROMPT_HISTORY_TOKEN_BUDGET
+        self.history_messages = history_messages
+        self.history_message_chars = history_message_chars
+
+        # Builders are shared across request threads
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'prompts_built': 0,
+            'total_prompt_tokens': 0,
+            'context_blocks_dropped': 0,
+            'history_messages_dropped': 0,
+            'last_sections': {}
+        }
+
+    # ------------------------------------------
+    # Static prefix
+    # ------------------------------------------
+
+    @staticmethod
+    def mode_for(context: str, context_provided: bool) -> str:
+        return 'context' if context_provided and context else 'no_context'
+
+    @classmethod
+    def get_static_prefix(cls, mode: str) -> str:
+        """Static persona + rules + guidelines + examples for `mode` (built once)"""
+        prefix = cls._static_prefixes.get(mode)
+        if prefix is None:
+            with cls._prefix_lock:
+                prefix = cls._static_prefixes.get(mode)
+                if prefix is None:
+                    rules = CONTEXT_RULES if mode == 'context' else NO_CONTEXT_RULES
+                    prefix = STATIC_TEMPLATE.format(rules=rules, examples=EXAMPLES)
+                    cls._static_tokens[mode] = estimate_tokens(prefix)
+                    cls._static_prefixes[mode] = prefix
+        return prefix
+
+    # ------------------------------------------
+    # Dynamic sections
+    # ------------------------------------------
+
+    def _format_history(self, chat_history: Optional[List[Dict]]) -> str:
+        """Most recent messages that fit the history budget, oldest dropped first"""
+        if not chat_history:
+            return ""
+
+        recent_history = chat_history[-self.history_messages:]
+        lines = []
+        used = 0
+        for msg in reversed(recent_history):
+            role = "Assistant" if msg.get('role') == 'assistant' else "You"
+            content = (msg.get('content') or '').strip()
+            # Truncate long messages but preserve key info
+            if len(content) > self.history_message_chars:
+                content = content[:self.history_message_chars] + TRUNCATION_MARKER
+            line = f"{role}: {content}"
+            cost = estimate_tokens(line)
+            if used + cost > self.history_budget:
+                break
+            lines.append(line)
+            used += cost
+
+        with self._stats_lock:
+            self.stats['history_messages_dropped'] += len(recent_history) - len(lines)
+        if not lines:
+            return ""
+        return "Recent conversation:\n" + "\n".join(reversed(lines)) + "\n\n"
+
+    @staticmethod
+    def _split_context(context: str) -> Tuple[List[str], str]:
+        """Split context into blocks (per movie / per retrieved item)"""
+        separator = '\n\n' if '\n\n' in context else '\n'
+        return [block for block in context.split(separator) if block.strip()], separator
+
+    def _fit_context(self, context: str, budget: int) -> str:
+        """
+        Keep whole context blocks in order (they arrive most-important-first)
+        until the budget is spent; a block that does not fit is cut short only
+        if nothing has been kept yet.
+        """
+        if estimate_tokens(context) <= budget:
+            return context
+
+        blocks, separator = self._split_context(context)
+        kept = []
+        used = 0
+        for block in blocks:
+            cost = estimate_tokens(block)
+            if used + cost <= budget:
+                kept.append(block)
+                used += cost
+            elif not kept and budget > 0:
+                kept.append(block[:budget * 4] + TRUNCATION_MARKER)
+                used = budget
+            else:
+                break
+
+        with self._stats_lock:
+            self.stats['context_blocks_dropped'] += len(blocks) - len(kept)
+        return separator.join(kept)
+
+    def build_answer_prompt(self, context: str, question: str, context_provided: bool = True,
+                            chat_history: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict with 'mode', 'static_prefix', 'dynamic' (suffix), 'prompt'
+            (prefix + suffix) and 'sections' (token count per section)
+        """
+        mode = self.mode_for(context, context_provided)
+        static_prefix = self.get_static_prefix(mode)
+        static_tokens = self._static_tokens[mode]
+
+        history_block = self._format_history(chat_history)
+        question_tokens = estimate_tokens(question)
+        skeleton_tokens = estimate_tokens(DYNAMIC_TEMPLATE)
+
+        context_block = ""
+        context_tokens = 0
+        if mode == 'context':
+            remaining = (self.token_budget - static_tokens - skeleton_tokens
+                         - question_tokens - estimate_tokens(history_block))
+            fitted = self._fit_context(context, max(0, remaining))
+            context_block = f"🎬 Retrieved Movie Information:\n{fitted}\n"
+            context_tokens = estimate_tokens(context_block)
+
+        dynamic = DYNAMIC_TEMPLATE.format(
+            history_block=history_block,
+            context_block=context_block,
+            question=question
+        )
+        sections = {
+            'static_prefix': static_tokens,
+            'history': estimate_tokens(history_block) if history_block else 0,
+            'context': context_tokens,
+            'question': question_tokens,
+            'total': static_tokens + estimate_tokens(dynamic)
+        }
+
+        with self._stats_lock:
+            self.stats['prompts_built'] += 1
+            self.stats['total_prompt_tokens'] += sections['total']
+            self.stats['last_sections'] = sections
+
+        return {
+            'mode': mode,
+            'static_prefix': static_prefix,
+            'dynamic': dynamic,
+            'prompt': f"{static_prefix}\n\n{dynamic}",
+            'sections': sections
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        built = stats['prompts_built']
+        return {
+            'prompts_built': built,
+            'avg_prompt_tokens': stats['total_prompt_tokens'] / built if built else 0,
+            'token_budget': self.token_budget,
+            'context_blocks_dropped': stats['context_blocks_dropped'],
+            'history_messages_dropped': stats['history_messages_dropped'],
+            'last_sections': stats['last_sections']
+        }
+
+
+class PrefixCache:
+    """
+    Provider-side context caching of the static prefix.
+    Creates one Gemini CachedContent per mode and reuses it until it expires;
+    any failure disables caching and callers fall back to inline prefixes.
+    """
+
+    def __init__(self, model_name: str, safety_settings=None, ttl_minutes: int = 60):
+        self.model_name = model_name
+        self.safety_settings = safety_settings
+        self.ttl = datetime.timedelta(minutes=ttl_minutes)
+        self.enabled = True
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, mode: str):
+        """GenerativeModel bound to the cached prefix for `mode`, or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._models.get(mode)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            if entry and entry['expires_at'] > now + datetime.timedelta(minutes=1):
+                return entry['model']
+
+            try:
+                import google.generativeai as genai
+                from google.generativeai import caching
+
+                cached = caching.CachedContent.create(
+                    model=self.model_name,
+                    display_name=f"graphrag-answer-prefix-{mode}",
+                    system_instruction=PromptBuilder.get_static_prefix(mode),
+                    ttl=self.ttl
+                )
+                model = genai.GenerativeModel.from_cached_content(
+                    cached, safety_settings=self.safety_settings
+                )
+                self._models[mode] = {'model': model, 'expires_at': now + self.ttl}
+                print(f"  ✓ Cached static prompt prefix ({mode}) on provider")
+                return model
+            except Exception as e:
+                print(f"⚠️ Provider context caching unavailable ({e}); sending prefix inline")
+                self.enabled = False
+                return None
@@ -20,6 +20,7 @@ import hashlib
 from typing import List, Dict, Any, Tuple, Optional
 from functools import lru_cache
 from .llm_service import GeminiService
+from .gazetteer import get_gazetteer, normalize
 
 
 class QueryProcessor:
@@ -28,9 +29,12 @@ class QueryProcessor:
     Bridges text-formatted queries with graph-structured data.
     """
     
-    def __init__(self, llm_service: GeminiService = None):
+    def __init__(self, llm_service: GeminiService = None, gazetteer=None):
         self.llm = llm_service or GeminiService()
         
+        # Catalog gazetteer for LLM-free NER (None if disabled)
+        self.gazetteer = gazetteer if gazetteer is not None else get_gazetteer()
+        
         # Query cache for faster repeated queries
         self._query_cache = {}
         self._cache_max_size = 100
@@ -40,7 +44,8 @@ class QueryProcessor:
             'queries_processed': 0,
             'cache_hits': 0,
             'entities_found': 0,
-            'relations_found': 0
+            'relations_found': 0,
+            'llm_entity_calls': 0
         }
         
         # Define entity patterns and types
@@ -187,22 +192,35 @@ class QueryProcessor:
         entities = []
         query_lower = query.lower()
         
+        # Catalog gazetteer: exact titles, person names and genres (incl. Vietnamese aliases)
+        gazetteer_entities = self.gazetteer.extract(query) if self.gazetteer else []
+        entities.extend(gazetteer_entities)
+        gazetteer_texts = [e['text'].lower() for e in gazetteer_entities]
+        
         # Simple rule-based NER for common patterns
         # Extract movie titles (quoted or capitalized)
+        # 'source' tells downstream consumers (entity linking) how much to trust the type
         movie_patterns = [
-            r'"([^"]+)"',  # Quoted titles
-            r'《([^》]+)》',  # Chinese quotes
-            r'\b([A-Z][A-Za-z\s&:]+(?:\d+)?)\b'  # Capitalized titles
+            (r'"([^"]+)"', 'quoted'),  # Quoted titles
+            (r'《([^》]+)》', 'quoted'),  # Chinese quotes
+            (r'\b([A-Z][A-Za-z\s&:]+(?:\d+)?)\b', 'capitalized')  # Capitalized titles
         ]
         
-        for pattern in movie_patterns:
+        for pattern, source in movie_patterns:
             matches = re.findall(pattern, query)
             for match in matches:
                 if len(match) > 2 and match.lower() not in ['what', 'where', 'when', 'who', 'how', 'why']:
+                    # Capitalized guesses already resolved by the gazetteer are dropped
+                    match_lower = match.strip().lower()
+                    if source == 'capitalized' and any(
+                        match_lower in text or text in match_lower for text in gazetteer_texts
+                    ):
+                        continue
                     entities.append({
                         'text': match.strip(),
                         'type': 'MOVIE',
-                        'confidence': 0.8
+                        'confidence': 0.8,
+                        'source': source
                     })
         
         # Extract years
@@ -211,7 +229,8 @@ class QueryProcessor:
             entities.append({
                 'text': year,
                 'type': 'YEAR',
-                'confidence': 1.0
+                'confidence': 1.0,
+                'source': 'pattern'
             })
         
         # Identify entity type keywords
@@ -221,11 +240,14 @@ class QueryProcessor:
                     entities.append({
                         'text': keyword,
                         'type': f'{entity_type}_TYPE',
-                        'confidence': 0.9
+                        'confidence': 0.9,
+                        'source': 'keyword'
                     })
         
-        # Use LLM for more sophisticated entity extraction
-        if not entities or len(entities) < 2:
+        # Use LLM for more sophisticated entity extraction, unless the catalog already
+        # named a movie or person (a catalog genre alone does not count)
+        catalog_named = any(e['type'] in ('MOVIE', 'PERSON') for e in gazetteer_entities)
+        if not catalog_named and len(entities) - len(gazetteer_entities) < 2:
             llm_entities = self._llm_extract_entities(query)
             entities.extend(llm_entities)
         
@@ -258,10 +280,11 @@ Example: "Inception|MOVIE, Christopher Nolan|PERSON, 2010|YEAR, sci-fi|GENRE"
 
 Output (comma-separated):"""
         
+        self.stats['llm_entity_calls'] += 1
         try:
             # Get safety settings from model if available
             safety_settings = getattr(self.llm.model, '_safety_settings', None)
-            response = self.llm.model.generate_content(prompt, safety_settings=safety_settings)
+            response = self.llm.generate(prompt, safety_settings=safety_settings)
             
             try:
                 text = response.text.strip()
@@ -278,7 +301,8 @@ Output (comma-separated):"""
                     entities.append({
                         'text': name.strip(),
                         'type': etype.strip().upper(),
-                        'confidence': 0.85
+                        'confidence': 0.85,
+                        'source': 'llm'
                     })
             return entities
         except Exception as e:
@@ -329,6 +353,17 @@ Output (comma-separated):"""
             elif entity['type'] == 'YEAR':
                 structured['filters']['year'] = entity['text']
         
+        # Filters the vector search can apply: release-year range and catalog genres
+        year_range = self._extract_year_range(query)
+        if year_range:
+            structured['filters']['year_range'] = year_range
+        genres = sorted({
+            entity['id'] for entity in entities
+            if entity['type'] == 'GENRE' and entity.get('source') == 'gazetteer' and entity.get('id')
+        })
+        if genres:
+            structured['filters']['genres'] = genres
+        
         # Build edges from relations
         for relation in relations:
             structured['edges'].append({
@@ -338,6 +373,87 @@ Output (comma-separated):"""
         
         return structured
 
+    YEAR = r'(19\d{2}|20\d{2})'
+
+    def _extract_year_range(self, query: str) -> Optional[Dict[str, int]]:
+        """
+        Release-year range mentioned in the query, as {'gte': year, 'lte': year}
+        (either bound may be missing). Handles explicit ranges, "from/after/
+        before YEAR", decades ("90s", "thập niên 90") and a single year with a
+        cue ("năm 2010", "in 2010", "released 2010"). Years that belong to a
+        catalog title ("Blade Runner 2049", "Inception (2010)") are ignored.
+        """
+        text = self._mask_movie_titles(query)
+        year = self.YEAR
+
+        # "từ 2010 đến 2015", "2010-2015", "between 2010 and 2015"
+        match = re.search(rf'{year}\s*(?:-|–|đến|tới|to|and|và)\s*(?:năm\s*)?{year}', text)
+        if match:
+            low, high = sorted(int(y) for y in match.groups())
+            return {'gte': low, 'lte': high}
+
+        # "từ 2010 đến nay", "since 2010", "sau năm 2010", "before 2000"
+        match = re.search(rf'(từ|kể từ|since|from|sau|after|trước|before)\s*(?:năm\s*)?{year}', text)
+        if match:
+            keyword, value = match.group(1), int(match.group(2))
+            if keyword in ('sau', 'after'):
+                return {'gte': value + 1}
+            if keyword in ('trước', 'before'):
+                return {'lte': value - 1}
+            return {'gte': value}
+
+        # "90s", "1990s", "thập niên 90", "những năm 1990"
+        match = (re.search(r"\b(?:19|20)?(\d0)'?s\b", text)
+                 or re.search(r'(?:thập niên|thập kỷ|những năm)\s*(?:19|20)?(\d0)\b', text))
+        if match:
+            decade_text = match.group(0)
+            decade = int(match.group(1))
+            century = re.search(r'(19|20)\d0', decade_text)
+            if century:
+                start = int(century.group(0))
+            else:
+                start = (1900 if decade >= 30 else 2000) + decade
+            return {'gte': start, 'lte': start + 9}
+
+        # "năm 2010", "in 2010", "released in 2010", "ra mắt năm 2010"
+        years = set(re.findall(
+            rf'\b(?:năm|in|released|ra mắt|phát hành)\s+(?:in\s+|năm\s+)?{year}\b', text
+        ))
+        if len(years) == 1:
+            value = int(years.pop())
+            return {'gte': value, 'lte': value}
+        return None
+
+    def _mask_movie_titles(self, query: str) -> str:
+        """
+        Normalized query with gazetteer MOVIE spans (and a "(YEAR)" right after
+        them) blanked out, so digits in titles are not read as release years
+        """
+        text = normalize(query)
+        if not self.gazetteer:
+            return text
+        for entity in self.gazetteer.extract(query):
+            if entity['type'] != 'MOVIE':
+                continue
+            start, end = entity['span']
+            suffix = re.match(rf'\s*\(\s*{self.YEAR}\s*\)', text[end:])
+            if suffix:
+                end += suffix.end()
+            text = text[:start] + ' ' * (end - start) + text[end:]
+        return text
+
+    def cache_scope(self, query: str) -> Dict[str, Any]:
+        """
+        What a question is about, without an LLM call: catalog entity ids from the
+        gazetteer and the release-year range. Used to keep cached answers apart
+        for near-identical questions about different movies, people or years.
+        """
+        entities = self.gazetteer.extract(query) if self.gazetteer else []
+        return {
+            'entity_ids': sorted({f"{e['type']}:{e['id']}" for e in entities}),
+            'year_range': self._extract_year_range(query)
+        }
+
     def _is_complex_query(self, query: str) -> bool:
         """
         Determine if query needs decomposition
@@ -375,7 +491,7 @@ Sub-queries:"""
         try:
             # Get safety settings from model if available
             safety_settings = getattr(self.llm.model, '_safety_settings', None)
-            response = self.llm.model.generate_content(prompt, safety_settings=safety_settings)
+            response = self.llm.generate(prompt, safety_settings=safety_settings)
             
             try:
                 text = response.text.strip()
@@ -684,6 +800,8 @@ Sub-queries:"""
             'cache_size': len(self._query_cache),
             'total_entities_found': self.stats['entities_found'],
             'total_relations_found': self.stats['relations_found'],
+            'llm_entity_calls': self.stats['llm_entity_calls'],
+            'gazetteer': self.gazetteer.get_stats() if self.gazetteer else None,
             'avg_entities_per_query': self.stats['entities_found'] / self.stats['queries_processed'] if self.stats['queries_processed'] > 0 else 0,
             'avg_relations_per_query': self.stats['relations_found'] / self.stats['queries_processed'] if self.stats['queries_processed'] > 0 else 0
         }
@@ -0,0 +1,92 @@
+"""
+Query Result
+Request-scoped outcome of GraphRAG.query: the answer plus everything an
+evaluator or API needs about how it was produced. Immutable, so one shared
+GraphRAG instance can serve concurrent requests without results leaking
+between them.
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    answer: str
+    method: Optional[str] = None
+    ranked_ids: Tuple[Any, ...] = ()
+    scores: Tuple[float, ...] = ()
+    titles: Tuple[str, ...] = ()
+    contexts: Tuple[str, ...] = ()
+    timings: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    cache: Mapping[str, bool] = field(default_factory=lambda: MappingProxyType({}))
+    fallback_reason: Optional[str] = None
+
+    def __str__(self) -> str:
+        return self.answer
+
+    @property
+    def movies(self) -> List[Dict[str, Any]]:
+        """Ranked movies as [{'id', 'title', 'score'}] (e.g. for API responses)"""
+        return [
+            {'id': movie_id, 'title': title, 'score': score}
+            for movie_id, title, score in zip(self.ranked_ids, self.titles, self.scores)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['timings'] = dict(self.timings)
+        data['cache'] = dict(self.cache)
+        for name in ('ranked_ids', 'scores', 'titles', 'contexts'):
+            data[name] = list(data[name])
+        return data
+
+
+class QueryTrace:
+    """Mutable per-request state filled in while answering, frozen by finish()"""
+
+    def __init__(self, question: str):
+        self.question = question
+        self.method = None
+        self.ranked_ids: List[Any] = []
+        self.scores: List[float] = []
+        self.titles: List[str] = []
+        self.contexts: List[str] = []
+        self.timings: Dict[str, float] = {}
+        self.cache = {'answer_cache': False, 'query_cache': False}
+        self.fallback_reason = None
+        self._started_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Accumulate wall time spent in `name` (seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def add_hit(self, movie_id, score: float = 0.0, title: str = '') -> None:
+        if movie_id in self.ranked_ids:
+            return
+        self.ranked_ids.append(movie_id)
+        self.scores.append(float(score))
+        self.titles.append(title or '')
+
+    def finish(self, answer: str) -> QueryResult:
+        timings = dict(self.timings)
+        timings['total'] = time.perf_counter() - self._started_at
+        return QueryResult(
+            answer=answer,
+            method=self.method,
+            ranked_ids=tuple(self.ranked_ids),
+            scores=tuple(self.scores),
+            titles=tuple(self.titles),
+            contexts=tuple(self.contexts),
+            timings=MappingProxyType(timings),
+            cache=MappingProxyType(dict(self.cache)),
+            fallback_reason=self.fallback_reason
+        )
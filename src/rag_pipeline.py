@@ -1,9 +1,23 @@
+import threading
+import time
+
 from .llm_service import GeminiService
 from .vector_db import QdrantService
 from .graph_db import Neo4jService
 from .query_processor import QueryProcessor
 from .advanced_retriever import create_advanced_retriever
 from .organizer import create_organizer
+from .answer_cache import create_answer_cache
+from .gazetteer import get_gazetteer
+from .graph_engine import peek_graph_engine
+from .query_result import QueryResult, QueryTrace
+from .config import Config
+
+# Transient failure replies that must not be served from the answer cache
+_UNCACHEABLE_ANSWER_PREFIXES = (
+    "Sorry, the system",
+    "I apologize, but I'm unable",
+)
 
 class GraphRAG:
     def __init__(self, use_advanced_retriever=False, use_organizer=True, enable_fallback=True, augment_mode=False):
@@ -21,7 +35,11 @@ class GraphRAG:
         self.llm = GeminiService()
         self.vectordb = QdrantService()
         self.graphdb = Neo4jService()
-        self.query_processor = QueryProcessor(self.llm)
+        try:
+            self.graphdb.ensure_schema()
+        except Exception as e:
+            print(f"  ⚠️ Neo4j schema check failed: {e}")
+        self.query_processor = QueryProcessor(self.llm, gazetteer=get_gazetteer(self.graphdb))
         
         # Augmentation mode - always call both models
         self.augment_mode = augment_mode
@@ -42,10 +60,9 @@ class GraphRAG:
                 self.enable_fallback = False
                 self.augment_mode = False
         
-        # Store last contexts for evaluation
-        self.last_contexts = []
-        self.last_movies = []
-        self.last_method = None  # Track which method was used
+        # Compatibility shim: last_contexts/last_movies/last_method mirror the
+        # calling thread's most recent QueryResult (see last_result)
+        self._local = threading.local()
         
         # Advanced retriever (optional)
         self.use_advanced = use_advanced_retriever
@@ -60,22 +77,61 @@ class GraphRAG:
         if self.use_organizer:
             self.organizer = create_organizer(self.llm)
             print("  ✓ Graph Organizer enabled")
+        
+        # Semantic answer cache (None if disabled)
+        self.answer_cache = create_answer_cache()
+
+    @property
+    def last_result(self):
+        """Most recent QueryResult produced on the calling thread (None before the first query)"""
+        return getattr(self._local, 'result', None)
+
+    @property
+    def last_contexts(self):
+        result = self.last_result
+        return list(result.contexts) if result else []
+
+    @property
+    def last_movies(self):
+        result = self.last_result
+        return list(result.ranked_ids) if result else []
+
+    @property
+    def last_method(self):
+        result = self.last_result
+        return result.method if result else None
+
+    def _publish(self, result: QueryResult) -> QueryResult:
+        self._local.result = result
+        return result
 
-    def query(self, user_question, chat_history=None):
+    def _retrieve_context(self, user_question, trace: QueryTrace):
+        """
+        Steps 0-2.5 of the pipeline: query processing, retrieval, graph enrichment
+        and organization. Shared by query() and query_stream(); ranked IDs,
+        contexts, method and stage timings are recorded on `trace`.
+
+        Returns a dict with exactly one of:
+        - 'answer': final message that needs no LLM call (invalid query, busy)
+        - 'fallback_reason': go straight to the general knowledge model
+        - 'graph_context': prompt context (plus 'found_ids', 'context_is_relevant')
+        """
         print(f"\n🔎 Understanding: '{user_question}'...")
         
         # STEP 0: Query Processing (ENHANCED - GraphRAG)
         # Apply 5 query processing techniques with validation, caching, and confidence scoring
-        processed_query = self.query_processor.process_query(user_question, use_cache=True)
+        with trace.stage('query_processing'):
+            processed_query = self.query_processor.process_query(user_question, use_cache=True)
         
         # Check if query processing failed
         if processed_query.get('error'):
             print(f"  ⚠️ Query processing issue: {processed_query['error']}")
-            return "Sorry, your question is invalid or too short. Please try again with a clearer question."
+            return {'answer': "Sorry, your question is invalid or too short. Please try again with a clearer question."}
         
         # Show processing metrics
         confidence = processed_query.get('confidence', 0)
         cached = processed_query.get('cached', False)
+        trace.cache['query_cache'] = bool(cached)
         cache_indicator = " 📦" if cached else ""
         print(f"  ✓ Query processed (confidence: {confidence:.2f}){cache_indicator}")
         
@@ -83,11 +139,7 @@ class GraphRAG:
         CONFIDENCE_THRESHOLD = 0.75
         if confidence < CONFIDENCE_THRESHOLD:
             print(f"  ⚠️ Query confidence ({confidence:.2f}) below threshold ({CONFIDENCE_THRESHOLD}) - using fallback")
-            return self._fallback_to_general_knowledge(
-                user_question, 
-                chat_history, 
-                f"Low query confidence ({confidence:.2f} < {CONFIDENCE_THRESHOLD})"
-            )
+            return {'fallback_reason': f"Low query confidence ({confidence:.2f} < {CONFIDENCE_THRESHOLD})"}
         
         # Use rewritten query if available, otherwise enhanced query
         if processed_query.get('rewritten_query'):
@@ -99,6 +151,13 @@ class GraphRAG:
             )
             print(f"  → Enhanced: '{search_query[:80]}...'")
         
+        found_ids = []
+        
+        # Year range / genres the vector search can filter on
+        vector_filters = self._vector_filters(processed_query)
+        if vector_filters:
+            print(f"  ⧩ Vector filters: {vector_filters}")
+        
         # STEP 1: Retrieval (Basic or Advanced)
         if self.use_advanced:
             # ADVANCED RETRIEVAL: Hybrid Neural + Symbolic
@@ -107,24 +166,31 @@ class GraphRAG:
             query_metadata = {
                 'category': processed_query.get('category', 'unknown'),
                 'entities': processed_query.get('entities', []),
-                'relations': processed_query.get('relations', [])
+                'relations': processed_query.get('relations', []),
+                'filters': vector_filters
             }
             
-            retrieval_results = self.advanced_retriever.retrieve(
-                search_query,
-                query_metadata=query_metadata,
-                top_k_vector=6
-            )
+            with trace.stage('retrieval'):
+                retrieval_results = self.advanced_retriever.retrieve(
+                    search_query,
+                    query_metadata=query_metadata,
+                    top_k_vector=6
+                )
+            
+            for branch, seconds in retrieval_results.get('branch_timings', {}).items():
+                trace.timings[f'retrieval_{branch}'] = seconds
             
             # Check if we have meaningful results
             if not retrieval_results['contexts'] or retrieval_results['method'] == 'internal_knowledge':
                 print("💡 No relevant matches in database...")
-                return self._fallback_to_general_knowledge(user_question, chat_history, "No database matches")
+                return {'fallback_reason': "No database matches"}
             
             # Format contexts for LLM
             contexts = retrieval_results['contexts'][:15]
-            found_ids = []  # Advanced retriever handles this internally
-            self.last_method = 'advanced_retrieval'
+            # Advanced retriever handles IDs internally; fused movie candidates are reported
+            for hit in retrieval_results.get('ranked', []):
+                trace.add_hit(hit['id'], hit.get('score', 0), hit.get('title', ''))
+            trace.method = 'advanced_retrieval'
             
             # STEP 1.5: Apply Organizer if enabled
             if self.use_organizer:
@@ -134,16 +200,19 @@ class GraphRAG:
                     'graph_count': len([c for c in contexts if '[Graph' in c]),
                     'method': retrieval_results['method']
                 }
-                contexts = self.organizer.organize(
-                    contexts, 
-                    user_question,
-                    metadata=metadata,
-                    config={
-                        'max_contexts': 15,
-                        'diversity_threshold': 0.7,
-                        'position_strategy': 'important_first'
-                    }
-                )
+                with trace.stage('organization'):
+                    contexts = self.organizer.organize(
+                        contexts, 
+                        user_question,
+                        metadata=metadata,
+                        config={
+                            'max_contexts': 15,
+                            'diversity_threshold': 0.7,
+                            'position_strategy': 'important_first',
+                            # Contexts arrive already ranked by reciprocal rank fusion
+                            'enable_reranking': False
+                        }
+                    )
             
             graph_context = "\n".join(contexts)
             
@@ -151,66 +220,78 @@ class GraphRAG:
             # BASIC RETRIEVAL: Vector Search Only
             print("📊 Using Basic Vector Retrieval...")
             
-            # Find movies with similar themes, plots, and descriptions
-            query_vec = self.llm.get_embedding(search_query, task_type="retrieval_query")
+            # Find movies with similar themes, plots, and descriptions. The original
+            # question (when rewritten) and decomposed sub-queries are searched too:
+            # one embedding batch and one batched Qdrant request for all of them
+            search_queries = [search_query]
+            extra_queries = list(processed_query.get('sub_queries') or [])
+            if processed_query.get('rewritten_query'):
+                extra_queries.insert(0, user_question)
+            for extra in extra_queries:
+                if extra and extra not in search_queries:
+                    search_queries.append(extra)
             
-            if not query_vec:
-                return "Sorry, the system is busy and unable to create vectors."
+            with trace.stage('retrieval'):
+                query_vecs = self.llm.get_embeddings(search_queries, task_type="retrieval_query")
+                
+                if not query_vecs or not query_vecs[0]:
+                    return {'answer': "Sorry, the system is busy and unable to create vectors."}
 
-            search_results = self.vectordb.search(query_vec, top_k=8)  # ⚡ Tăng từ 6->8 để có nhiều choices
-            
-            # RELEVANCE FILTERING: Stricter threshold to reduce noise
-            RELEVANCE_THRESHOLD = 0.5  # ⚡ Tăng từ 0.45 -> 0.5 để filter contexts không relevant
-          
+                # RELEVANCE FILTERING: Stricter threshold to reduce noise; applied by
+                # Qdrant, and only the fields used below come back
+                RELEVANCE_THRESHOLD = 0.5  # ⚡ Tăng từ 0.45 -> 0.5 để filter contexts không relevant
+                search_options = dict(
+                    top_k=8,  # ⚡ Tăng từ 6->8 để có nhiều choices
+                    score_threshold=RELEVANCE_THRESHOLD,
+                    payload_fields=['movie_id', 'tmdb_id', 'id', 'title']
+                )
+                hit_lists = self.vectordb.search_many(query_vecs, filters=vector_filters, **search_options)
+                search_results = self._merge_hits(hit_lists, top_k=8)
+                if vector_filters and not search_results:
+                    print(f"  ⚠️ No matches with filters {vector_filters} - searching without them")
+                    hit_lists = self.vectordb.search_many(query_vecs, **search_options)
+                    search_results = self._merge_hits(hit_lists, top_k=8)
+                if len(search_queries) > 1:
+                    print(f"  → Searched {len(search_queries)} query variants in one batch")
             
             if search_results:
-                relevant_results = []
-                for item in search_results:
-                    score = item.score if hasattr(item, 'score') else 0
-                    if score >= RELEVANCE_THRESHOLD:
-                        relevant_results.append(item)
-                
-                if relevant_results:
-                    print(f"  ✓ Found {len(relevant_results)}/{len(search_results)} relevant matches (threshold: {RELEVANCE_THRESHOLD})")
-                    search_results = relevant_results
-                else:
-                    print(f"  ⚠️ No results above relevance threshold ({RELEVANCE_THRESHOLD}) - using general knowledge")
-                    search_results = []
-            
-            if not search_results:
+                print(f"  ✓ Found {len(search_results)} relevant matches (threshold: {RELEVANCE_THRESHOLD})")
+            else:
                 # If no relevant results, fallback to general knowledge model
+                print(f"  ⚠️ No results above relevance threshold ({RELEVANCE_THRESHOLD}) - using general knowledge")
                 print("💡 No relevant database matches...")
-                return self._fallback_to_general_knowledge(user_question, chat_history, "No vector matches above threshold")
+                return {'fallback_reason': "No vector matches above threshold"}
 
             # Extract movie IDs from vector search results
-            found_ids = []
             for item in search_results:
                 payload = item.payload if hasattr(item, 'payload') else item
                 mid = payload.get('movie_id') or payload.get('tmdb_id') or payload.get('id')
                 if mid:
                     found_ids.append(mid)
+                    trace.add_hit(mid, getattr(item, 'score', 0) or 0, payload.get('title', ''))
             print(f"✅ Found {len(found_ids)} relevant movies in database")
-            self.last_method = 'basic_retrieval'
+            trace.method = 'basic_retrieval'
 
         # STEP 2: Graph Database Enrichment (Enhanced with Relations)
         # Use IDs to fetch enriched context: director, cast, relationships, genres, themes
         print("🕸️  Enriching with detailed information...")
         
-        # Use relation-aware search if relations were detected
-        if processed_query['relations']:
-            print(f"  → Using relation-aware search: {[r['type'] for r in processed_query['relations']]}")
-            # Try relation-aware method if available
-            if hasattr(self.graphdb, 'get_relation_aware_context'):
-                graph_context = self.graphdb.get_relation_aware_context(
-                    found_ids, 
-                    processed_query['relations'],
-                    processed_query['entities']
-                )
+        with trace.stage('graph_enrichment'):
+            # Use relation-aware search if relations were detected
+            if processed_query['relations']:
+                print(f"  → Using relation-aware search: {[r['type'] for r in processed_query['relations']]}")
+                # Try relation-aware method if available
+                if hasattr(self.graphdb, 'get_relation_aware_context'):
+                    graph_context = self.graphdb.get_relation_aware_context(
+                        found_ids, 
+                        processed_query['relations'],
+                        processed_query['entities']
+                    )
+                else:
+                    # Fallback to standard method
+                    graph_context = self.graphdb.get_graph_context(found_ids)
             else:
-                # Fallback to standard method
                 graph_context = self.graphdb.get_graph_context(found_ids)
-        else:
-            graph_context = self.graphdb.get_graph_context(found_ids)
         
         if not graph_context:
             # Even if graph enrichment fails, use basic vector results
@@ -229,48 +310,146 @@ class GraphRAG:
                     'graph_count': len(contexts),
                     'method': 'basic_retrieval'
                 }
-                organized_contexts = self.organizer.organize(
-                    contexts,
-                    user_question,
-                    metadata=metadata,
-                    config={
-                        'max_contexts': 12,
-                        'diversity_threshold': 0.65,
-                        'position_strategy': 'important_first'
-                    }
-                )
+                with trace.stage('organization'):
+                    organized_contexts = self.organizer.organize(
+                        contexts,
+                        user_question,
+                        metadata=metadata,
+                        config={
+                            'max_contexts': 12,
+                            'diversity_threshold': 0.65,
+                            'position_strategy': 'important_first'
+                        }
+                    )
                 graph_context = "\n\n".join(organized_contexts)
 
-        # STEP 3: LLM Response Generation
-        # Synthesize answer with conversational, engaging tone
-        print("🤖 Generating thoughtful response...")
-        
         # Store contexts for evaluation
         if self.use_advanced:
             # For advanced retrieval, contexts are already in list form
-            self.last_contexts = contexts[:15] if contexts else []
+            trace.contexts = contexts[:15] if contexts else []
         else:
             # For basic retrieval, split graph_context into individual movie contexts
-            self.last_contexts = graph_context.split('\n\n') if graph_context else []
-        
-        # Store movie IDs
-        self.last_movies = found_ids if 'found_ids' in locals() else []
+            trace.contexts = graph_context.split('\n\n') if graph_context else []
         
         # Only mark context as "provided" if we have meaningful graph context
         # This affects how LLM treats the database information
-        context_is_relevant = (
+        context_is_relevant = bool(
             graph_context and 
             graph_context.strip() and 
             "unavailable" not in graph_context.lower() and
             len(graph_context) > 50  # Meaningful context should be substantial
         )
         
-        answer = self.llm.generate_answer(
-            graph_context, 
-            user_question, 
-            context_provided=context_is_relevant, 
-            chat_history=chat_history
-        )
+        return {
+            'graph_context': graph_context,
+            'found_ids': found_ids,
+            'context_is_relevant': context_is_relevant
+        }
+
+    @staticmethod
+    def _vector_filters(processed_query):
+        """Structured vector-search filters from the processed query (None if there are none)"""
+        if not Config.VECTOR_FILTERS_ENABLED:
+            return None
+        filters = (processed_query.get('structured_query') or {}).get('filters') or {}
+        structured = {}
+        if filters.get('year_range'):
+            structured['year'] = filters['year_range']
+        if filters.get('genres'):
+            structured['genres'] = filters['genres']
+        return structured or None
+    
+    @staticmethod
+    def _merge_hits(hit_lists, top_k=8):
+        """Merge per-query hit lists: best score per movie, highest first"""
+        best = {}
+        for hits in hit_lists:
+            for item in hits:
+                payload = item.payload or {}
+                key = payload.get('movie_id') or payload.get('tmdb_id') or payload.get('id') or item.id
+                if key not in best or item.score > best[key].score:
+                    best[key] = item
+        return sorted(best.values(), key=lambda item: item.score, reverse=True)[:top_k]
+    
+    def _lookup_cached_answer(self, user_question, chat_history, trace: QueryTrace):
+        """
+        Embed the question and look it up in the answer cache; a hit is copied
+        onto `trace`. Returns (embedding, scope, entry); entry is None on a miss,
+        embedding is None if caching is off or the embedding failed.
+        """
+        if not self.answer_cache:
+            return None, None, None
+        with trace.stage('answer_cache'):
+            embedding = self.llm.get_embedding(user_question, task_type="retrieval_query")
+            if not embedding:
+                return None, None, None
+            scope = self.query_processor.cache_scope(user_question)
+            entry = self.answer_cache.lookup(embedding, chat_history, scope=scope)
+        if entry:
+            print(f"  📦 Answer cache hit (similarity {entry['similarity']:.3f}): '{entry['question']}'")
+            trace.cache['answer_cache'] = True
+            trace.method = entry['method']
+            for movie_id, score, title in zip(entry['ranked_ids'], entry['scores'], entry['titles']):
+                trace.add_hit(movie_id, score, title)
+            trace.contexts = list(entry['contexts'])
+        return embedding, scope, entry
+
+    def _store_cached_answer(self, embedding, scope, user_question, chat_history, result: QueryResult):
+        if embedding is None or not result.answer or result.method is None:
+            return
+        if result.answer.startswith(_UNCACHEABLE_ANSWER_PREFIXES):
+            return
+        self.answer_cache.store(embedding, chat_history, {
+            'question': user_question,
+            'answer': result.answer,
+            'method': result.method,
+            'ranked_ids': result.ranked_ids,
+            'scores': result.scores,
+            'titles': result.titles,
+            'contexts': result.contexts
+        }, scope=scope)
+
+    def query(self, user_question, chat_history=None) -> QueryResult:
+        """
+        Answer `user_question`.
+
+        Returns an immutable QueryResult (str(result) is the answer) with ranked
+        IDs and scores, contexts, method, per-stage timings and cache flags.
+        last_contexts/last_movies/last_method mirror it for the calling thread.
+        """
+        trace = QueryTrace(user_question)
+        embedding, scope, cached = self._lookup_cached_answer(user_question, chat_history, trace)
+        if cached:
+            return self._publish(trace.finish(cached['answer']))
+        
+        answer = self._answer_query(user_question, chat_history, trace)
+        result = self._publish(trace.finish(answer))
+        self._store_cached_answer(embedding, scope, user_question, chat_history, result)
+        return result
+
+    def _answer_query(self, user_question, chat_history, trace: QueryTrace):
+        retrieval = self._retrieve_context(user_question, trace)
+        if 'answer' in retrieval:
+            return retrieval['answer']
+        if 'fallback_reason' in retrieval:
+            return self._fallback_to_general_knowledge(
+                user_question, chat_history, retrieval['fallback_reason'], trace=trace
+            )
+        
+        graph_context = retrieval['graph_context']
+        context_is_relevant = retrieval['context_is_relevant']
+
+        # STEP 3: LLM Response Generation
+        # Synthesize answer with conversational, engaging tone
+        print("🤖 Generating thoughtful response...")
+        
+        with trace.stage('generation'):
+            answer = self.llm.generate_answer(
+                graph_context, 
+                user_question, 
+                context_provided=context_is_relevant, 
+                chat_history=chat_history
+            )
         
         # STEP 3.5: Augmentation Mode - Always combine with general knowledge
         if self.augment_mode and self.fallback_llm:
@@ -279,12 +458,14 @@ class GraphRAG:
                 user_question,
                 rag_answer=answer,
                 rag_contexts=graph_context,
-                has_database_context=context_is_relevant
+                has_database_context=context_is_relevant,
+                trace=trace
             )
         
         # STEP 3.6: Post-Generation Hallucination Check & Confidence Validation (Fallback mode)
         if context_is_relevant:
-            answer = self._validate_answer_grounding(answer, graph_context, user_question)
+            with trace.stage('validation'):
+                answer = self._validate_answer_grounding(answer, graph_context, user_question)
             
             # Additional check: If answer seems to lack confidence or admits uncertainty
             if self._is_low_confidence_answer(answer):
@@ -293,10 +474,128 @@ class GraphRAG:
                     user_question, 
                     chat_history, 
                     "Low confidence in RAG answer",
-                    rag_answer=answer
+                    rag_answer=answer,
+                    trace=trace
                 )
         
         return answer
+
+    def query_stream(self, user_question, chat_history=None):
+        """
+        Streaming variant of query(). Yields event dicts:
+        - {'type': 'retrieval', 'movies': [{'id', 'title'}], 'method'}: before generation
+        - {'type': 'token', 'content'}: answer chunks as Gemini produces them
+        - {'type': 'reset', 'reason'}: discard streamed text; a fallback answer follows
+        - {'type': 'notice', 'content'}: grounding warning for the streamed answer
+        - {'type': 'done', 'method', 'result'}: result is the final QueryResult
+        """
+        trace = QueryTrace(user_question)
+        embedding, scope, cached = self._lookup_cached_answer(user_question, chat_history, trace)
+        if cached:
+            result = self._publish(trace.finish(cached['answer']))
+            yield {'type': 'retrieval', 'movies': self._trace_movies(trace), 'method': trace.method}
+            yield {'type': 'token', 'content': result.answer}
+            yield {'type': 'done', 'method': result.method, 'result': result}
+            return
+        
+        parts = []
+        notice = None
+        for event in self._stream_answer(user_question, chat_history, trace):
+            if event['type'] == 'token':
+                parts.append(event['content'])
+            elif event['type'] == 'reset':
+                parts = []
+                notice = None
+            elif event['type'] == 'notice':
+                notice = event['content']
+            yield event
+        
+        # The result carries the same text query() would have returned
+        answer = "".join(parts).strip()
+        if notice:
+            answer = f"{notice}\n\n{answer}"
+        result = self._publish(trace.finish(answer))
+        self._store_cached_answer(embedding, scope, user_question, chat_history, result)
+        yield {'type': 'done', 'method': result.method, 'result': result}
+
+    @staticmethod
+    def _trace_movies(trace: QueryTrace):
+        return [
+            {'id': movie_id, 'title': title}
+            for movie_id, title in zip(trace.ranked_ids, trace.titles)
+        ]
+
+    def _stream_answer(self, user_question, chat_history, trace: QueryTrace):
+        """Event stream for query_stream() without the final 'done' event"""
+        retrieval = self._retrieve_context(user_question, trace)
+        
+        yield {
+            'type': 'retrieval',
+            'movies': self._trace_movies(trace),
+            'method': trace.method
+        }
+        
+        if 'answer' in retrieval:
+            yield {'type': 'token', 'content': retrieval['answer']}
+            return
+        
+        if 'fallback_reason' in retrieval:
+            for chunk in self._fallback_stream(
+                user_question, chat_history, retrieval['fallback_reason'], trace=trace
+            ):
+                yield {'type': 'token', 'content': chunk}
+            return
+        
+        graph_context = retrieval['graph_context']
+        context_is_relevant = retrieval['context_is_relevant']
+        
+        print("🤖 Streaming thoughtful response...")
+        
+        # Augmentation needs the complete RAG answer before synthesis can start,
+        # so only the final synthesized answer is streamed
+        if self.augment_mode and self.fallback_llm:
+            with trace.stage('generation'):
+                answer = self.llm.generate_answer(
+                    graph_context,
+                    user_question,
+                    context_provided=context_is_relevant,
+                    chat_history=chat_history
+                )
+            print("  🔀 Augmentation mode: Combining database + general knowledge...")
+            for chunk in self._augment_stream(user_question, rag_answer=answer, trace=trace):
+                yield {'type': 'token', 'content': chunk}
+            return
+        
+        parts = []
+        started_at = time.perf_counter()
+        for chunk in self.llm.generate_answer_stream(
+            graph_context,
+            user_question,
+            context_provided=context_is_relevant,
+            chat_history=chat_history
+        ):
+            if not parts:
+                trace.timings['first_token'] = time.perf_counter() - started_at
+            parts.append(chunk)
+            yield {'type': 'token', 'content': chunk}
+        trace.timings['generation'] = time.perf_counter() - started_at
+        answer = "".join(parts).strip()
+        
+        # Same post-generation checks as query(), applied once the stream ends
+        if context_is_relevant:
+            with trace.stage('validation'):
+                warning = self._grounding_warning(answer, graph_context)
+            if warning:
+                yield {'type': 'notice', 'content': warning}
+            
+            if self._is_low_confidence_answer(f"{warning}\n\n{answer}" if warning else answer):
+                print("  ⚠️ Low confidence detected in RAG answer, trying fallback...")
+                yield {'type': 'reset', 'reason': "Low confidence in RAG answer"}
+                for chunk in self._fallback_stream(
+                    user_question, chat_history, "Low confidence in RAG answer",
+                    rag_answer=answer, trace=trace
+                ):
+                    yield {'type': 'token', 'content': chunk}
     
     def _is_low_confidence_answer(self, answer: str) -> bool:
         """
@@ -330,7 +629,8 @@ class GraphRAG:
             
         return False
     
-    def _fallback_to_general_knowledge(self, question: str, chat_history=None, reason="", rag_answer=None):
+    def _fallback_to_general_knowledge(self, question: str, chat_history=None, reason="", rag_answer=None,
+                                       trace: QueryTrace = None):
         """
         Fallback to general knowledge model when RAG doesn't have sufficient information
         
@@ -339,20 +639,67 @@ class GraphRAG:
             chat_history: Conversation history
             reason: Why fallback was triggered
             rag_answer: Previous RAG answer (if any) for reference
+            trace: Request trace that records method, reason and timing
         """
+        trace = trace or QueryTrace(question)
         if not self.enable_fallback or not self.fallback_llm:
             # If fallback disabled, return honest admission
             return "I apologize, but I don't have specific information about this in my movie database. Please ask about movies that are available in the system."
         
         print(f"🔄 Switching to fallback model ({reason})...")
-        self.last_method = 'fallback_general_knowledge'
+        trace.method = 'fallback_general_knowledge'
+        trace.fallback_reason = reason
         
+        try:
+            # Use fallback LLM directly via generate for custom system role
+            with trace.stage('fallback'):
+                answer = self.fallback_llm.generate(
+                    self._build_fallback_full_prompt(question, rag_answer),
+                    safety_settings=self.fallback_llm.safety_settings
+                ).text
+            
+            print("✅ Fallback model provided answer")
+            return answer
+            
+        except Exception as e:
+            print(f"❌ Fallback model error: {e}")
+            return "I apologize, but I'm unable to provide information about this topic at the moment. Please try asking about movies in the database."
+    
+    def _fallback_stream(self, question: str, chat_history=None, reason="", rag_answer=None,
+                         trace: QueryTrace = None):
+        """Streaming variant of _fallback_to_general_knowledge (yields text chunks)"""
+        trace = trace or QueryTrace(question)
+        if not self.enable_fallback or not self.fallback_llm:
+            yield "I apologize, but I don't have specific information about this in my movie database. Please ask about movies that are available in the system."
+            return
+        
+        print(f"🔄 Streaming from fallback model ({reason})...")
+        trace.method = 'fallback_general_knowledge'
+        trace.fallback_reason = reason
+        
+        streamed = False
+        started_at = time.perf_counter()
+        try:
+            for chunk in self.fallback_llm.generate_stream(
+                self._build_fallback_full_prompt(question, rag_answer),
+                safety_settings=self.fallback_llm.safety_settings
+            ):
+                streamed = True
+                yield chunk
+            print("✅ Fallback model provided answer")
+        except Exception as e:
+            print(f"❌ Fallback model error: {e}")
+            if not streamed:
+                yield "I apologize, but I'm unable to provide information about this topic at the moment. Please try asking about movies in the database."
+        trace.timings['fallback'] = time.perf_counter() - started_at
+    
+    def _build_fallback_full_prompt(self, question: str, rag_answer=None) -> str:
+        """System context for the general knowledge assistant + fallback prompt"""
         # Create enhanced prompt for fallback model
         fallback_prompt = self._create_fallback_prompt(question, rag_answer)
         
-        try:
-            # Create a system context for general knowledge assistant
-            system_context = """You are a knowledgeable AI assistant with expertise in entertainment, movies, actors, directors, and general knowledge.
+        # Create a system context for general knowledge assistant
+        system_context = """You are a knowledgeable AI assistant with expertise in entertainment, movies, actors, directors, and general knowledge.
 
 Your role is to provide accurate, comprehensive answers to user questions. You have broad knowledge about:
 - Cinema history and film industry
@@ -364,23 +711,11 @@ Your role is to provide accurate, comprehensive answers to user questions. You h
 
 Provide direct, factual answers without mentioning databases or technical limitations."""
 
-            # Combine system context with user question
-            full_prompt = f"{system_context}\n\n{fallback_prompt}"
-            
-            # Use fallback LLM directly via generate_content for custom system role
-            answer = self.fallback_llm.model.generate_content(
-                full_prompt,
-                safety_settings=self.fallback_llm.safety_settings
-            ).text
-            
-            print("✅ Fallback model provided answer")
-            return answer
-            
-        except Exception as e:
-            print(f"❌ Fallback model error: {e}")
-            return "I apologize, but I'm unable to provide information about this topic at the moment. Please try asking about movies in the database."
+        # Combine system context with user question
+        return f"{system_context}\n\n{fallback_prompt}"
     
-    def _augment_with_general_knowledge(self, question: str, rag_answer: str, rag_contexts: str, has_database_context: bool):
+    def _augment_with_general_knowledge(self, question: str, rag_answer: str, rag_contexts: str, has_database_context: bool,
+                                        trace: QueryTrace = None):
         """
         Augment RAG answer with general knowledge for comprehensive response
         
@@ -389,29 +724,73 @@ Provide direct, factual answers without mentioning databases or technical limita
         if not self.fallback_llm:
             return rag_answer
         
-        self.last_method = 'augmented_response'
+        trace = trace or QueryTrace(question)
+        trace.method = 'augmented_response'
         
         try:
-            # Get general knowledge perspective
-            general_knowledge_prompt = f"""Please provide general knowledge context about this question:
+            with trace.stage('augmentation'):
+                general_knowledge = self._get_general_knowledge_context(question)
+                
+                # Now synthesize both answers
+                synthesized_answer = self.llm.generate(
+                    self._build_synthesis_prompt(question, rag_answer, general_knowledge),
+                    safety_settings=self.llm.safety_settings
+                ).text
+            
+            print("  ✅ Synthesized augmented answer")
+            return synthesized_answer
+            
+        except Exception as e:
+            print(f"  ❌ Augmentation error: {e}, returning RAG answer")
+            return rag_answer
+    
+    def _augment_stream(self, question: str, rag_answer: str, trace: QueryTrace = None):
+        """Streaming variant of _augment_with_general_knowledge (yields text chunks)"""
+        trace = trace or QueryTrace(question)
+        trace.method = 'augmented_response'
+        
+        streamed = False
+        started_at = time.perf_counter()
+        try:
+            general_knowledge = self._get_general_knowledge_context(question)
+            
+            for chunk in self.llm.generate_stream(
+                self._build_synthesis_prompt(question, rag_answer, general_knowledge),
+                safety_settings=self.llm.safety_settings
+            ):
+                streamed = True
+                yield chunk
+            print("  ✅ Synthesized augmented answer")
+            
+        except Exception as e:
+            print(f"  ❌ Augmentation error: {e}, returning RAG answer")
+            if not streamed:
+                yield rag_answer
+        trace.timings['augmentation'] = time.perf_counter() - started_at
+    
+    def _get_general_knowledge_context(self, question: str) -> str:
+        """Ask the fallback model for background context on the question"""
+        # Get general knowledge perspective
+        general_knowledge_prompt = f"""Please provide general knowledge context about this question:
 
 "{question}"
 
 Focus on providing factual background, historical context, industry knowledge, or related information that helps understand the topic better. Be concise but informative."""
 
-            system_context = """You are a knowledgeable entertainment and cinema expert. Provide contextual information, background facts, and relevant details to enrich answers about movies, actors, directors, and film industry topics."""
+        system_context = """You are a knowledgeable entertainment and cinema expert. Provide contextual information, background facts, and relevant details to enrich answers about movies, actors, directors, and film industry topics."""
 
-            full_prompt = f"{system_context}\n\n{general_knowledge_prompt}"
-            
-            general_knowledge = self.fallback_llm.model.generate_content(
-                full_prompt,
-                safety_settings=self.fallback_llm.safety_settings
-            ).text
-            
-            print(f"  ✓ Got general knowledge context ({len(general_knowledge)} chars)")
-            
-            # Now synthesize both answers
-            synthesis_prompt = f"""You are synthesizing information from two sources to create a comprehensive answer.
+        full_prompt = f"{system_context}\n\n{general_knowledge_prompt}"
+        
+        general_knowledge = self.fallback_llm.generate(
+            full_prompt,
+            safety_settings=self.fallback_llm.safety_settings
+        ).text
+        
+        print(f"  ✓ Got general knowledge context ({len(general_knowledge)} chars)")
+        return general_knowledge
+    
+    def _build_synthesis_prompt(self, question: str, rag_answer: str, general_knowledge: str) -> str:
+        return f"""You are synthesizing information from two sources to create a comprehensive answer.
 
 USER QUESTION: "{question}"
 
@@ -430,18 +809,6 @@ Create a unified, comprehensive answer that:
 5. If sources conflict, trust database (Source 1) for specific movie details
 
 IMPORTANT: Don't mention "sources" or "databases" in your answer. Write naturally as if you have comprehensive knowledge."""
-
-            synthesized_answer = self.llm.model.generate_content(
-                synthesis_prompt,
-                safety_settings=self.llm.safety_settings
-            ).text
-            
-            print("  ✅ Synthesized augmented answer")
-            return synthesized_answer
-            
-        except Exception as e:
-            print(f"  ❌ Augmentation error: {e}, returning RAG answer")
-            return rag_answer
     
     def _create_fallback_prompt(self, original_question: str, rag_answer=None) -> str:
         """
@@ -460,7 +827,17 @@ Provide a comprehensive, factual answer. Focus on delivering accurate informatio
     def _validate_answer_grounding(self, answer: str, context: str, question: str) -> str:
         """
         Post-generation validation to catch hallucinations
-        Checks if answer contains facts not in context
+        Prepends the grounding warning (if any) to the answer
+        """
+        warning = self._grounding_warning(answer, context)
+        if warning:
+            # Prepend honesty disclaimer
+            answer = f"{warning}\n\n{answer}"
+        return answer
+    
+    def _grounding_warning(self, answer: str, context: str):
+        """
+        Disclaimer for an answer that contains facts not in context, else None
         """
         # Simple heuristic checks for common hallucination patterns
         hallucination_markers = [
@@ -481,24 +858,35 @@ Provide a comprehensive, factual answer. Focus on delivering accurate informatio
         # If multiple suspicious patterns, add disclaimer
         if suspicious_count >= 2:
             print(f"  ⚠️  Detected {suspicious_count} potential hallucinations")
-            # Prepend honesty disclaimer
-            answer = (
-                "*Note: Some information below may need further verification as it's not fully available in the database.*\n\n"
-                + answer
-            )
+            return "*Note: Some information below may need further verification as it's not fully available in the database.*"
         
-        return answer
+        return None
     
     def get_query_stats(self):
         """Get query processing statistics"""
         stats = self.query_processor.get_stats()
         stats['last_method'] = self.last_method
         stats['fallback_enabled'] = self.enable_fallback
+        if self.llm.embedding_cache:
+            stats['embedding_cache'] = self.llm.embedding_cache.get_stats()
+        stats['rate_limiter'] = self.llm.rate_limiter.get_metrics()
+        stats['prompt'] = self.llm.prompt_builder.get_stats()
+        if self.answer_cache:
+            stats['answer_cache'] = self.answer_cache.get_stats()
+        if self.graphdb.context_cache:
+            stats['graph_context_cache'] = self.graphdb.context_cache.get_stats()
+        graph_engine = peek_graph_engine()
+        if graph_engine:
+            stats['graph_engine'] = graph_engine.get_stats()
         return stats
     
     def clear_query_cache(self):
-        """Clear the query cache"""
+        """Clear the query cache, the answer cache and rendered graph context"""
         self.query_processor.clear_cache()
+        if self.answer_cache:
+            self.answer_cache.clear()
+        if self.graphdb.context_cache:
+            self.graphdb.context_cache.clear()
     
     def get_last_method(self):
         """Get the method used for the last query"""
@@ -0,0 +1,217 @@
+"""
+Process-wide Rate Limiter for Gemini calls
+- Token buckets per model: requests-per-minute (RPM) and tokens-per-minute (TPM)
+- Jittered exponential backoff that honors the server's retry-after hint
+- A 429 pauses the model for every thread, not just the one that got throttled
+- Queue wait and throttle events are recorded as metrics
+"""
+
+import re
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from .config import Config
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity/60 per second"""
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.refill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill(now)
+        # Requests larger than the bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class ModelLimiter:
+    """RPM + TPM buckets and throttle state for one model"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.metrics = {
+            'requests': 0,
+            'tokens': 0,
+            'waits': 0,
+            'total_wait_s': 0.0,
+            'max_wait_s': 0.0,
+            'throttle_events': 0,
+            'last_retry_after_s': None
+        }
+
+
+class RateLimiter:
+    """Shared limiter; use get_rate_limiter() rather than instantiating directly"""
+
+    def __init__(self, limits: Dict[str, Dict[str, float]] = None,
+                 default_rpm: float = 60, default_tpm: float = 1_000_000):
+        self.limits = limits or {}
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self._models: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            limit = self.limits.get(model, {})
+            limiter = ModelLimiter(
+                limit.get('rpm', self.default_rpm),
+                limit.get('tpm', self.default_tpm)
+            )
+            self._models[model] = limiter
+        return limiter
+
+    def reserve(self, model: str, tokens: int = 0) -> float:
+        """
+        Try to take one request slot and `tokens` tokens for `model`.
+        Returns 0 if granted, otherwise the seconds to wait before trying again.
+        Never sleeps, so sync and async callers can share it.
+        """
+        with self._lock:
+            limiter = self._get_model(model)
+            now = time.monotonic()
+            wait = max(
+                limiter.paused_until - now,
+                limiter.requests.time_until_available(1, now),
+                limiter.tokens.time_until_available(tokens, now)
+            )
+            if wait > 0:
+                return wait
+            limiter.requests.consume(1)
+            limiter.tokens.consume(tokens)
+            limiter.metrics['requests'] += 1
+            limiter.metrics['tokens'] += tokens
+            return 0.0
+
+    def record_wait(self, model: str, waited: float) -> None:
+        if waited <= 0:
+            return
+        with self._lock:
+            metrics = self._get_model(model).metrics
+            metrics['waits'] += 1
+            metrics['total_wait_s'] += waited
+            metrics['max_wait_s'] = max(metrics['max_wait_s'], waited)
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """Block until a request for `model` may be sent; returns seconds spent queued"""
+        start = time.monotonic()
+        while True:
+            wait = self.reserve(model, tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        waited = time.monotonic() - start
+        self.record_wait(model, waited)
+        return waited
+
+    async def aacquire(self, model: str, tokens: int = 0) -> float:
+        """Async acquire(): waits with asyncio.sleep so the event loop keeps running"""
+        start = time.monotonic()
+        while True:
+            wait = self.reserve(model, tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - start
+        self.record_wait(model, waited)
+        return waited
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None,
+                      base: float = 1.0, cap: float = 60.0) -> float:
+        """Full-jitter exponential backoff, never shorter than retry_after"""
+        delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, 1))
+        return delay
+
+    def on_throttle(self, model: str, attempt: int, error: Exception = None) -> float:
+        """
+        Record a 429 for `model` and pause it for all threads.
+        Returns the delay the caller should back off for.
+        """
+        retry_after = parse_retry_after(error) if error is not None else None
+        delay = self.backoff_delay(attempt, retry_after, base=2.0)
+        with self._lock:
+            limiter = self._get_model(model)
+            limiter.paused_until = max(limiter.paused_until, time.monotonic() + delay)
+            limiter.metrics['throttle_events'] += 1
+            limiter.metrics['last_retry_after_s'] = retry_after
+        return delay
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for model, limiter in self._models.items():
+                metrics = dict(limiter.metrics)
+                metrics['avg_wait_s'] = (
+                    metrics['total_wait_s'] / metrics['waits'] if metrics['waits'] else 0.0
+                )
+                metrics['rpm_limit'] = limiter.requests.capacity
+                metrics['tpm_limit'] = limiter.tokens.capacity
+                result[model] = metrics
+            return result
+
+
+def is_quota_error(error: Exception) -> bool:
+    error_msg = str(error)
+    return "429" in error_msg or "quota" in error_msg.lower() or "resource exhausted" in error_msg.lower()
+
+
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)', re.IGNORECASE),
+    re.compile(r'retry[- ]after[:\s]+(\d+(?:\.\d+)?)', re.IGNORECASE),
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+]
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extract the server's retry hint (seconds) from a Gemini error, if any"""
+    text = str(error)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def estimate_tokens(text) -> int:
+    """Cheap token estimate (~4 characters per token) for TPM accounting"""
+    if isinstance(text, (list, tuple)):
+        return sum(estimate_tokens(t) for t in text)
+    return max(1, len(str(text)) // 4)
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every GeminiService instance"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(Config.RATE_LIMITS)
+        return _shared_limiter
@@ -9,6 +9,9 @@ from .vector_db import QdrantService
 class SimpleRAG:
     """Baseline RAG using only Vector Database (no Graph enrichment)"""
     
+    # Payload fields used to build the context (everything else stays in Qdrant)
+    CONTEXT_FIELDS = ['title', 'year', 'overview', 'genres', 'directors', 'cast', 'keywords']
+    
     def __init__(self):
         self.llm = GeminiService()
         self.vectordb = QdrantService()
@@ -24,24 +27,20 @@ class SimpleRAG:
         if not query_vec:
             return "Sorry, the system is busy and unable to create vectors."
         
-        search_results = self.vectordb.search(query_vec, top_k=6)
-        
-        # RELEVANCE FILTERING (same as GraphRAG for fair comparison)
+        # RELEVANCE FILTERING (same as GraphRAG for fair comparison), done by Qdrant
         # NOTE: Current database has low scores (0.04-0.12 range)
         RELEVANCE_THRESHOLD = 0.08  # Lowered from 0.45 due to embedding issues
         
+        search_results = self.vectordb.search(
+            query_vec, top_k=6,
+            score_threshold=RELEVANCE_THRESHOLD,
+            payload_fields=self.CONTEXT_FIELDS
+        )
+        
         if search_results:
-            relevant_results = [
-                item for item in search_results 
-                if (item.score if hasattr(item, 'score') else 0) >= RELEVANCE_THRESHOLD
-            ]
-            
-            if relevant_results:
-                print(f"  ✓ Found {len(relevant_results)}/{len(search_results)} relevant matches")
-                search_results = relevant_results
-            else:
-                print(f"  ⚠️ No results above threshold - using general knowledge")
-                search_results = []
+            print(f"  ✓ Found {len(search_results)} relevant matches")
+        else:
+            print(f"  ⚠️ No results above threshold - using general knowledge")
         
         if not search_results:
             print("💡 No relevant matches — using general knowledge...")
@@ -1,8 +1,35 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct, Filter
+from qdrant_client.models import (
+    VectorParams, Distance, PointStruct, Filter, QueryRequest,
+    FieldCondition, Range, MatchAny, PayloadSchemaType
+)
 from .config import Config
 
+
+def ensure_payload_indexes(client, collection_name, indexes):
+    """Create the missing payload indexes so filtered searches don't scan every point"""
+    try:
+        existing = client.get_collection(collection_name).payload_schema or {}
+        for field, schema in indexes.items():
+            if field not in existing:
+                client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field,
+                    field_schema=schema
+                )
+                print(f"✅ Created payload index '{field}' ({schema.value}) in Qdrant.")
+    except Exception as e:
+        print(f"⚠️ Could not create payload indexes: {e}")
+
+
 class QdrantService:
+    # Payload fields the structured query filters run on
+    PAYLOAD_INDEXES = {
+        'year': PayloadSchemaType.INTEGER,
+        'genres': PayloadSchemaType.KEYWORD,
+        'rating': PayloadSchemaType.FLOAT,
+    }
+
     def __init__(self):
         # Connect to Qdrant (Cloud or Local)
         if Config.QDRANT_API_KEY:
@@ -16,6 +43,7 @@ class QdrantService:
             self.client = QdrantClient(url=Config.QDRANT_URL)
         self.collection_name = Config.QDRANT_COLLECTION
         self._create_collection_if_not_exists()
+        self._ensure_payload_indexes()
 
     def _create_collection_if_not_exists(self):
         if not self.client.collection_exists(self.collection_name):
@@ -25,16 +53,74 @@ class QdrantService:
             )
             print(f"✅ Created collection '{self.collection_name}' in Qdrant.")
 
+    def _ensure_payload_indexes(self):
+        ensure_payload_indexes(self.client, self.collection_name, self.PAYLOAD_INDEXES)
+
+    @staticmethod
+    def payload_year(value):
+        """Release year as an int for the 'year' index ("2010", "2010-07-15" -> 2010), else None"""
+        text = str(value or '')[:4]
+        return int(text) if text.isdigit() else None
+
+    @staticmethod
+    def build_filter(filters):
+        """
+        Structured filters -> Qdrant Filter (None when nothing to filter on).
+
+        filters: {'year': {'gte': int, 'lte': int} or int,
+                  'genres': [genre, ...]  (any of them),
+                  'min_rating': float}
+        A Filter passes through unchanged.
+        """
+        if not filters or isinstance(filters, Filter):
+            return filters or None
+        must = []
+        year = filters.get('year')
+        if isinstance(year, dict):
+            if year.get('gte') is not None or year.get('lte') is not None:
+                must.append(FieldCondition(key='year', range=Range(gte=year.get('gte'), lte=year.get('lte'))))
+        elif year is not None:
+            must.append(FieldCondition(key='year', range=Range(gte=int(year), lte=int(year))))
+        if filters.get('genres'):
+            must.append(FieldCondition(key='genres', match=MatchAny(any=list(filters['genres']))))
+        if filters.get('min_rating') is not None:
+            must.append(FieldCondition(key='rating', range=Range(gte=float(filters['min_rating']))))
+        return Filter(must=must) if must else None
+
     def upsert_vectors(self, points):
         self.client.upsert(collection_name=self.collection_name, points=points)
 
-    def search(self, vector, top_k=3):
+    @staticmethod
+    def _payload_selector(payload_fields):
+        """True -> full payload; list of names -> only those fields; None/False -> no payload"""
+        if isinstance(payload_fields, (list, tuple, set)):
+            return list(payload_fields)
+        return bool(payload_fields)
+
+    def search(self, vector, top_k=3, score_threshold=None, payload_fields=True, with_vectors=False,
+               filters=None):
+        """
+        Nearest points to `vector`.
+
+        filters: structured filters (see build_filter) or a Qdrant Filter
+        score_threshold: drop hits scoring below it on the server
+        payload_fields: True for the full payload, a list of field names to
+            project, or None/False for no payload
+        with_vectors: also return the stored vectors (off: they are the bulk of the response)
+        """
+        options = dict(
+            query_filter=self.build_filter(filters),
+            limit=top_k,
+            score_threshold=score_threshold,
+            with_payload=self._payload_selector(payload_fields),
+            with_vectors=with_vectors
+        )
         try:
             # Method 1: Use standard search function
             return self.client.search(
                 collection_name=self.collection_name,
                 query_vector=vector,
-                limit=top_k
+                **options
             )
         except AttributeError:
             # Method 2: Fallback for unusual library versions (use query_points)
@@ -42,6 +128,53 @@ class QdrantService:
             results = self.client.query_points(
                 collection_name=self.collection_name,
                 query=vector,
-                limit=top_k
+                **options
             ).points
-            return results
\ No newline at end of file
+            return results
+
+    def search_many(self, vectors, top_k=3, filters=None, score_threshold=None,
+                    payload_fields=True, with_vectors=False):
+        """
+        Several searches in one round trip (query_batch_points).
+
+        Returns one hit list per input vector, in input order. `filters` is
+        one filter (structured dict or Filter, see build_filter) for every
+        search or a list with one filter (or None) per vector. Missing vectors
+        (failed embeddings) get an empty list and are not sent.
+        """
+        if not isinstance(filters, (list, tuple)):
+            filters = [filters] * len(vectors)
+        results = [[] for _ in vectors]
+        pending = [i for i, vector in enumerate(vectors) if vector is not None and len(vector)]
+        if not pending:
+            return results
+
+        with_payload = self._payload_selector(payload_fields)
+        try:
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    QueryRequest(
+                        query=list(vectors[i]),
+                        filter=self.build_filter(filters[i]),
+                        limit=top_k,
+                        score_threshold=score_threshold,
+                        with_payload=with_payload,
+                        with_vector=with_vectors
+                    )
+                    for i in pending
+                ]
+            )
+            batches = [response.points for response in responses]
+        except AttributeError:
+            # Client without batch queries: one request per vector
+            batches = [
+                self.search(vectors[i], top_k=top_k, score_threshold=score_threshold,
+                            payload_fields=payload_fields, with_vectors=with_vectors,
+                            filters=filters[i])
+                for i in pending
+            ]
+
+        for i, hits in zip(pending, batches):
+            results[i] = hits
+        return results
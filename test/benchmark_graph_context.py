@@ -0,0 +1,178 @@
+"""
+Benchmark: get_graph_context before vs after the row-explosion rewrite
+Generates a synthetic catalog (bench-* ids) in Neo4j, PROFILEs the legacy
+OPTIONAL MATCH chain and the current pattern-comprehension query, and
+records db hits, intermediate rows and latency for both.
+
+Usage:
+    PYTHONPATH=. python test/benchmark_graph_context.py --movies 20000 --runs 20
+    PYTHONPATH=. python test/benchmark_graph_context.py --keep   # leave the generated graph
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from src.graph_db import Neo4jService
+
+
+# The query get_graph_context ran before the rewrite, kept for comparison
+LEGACY_GRAPH_CONTEXT_QUERY = """
+MATCH (m:Movie) WHERE m.id IN $movie_ids
+OPTIONAL MATCH (m)-[:BELONGS_TO]->(g:Genre)
+OPTIONAL MATCH (d:Person)-[:DIRECTED]->(m)
+OPTIONAL MATCH (p:Person)-[:ACTED_IN]->(m)
+OPTIONAL MATCH (d)-[:DIRECTED]->(other:Movie)
+WHERE other.id <> m.id
+OPTIONAL MATCH (p)-[:ACTED_IN]->(otherFilm:Movie)
+WHERE otherFilm.id <> m.id
+RETURN m.title as Title,
+       m.year as Year,
+       m.overview as Overview,
+       d.name as Director,
+       collect(DISTINCT g.name) as Genres,
+       collect(DISTINCT p.name)[..8] as Cast,
+       collect(DISTINCT other.title)[..4] as DirectorWorks
+ORDER BY m.year DESC
+"""
+
+PREFIX = "bench"
+
+
+def generate_movies(n_movies, n_people, n_directors, n_genres, cast_size, seed=7):
+    """Synthetic catalog with a long-tailed cast distribution (a few prolific actors)"""
+    rng = random.Random(seed)
+    people = [f"{PREFIX} Person {i}" for i in range(n_people)]
+    directors = [f"{PREFIX} Director {i}" for i in range(n_directors)]
+    genres = [f"{PREFIX} Genre {i}" for i in range(n_genres)]
+    # Zipf-like weights: early people appear in far more films
+    weights = [1.0 / (i + 1) for i in range(n_people)]
+
+    movies = []
+    for i in range(n_movies):
+        cast = list(dict.fromkeys(rng.choices(people, weights=weights, k=cast_size)))
+        movies.append({
+            'id': f"{PREFIX}-{i}",
+            'title': f"{PREFIX} Movie {i}",
+            'year': str(rng.randint(1950, 2025)),
+            'overview': f"Synthetic overview for movie {i}. " * 3,
+            'genres': rng.sample(genres, k=min(3, n_genres)),
+            'cast': cast,
+            'director': rng.choice(directors),
+        })
+    return movies
+
+
+def load_graph(graphdb, movies, batch_size):
+    start = time.perf_counter()
+    report = graphdb.add_movies_batch(movies, batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"  ✓ Loaded {report['written']} movies in {report['batches']} transactions ({elapsed:.1f}s)")
+
+
+def cleanup(graphdb):
+    with graphdb.driver.session() as session:
+        for label, key in (('Movie', 'id'), ('Person', 'name'), ('Genre', 'name')):
+            session.run(
+                f"""
+                MATCH (n:{label}) WHERE n.{key} STARTS WITH $prefix
+                CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 5000 ROWS
+                """,
+                prefix=PREFIX
+            ).consume()
+    print("  ✓ Removed generated graph")
+
+
+def plan_totals(plan):
+    """Sum db hits over the profiled plan tree; report the widest operator"""
+    hits = plan.get('dbHits', 0)
+    rows = plan.get('rows', 0)
+    for child in plan.get('children', []):
+        child_hits, child_rows = plan_totals(child)
+        hits += child_hits
+        rows = max(rows, child_rows)
+    return hits, rows
+
+
+def profile_query(graphdb, query, params, runs):
+    latencies = []
+    with graphdb.driver.session() as session:
+        summary = session.run("PROFILE " + query, **params).consume()
+        db_hits, max_rows = plan_totals(summary.profile)
+        for _ in range(runs):
+            start = time.perf_counter()
+            records = list(session.run(query, **params))
+            latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'db_hits': db_hits,
+        'max_intermediate_rows': max_rows,
+        'result_rows': len(records),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark get_graph_context queries")
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--people', type=int, default=8000)
+    parser.add_argument('--directors', type=int, default=800)
+    parser.add_argument('--genres', type=int, default=20)
+    parser.add_argument('--cast-size', type=int, default=12)
+    parser.add_argument('--sample', type=int, default=10, help="movie ids per query")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--skip-load', action='store_true', help="reuse a previously generated graph")
+    parser.add_argument('--keep', action='store_true', help="don't delete the generated graph")
+    parser.add_argument('--output', default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("BENCHMARK: get_graph_context (legacy vs rewrite)")
+    print("="*70)
+
+    graphdb = Neo4jService()
+    graphdb.ensure_schema()
+    movies = generate_movies(args.movies, args.people, args.directors, args.genres, args.cast_size)
+    if not args.skip_load:
+        load_graph(graphdb, movies, args.batch_size)
+
+    # Popular actors' films are where the legacy chain explodes
+    rng = random.Random(11)
+    movie_ids = [movie['id'] for movie in rng.sample(movies, k=min(args.sample, len(movies)))]
+    params = {
+        'movie_ids': movie_ids,
+        'cast_limit': Neo4jService.CAST_LIMIT,
+        'works_limit': Neo4jService.DIRECTOR_WORKS_LIMIT,
+    }
+
+    results = {}
+    try:
+        for name, query in (('legacy', LEGACY_GRAPH_CONTEXT_QUERY),
+                            ('rewrite', Neo4jService.GRAPH_CONTEXT_QUERY)):
+            results[name] = profile_query(graphdb, query, params, args.runs)
+            print(f"\n  {name}:")
+            for key, value in results[name].items():
+                print(f"    {key:<24} {value}")
+
+        legacy, rewrite = results['legacy'], results['rewrite']
+        print("\n" + "-"*70)
+        print(f"  db hits:  {legacy['db_hits']:,} → {rewrite['db_hits']:,} "
+              f"({legacy['db_hits'] / max(rewrite['db_hits'], 1):.1f}x fewer)")
+        print(f"  p50:      {legacy['p50_ms']}ms → {rewrite['p50_ms']}ms")
+        print(f"  rows/movie (rewrite): {rewrite['result_rows'] / max(len(movie_ids), 1):.2f}")
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'config': vars(args), 'results': results}, f, indent=2)
+            print(f"\n  ✓ Results saved to {args.output}")
+    finally:
+        if not args.keep:
+            cleanup(graphdb)
+        graphdb.close()
+
+
+if __name__ == "__main__":
+    main()
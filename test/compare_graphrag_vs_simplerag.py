@@ -86,7 +86,51 @@ class ComparisonEvaluator:
             'graphrag': [],
             'simplerag': []
         }
+        # question -> vector contexts, filled in one batch by prefetch_contexts()
+        self.prefetched = {}
         
+    @staticmethod
+    def _payload_contexts(search_results) -> List[str]:
+        """Context strings built from vector search payloads"""
+        contexts = []
+        for item in search_results:
+            if hasattr(item, 'payload') and item.payload:
+                # Extract text content from payload
+                text_parts = []
+                if 'title' in item.payload:
+                    text_parts.append(f"Title: {item.payload['title']}")
+                if 'overview' in item.payload:
+                    text_parts.append(f"Overview: {item.payload['overview']}")
+                if 'genres' in item.payload:
+                    text_parts.append(f"Genres: {item.payload['genres']}")
+                if 'director' in item.payload:
+                    text_parts.append(f"Director: {item.payload['director']}")
+                
+                if text_parts:
+                    contexts.append(" | ".join(text_parts))
+        return contexts
+    
+    def prefetch_contexts(self, test_queries: List[Dict]):
+        """
+        Vector contexts for every question in one embedding batch and one
+        batched Qdrant request. Both systems search the same collection, so
+        the result is shared by them.
+        """
+        rag_system = self.simplerag if hasattr(self.simplerag, 'vectordb') else self.graphrag
+        questions = [query_data['query'] for query_data in test_queries]
+        if not questions or not hasattr(rag_system, 'vectordb'):
+            return
+        try:
+            query_vecs = rag_system.llm.get_embeddings(questions, task_type="retrieval_query")
+            hit_lists = rag_system.vectordb.search_many(query_vecs, top_k=6)
+        except Exception as e:
+            print(f"⚠️ Batched context search failed ({e}), searching per query")
+            return
+        for question, vector, hits in zip(questions, query_vecs, hit_lists):
+            if vector:
+                self.prefetched[question] = self._payload_contexts(hits)
+        print(f"✓ Prefetched vector contexts for {len(self.prefetched)}/{len(questions)} queries")
+    
     def query_with_context(self, rag_system, question: str, system_name: str) -> tuple:
         """
         Query RAG and capture context for RAGAS evaluation
@@ -94,30 +138,19 @@ class ComparisonEvaluator:
         """
         contexts = []
         
-        # Query the system
-        answer = rag_system.query(question)
+        # Query the system (GraphRAG returns a QueryResult, SimpleRAG a plain string)
+        result = rag_system.query(question)
+        answer = getattr(result, 'answer', result)
         
         # Extract contexts based on system type
-        if hasattr(rag_system, 'vectordb'):
+        if question in self.prefetched:
+            contexts = list(self.prefetched[question])
+        elif hasattr(rag_system, 'vectordb'):
             # Get embedding and search for contexts
             query_vec = rag_system.llm.get_embedding(question, task_type="retrieval_query")
             if query_vec:
                 search_results = rag_system.vectordb.search(query_vec, top_k=6)
-                for item in search_results:
-                    if hasattr(item, 'payload') and item.payload:
-                        # Extract text content from payload
-                        text_parts = []
-                        if 'title' in item.payload:
-                            text_parts.append(f"Title: {item.payload['title']}")
-                        if 'overview' in item.payload:
-                            text_parts.append(f"Overview: {item.payload['overview']}")
-                        if 'genres' in item.payload:
-                            text_parts.append(f"Genres: {item.payload['genres']}")
-                        if 'director' in item.payload:
-                            text_parts.append(f"Director: {item.payload['director']}")
-                        
-                        if text_parts:
-                            contexts.append(" | ".join(text_parts))
+                contexts = self._payload_contexts(search_results)
         
         # If no contexts found, use answer as context (fallback)
         if not contexts:
@@ -168,6 +201,8 @@ class ComparisonEvaluator:
         print(f"Starting evaluation of {total_queries} queries on 2 systems")
         print(f"{'='*80}\n")
         
+        self.prefetch_contexts(test_queries)
+        
         for idx, query_data in enumerate(test_queries, 1):
             print(f"\n[{idx}/{total_queries}] Query ID: {query_data.get('id', 'unknown')}")
             print(f"Category: {query_data.get('category', 'unknown')}")
@@ -46,7 +46,7 @@ def compare_retrievers():
         basic_rag = GraphRAG(use_advanced_retriever=False)
         
         start_time = time.time()
-        basic_answer = basic_rag.query(test_case['query'])
+        basic_answer = basic_rag.query(test_case['query']).answer
         basic_time = time.time() - start_time
         
         print(f"\n📝 Basic Answer:")
@@ -61,7 +61,7 @@ def compare_retrievers():
         advanced_rag = GraphRAG(use_advanced_retriever=True)
         
         start_time = time.time()
-        advanced_answer = advanced_rag.query(test_case['query'])
+        advanced_answer = advanced_rag.query(test_case['query']).answer
         advanced_time = time.time() - start_time
         
         print(f"\n📝 Advanced Answer:")
@@ -0,0 +1,101 @@
+"""
+Multi-hop path finding check
+Runs GraphEngine.find_paths over entity pairs from test_datasets/multi_hop.json
+and reports how many questions get a real path and how long it took, against
+Config.PATH_FINDING_BUDGET_SECONDS.
+
+Usage:
+    PYTHONPATH=. python test/evaluate_multi_hop_paths.py                 # crawled_data
+    PYTHONPATH=. python test/evaluate_multi_hop_paths.py --source neo4j
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+import time
+
+from src.config import Config
+from src.graph_engine import GraphEngine
+from src.advanced_retriever import HybridRetriever
+
+
+def load_engine(source: str) -> GraphEngine:
+    if source == 'neo4j':
+        from src.graph_db import Neo4jService
+        return GraphEngine.from_neo4j(Neo4jService())
+    return GraphEngine.from_crawled_data(Config.GRAPH_ENGINE_DATA_DIR)
+
+
+def resolve(engine: GraphEngine, entity: str):
+    """
+    Exact key, else the best-connected node whose name contains the entity as
+    whole words ("Nolan" -> Christopher Nolan), like the full-text linker would
+    """
+    if len(engine.lookup([entity])):
+        return entity
+    words = entity.casefold().split()
+    candidates = [
+        index for index, name in enumerate(engine.names)
+        if all(word in str(name).casefold().split() for word in words)
+    ]
+    if not candidates:
+        return None
+    best = max(candidates, key=lambda index: engine.degrees[index])
+    return engine.keys[best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Path finding over multi-hop test questions")
+    parser.add_argument('--dataset', default='test_datasets/multi_hop.json')
+    parser.add_argument('--source', choices=['crawled', 'neo4j'], default='crawled')
+    parser.add_argument('--max-length', type=int, default=4)
+    parser.add_argument('--max-paths', type=int, default=3)
+    args = parser.parse_args()
+
+    print("="*70)
+    print("MULTI-HOP PATH FINDING")
+    print("="*70)
+
+    engine = load_engine(args.source)
+    print(f"  Graph: {engine.get_stats()}")
+    budget = Config.PATH_FINDING_BUDGET_SECONDS
+
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        cases = json.load(f)['test_cases']
+
+    latencies, answered, resolvable = [], 0, 0
+    for case in cases:
+        # First pair of entities that both exist in the catalog
+        known = [key for key in (resolve(engine, e) for e in case.get('entities', [])) if key is not None]
+        pair = next(itertools.combinations(known, 2), None)
+        if pair is None:
+            continue
+        resolvable += 1
+
+        start = time.perf_counter()
+        paths = engine.find_paths(pair[0], pair[1], max_length=args.max_length,
+                                  max_paths=args.max_paths, budget_seconds=budget)
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        if paths:
+            answered += 1
+
+        status = "✓" if paths else "✗"
+        print(f"\n  {status} Q{case['id']}: {case['query'][:70]}")
+        print(f"    {pair[0]} ↔ {pair[1]} ({elapsed * 1000:.2f}ms)")
+        for path in paths[:1]:
+            print(f"    {HybridRetriever.format_path(path)}")
+
+    print("\n" + "-"*70)
+    print(f"  Questions: {len(cases)}, with two known entities: {resolvable}, with a path: {answered}")
+    if latencies:
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"  Latency p50 {statistics.median(latencies) * 1000:.2f}ms, "
+              f"p95 {p95 * 1000:.2f}ms, max {ordered[-1] * 1000:.2f}ms "
+              f"(budget {budget * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
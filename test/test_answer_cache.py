@@ -0,0 +1,96 @@
+"""
+Test Semantic Answer Cache
+Checks similarity hits, history compatibility, TTL and index-generation invalidation
+(runs offline - no Gemini calls)
+"""
+
+import os
+import tempfile
+import time
+
+from src.answer_cache import SemanticAnswerCache
+from src.config import Config
+from src.index_version import bump_index_generation
+
+
+ENTRY = {
+    'question': 'Who directed Inception?',
+    'answer': 'Christopher Nolan directed Inception (2010).',
+    'method': 'basic_retrieval',
+    'movie_ids': [27205],
+    'movies': [{'id': 27205, 'title': 'Inception'}],
+    'contexts': ['**Inception** (2010)']
+}
+
+
+def test_similar_question_hits():
+    """A near-identical embedding hits, a different one and other history miss"""
+    print("\n" + "="*70)
+    print("TEST 1: SIMILARITY + HISTORY")
+    print("="*70)
+
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store([1.0, 0.0, 0.2], None, ENTRY)
+
+    hit = cache.lookup([0.98, 0.01, 0.21])
+    print(f"  Hit similarity: {hit['similarity']:.3f}")
+    assert hit['answer'] == ENTRY['answer']
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.2], chat_history=[{'role': 'user', 'content': 'hi'}]) is None
+    print(f"  Stats: {cache.get_stats()}")
+
+
+def test_ttl_and_generation_invalidate():
+    """Expired entries and entries from an older index generation are dropped"""
+    print("\n" + "="*70)
+    print("TEST 2: TTL + INDEX GENERATION")
+    print("="*70)
+
+    original_path = Config.INDEX_GENERATION_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.INDEX_GENERATION_PATH = os.path.join(tmp, "index_generation")
+        try:
+            cache = SemanticAnswerCache(threshold=0.9)
+            cache.store([0.0, 1.0], None, ENTRY)
+            assert cache.lookup([0.0, 1.0]) is not None
+
+            bump_index_generation()
+            assert cache.lookup([0.0, 1.0]) is None
+
+            short = SemanticAnswerCache(threshold=0.9, ttl_seconds=0.05)
+            short.store([0.0, 1.0], None, ENTRY)
+            time.sleep(0.1)
+            assert short.lookup([0.0, 1.0]) is None
+            print(f"  Invalidations: {cache.get_stats()['invalidations']} + {short.get_stats()['invalidations']}")
+        finally:
+            Config.INDEX_GENERATION_PATH = original_path
+
+
+def test_different_entities_miss():
+    """Near-duplicate questions naming different entities or years never share an answer"""
+    print("\n" + "="*70)
+    print("TEST 3: ENTITY + YEAR SCOPE")
+    print("="*70)
+
+    inception = {'entity_ids': ['MOVIE:27205'], 'year_range': None}
+    interstellar = {'entity_ids': ['MOVIE:157336'], 'year_range': None}
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store([1.0, 0.0, 0.2], None, ENTRY, scope=inception)
+
+    # "who directed Inception" vs "who directed Interstellar": embeddings ~0.99 apart
+    assert cache.lookup([0.99, 0.02, 0.2], scope=interstellar) is None
+    assert cache.lookup([0.99, 0.02, 0.2], scope=inception)['answer'] == ENTRY['answer']
+
+    horror_2010 = {'entity_ids': ['GENRE:Horror'], 'year_range': {'gte': 2010, 'lte': 2010}}
+    horror_2012 = {'entity_ids': ['GENRE:Horror'], 'year_range': {'gte': 2012, 'lte': 2012}}
+    cache.store([0.0, 1.0, 0.0], None, ENTRY, scope=horror_2010)
+    assert cache.lookup([0.0, 1.0, 0.0], scope=horror_2012) is None
+    print(f"  Stats: {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_similar_question_hits()
+    test_ttl_and_generation_invalidate()
+    test_different_entities_miss()
+    print("\n✅ ALL ANSWER CACHE TESTS PASSED")
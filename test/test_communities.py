@@ -0,0 +1,112 @@
+"""
+Test Community Summaries
+Checks Louvain clustering, summary search/persistence and global-question routing
+(runs offline - no Gemini calls)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+import src.communities as communities_module
+from src.advanced_retriever import AdaptiveRetriever
+from src.communities import CommunityIndex, get_community_index, louvain
+from src.config import Config
+
+
+def test_louvain_separates_cliques():
+    """Two dense groups joined by one weak edge become two communities"""
+    print("\n" + "="*70)
+    print("TEST 1: LOUVAIN")
+    print("="*70)
+
+    adjacency = {node: {} for node in range(8)}
+    for group in (range(0, 4), range(4, 8)):
+        for a in group:
+            for b in group:
+                if a != b:
+                    adjacency[a][b] = 1.0
+    adjacency[3][4] = adjacency[4][3] = 0.1
+
+    membership = louvain(adjacency)
+    print(f"  Membership: {membership}")
+    assert len({membership[n] for n in range(4)}) == 1
+    assert len({membership[n] for n in range(4, 8)}) == 1
+    assert membership[0] != membership[7]
+
+
+def test_index_search_and_round_trip():
+    """Summaries are ranked by cosine similarity and survive save/load"""
+    print("\n" + "="*70)
+    print("TEST 2: SUMMARY INDEX")
+    print("="*70)
+
+    communities = [
+        {'id': 0, 'summary': "40 movies (1990-1999), mostly Thriller, Crime."},
+        {'id': 1, 'summary': "30 movies (2005-2020), mostly Animation, Family."},
+    ]
+    index = CommunityIndex(communities, np.array([[1.0, 0.0], [0.0, 2.0]]))
+    hits = index.search([0.9, 0.1], top_k=1)
+    print(f"  Hit: {hits}")
+    assert hits[0]['id'] == 0 and hits[0]['score'] > 0.9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "communities.json")
+        index.save(path)
+        loaded = CommunityIndex.load(path)
+        assert [c['id'] for c in loaded.search([0.0, 1.0], top_k=2)] == [1, 0]
+
+
+def test_index_reloads_when_rebuilt():
+    """A running process picks up a rebuilt index file without restarting"""
+    print("\n" + "="*70)
+    print("TEST 3: RELOAD ON REBUILD")
+    print("="*70)
+
+    original_path = Config.COMMUNITY_INDEX_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.COMMUNITY_INDEX_PATH = os.path.join(tmp, "communities.json")
+        communities_module._shared_index_mtime = None
+        try:
+            CommunityIndex([{'id': 0, 'summary': "old"}], np.array([[1.0, 0.0]])).save(Config.COMMUNITY_INDEX_PATH)
+            assert get_community_index().communities[0]['summary'] == "old"
+
+            CommunityIndex([{'id': 0, 'summary': "new"}], np.array([[0.0, 1.0]])).save(Config.COMMUNITY_INDEX_PATH)
+            # Coarse filesystem clocks: make sure the rebuild has a later mtime
+            stat = os.stat(Config.COMMUNITY_INDEX_PATH)
+            os.utime(Config.COMMUNITY_INDEX_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            reloaded = get_community_index()
+            print(f"  Reloaded: {reloaded.communities}")
+            assert reloaded.communities[0]['summary'] == "new"
+
+            os.remove(Config.COMMUNITY_INDEX_PATH)
+            assert get_community_index() is None
+        finally:
+            Config.COMMUNITY_INDEX_PATH = original_path
+            communities_module._shared_index = None
+            communities_module._shared_index_mtime = None
+
+
+def test_global_question_routing():
+    """Broad questions without a movie/person anchor go to community summaries"""
+    print("\n" + "="*70)
+    print("TEST 4: GLOBAL QUESTIONS")
+    print("="*70)
+
+    adaptive = AdaptiveRetriever(llm_service=None)
+    genre_only = {'entities': [{'text': 'thriller', 'type': 'GENRE'}]}
+    assert adaptive.is_global_question("What kinds of 90s thrillers do you have?", genre_only)
+    assert adaptive.is_global_question("Có những loại phim hoạt hình nào?", {})
+
+    anchored = {'entities': [{'text': 'Christopher Nolan', 'type': 'PERSON'}]}
+    assert not adaptive.is_global_question("What kinds of movies does Christopher Nolan make?", anchored)
+    assert not adaptive.is_global_question("Who directed Inception?", {})
+
+
+if __name__ == "__main__":
+    test_louvain_separates_cliques()
+    test_index_search_and_round_trip()
+    test_index_reloads_when_rebuilt()
+    test_global_question_routing()
+    print("\n✅ ALL COMMUNITY TESTS PASSED")
@@ -0,0 +1,62 @@
+"""
+Test Embedding Cache
+Checks content addressing, float32 round-trips and LRU eviction
+(runs offline - no Gemini calls)
+"""
+
+import os
+import tempfile
+
+from src.embedding_cache import EmbeddingCache
+
+
+MODEL = "models/text-embedding-004"
+
+
+def test_round_trip_and_normalization():
+    """Vectors survive the float32 blob and whitespace variants share an entry"""
+    print("\n" + "="*70)
+    print("TEST 1: ROUND TRIP + NORMALIZATION")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite"), max_entries=10)
+        cache.put(MODEL, "retrieval_document", "Inception  (2010)", [0.25, -1.5, 3.0])
+
+        hit = cache.get(MODEL, "retrieval_document", "  Inception (2010) ")
+        print(f"  Hit: {hit}")
+        assert hit == [0.25, -1.5, 3.0]
+
+        # task_type is part of the key
+        assert cache.get(MODEL, "retrieval_query", "Inception (2010)") is None
+
+        stats = cache.get_stats()
+        print(f"  Stats: {stats}")
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        cache.close()
+
+
+def test_lru_eviction():
+    """Least recently used entries are evicted first"""
+    print("\n" + "="*70)
+    print("TEST 2: LRU EVICTION")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite"), max_entries=2)
+        cache.put(MODEL, "retrieval_document", "a", [1.0])
+        cache.put(MODEL, "retrieval_document", "b", [2.0])
+        cache.get(MODEL, "retrieval_document", "a")  # touch "a"
+        cache.put(MODEL, "retrieval_document", "c", [3.0])
+
+        results = cache.get_many(MODEL, "retrieval_document", ["a", "b", "c"])
+        print(f"  After eviction: {results}")
+        assert results == [[1.0], None, [3.0]]
+        assert cache.get_stats()['evictions'] == 1
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_round_trip_and_normalization()
+    test_lru_eviction()
+    print("\n✅ ALL EMBEDDING CACHE TESTS PASSED")
@@ -31,11 +31,11 @@ def test_fallback():
         print(f"Test {i}: {query}")
         print('=' * 80)
         
-        answer = rag.query(query)
+        result = rag.query(query)
         
-        print(f"\n📝 Answer:\n{answer}\n")
-        print(f"🔍 Method used: {rag.get_last_method()}")
-        print(f"📊 Contexts: {len(rag.last_contexts)}")
+        print(f"\n📝 Answer:\n{result.answer}\n")
+        print(f"🔍 Method used: {result.method}")
+        print(f"📊 Contexts: {len(result.contexts)}")
         
         input("\nPress Enter for next test...")
     
@@ -0,0 +1,83 @@
+"""
+Test Hybrid Fusion
+Checks weighted reciprocal rank fusion in HybridRetriever._fuse_results:
+dedup by canonical ID, multi-source agreement and context rendering
+(runs offline - no Gemini calls)
+"""
+
+from src.config import Config
+from src.advanced_retriever import HybridRetriever
+
+
+def make_retriever() -> HybridRetriever:
+    # _fuse_results needs no services
+    return HybridRetriever.__new__(HybridRetriever)
+
+
+def vector_hit(movie_id, title, score):
+    return {'title': title, 'overview': f"About {title}", 'movie_id': movie_id,
+            'score': score, 'source': 'vector'}
+
+
+def test_dedup_and_agreement():
+    """A movie found by vector search, linking and traversal becomes one top candidate"""
+    print("\n" + "="*70)
+    print("TEST 1: DEDUP + AGREEMENT")
+    print("="*70)
+
+    retriever = make_retriever()
+    vector = [vector_hit(1, "Heat", 0.81), vector_hit(2, "Inception", 0.80),
+              vector_hit(2, "Inception", 0.79)]
+    linked = [{'entity': 'Inception', 'matched_node': {'name': 'Inception', 'id': "2",
+                                                        'type': 'movie', 'score': 1.0}}]
+    graph = [{'name': 'Inception', 'type': 'Movie', 'id': 2, 'distance': 1, 'score': None},
+             {'name': 'Christopher Nolan', 'type': 'Person', 'id': 'Christopher Nolan',
+              'distance': 1, 'score': None}]
+
+    fused = retriever._fuse_results(vector, graph, linked)
+    for candidate in fused:
+        print(f"  {candidate['score']:.4f} {candidate['context']}")
+
+    assert [c['key'] for c in fused] == ['movie:2', 'movie:1', 'person:christopher nolan']
+    top = fused[0]
+    assert list(top['sources']) == ['vector', 'entity', 'graph']
+    assert top['sources']['vector'] == 0.80
+    assert top['context'] == "[Vector Match] Inception: About Inception (found by vector + entity + graph)"
+    assert fused[2]['context'] == "[Graph 1-hop] Person: Christopher Nolan"
+
+    expected = (Config.FUSION_WEIGHT_VECTOR / (Config.FUSION_RRF_K + 2)
+                + Config.FUSION_WEIGHT_ENTITY / (Config.FUSION_RRF_K + 1)
+                + Config.FUSION_WEIGHT_GRAPH / (Config.FUSION_RRF_K + 1))
+    assert abs(top['score'] - expected) < 1e-12
+
+
+def test_paths_communities_and_limit():
+    """Paths and communities are fused alongside movies; output is capped"""
+    print("\n" + "="*70)
+    print("TEST 2: PATHS, COMMUNITIES + LIMIT")
+    print("="*70)
+
+    retriever = make_retriever()
+    vector = [vector_hit(i, f"Movie {i}", 0.9 - i / 100) for i in range(20)]
+    paths = [{'path_nodes': [{'name': 'Christian Bale'}, {'name': 'The Dark Knight Rises'},
+                             {'name': 'Tom Hardy'}],
+              'path_rels': ['ACTED_IN', 'ACTED_IN'], 'path_directions': ['->', '<-'], 'length': 2}]
+    communities = [{'id': 4, 'summary': "12 movies (1990-1999), mostly Thriller.", 'score': 0.7}]
+
+    fused = retriever._fuse_results(vector, [], [], paths, communities)
+    contexts = [c['context'] for c in fused]
+    for ctx in contexts:
+        print(f"  {ctx}")
+
+    assert len(fused) == Config.FUSION_MAX_CONTEXTS
+    assert contexts[0] == "[Community] 12 movies (1990-1999), mostly Thriller."
+    assert contexts[1] == ("[Graph Path] Christian Bale -[ACTED_IN]-> The Dark Knight Rises "
+                           "<-[ACTED_IN]- Tom Hardy")
+    assert contexts[2].startswith("[Vector Match] Movie 0")
+    assert retriever._fuse_results([], [], []) == []
+
+
+if __name__ == "__main__":
+    test_dedup_and_agreement()
+    test_paths_communities_and_limit()
+    print("\n✅ ALL FUSION TESTS PASSED")
@@ -0,0 +1,153 @@
+"""
+Test Graph Context Cache
+Checks LRU/byte bounds, ingestion invalidation, generation changes and
+that get_graph_context only queries Neo4j for cache misses
+(runs offline - no Gemini calls)
+"""
+
+import os
+import tempfile
+
+from src.config import Config
+from src.graph_context_cache import GraphContextCache
+from src.graph_db import Neo4jService
+from src.index_version import bump_index_generation
+
+
+def test_lru_and_invalidation():
+    """Least recently used blocks are evicted; invalidate() drops rewritten movies"""
+    print("\n" + "="*70)
+    print("TEST 1: LRU + INVALIDATION")
+    print("="*70)
+
+    cache = GraphContextCache(max_entries=2)
+    cache.store(1, "2010", "**Inception** (2010)\n")
+    cache.store(2, "2014", "**Interstellar** (2014)\n")
+    cache.lookup_many([1])  # touch 1
+    cache.store(3, "2008", "**The Dark Knight** (2008)\n")
+
+    hits, misses = cache.lookup_many([1, 2, "3"])
+    print(f"  Hits: {sorted(hits)}, misses: {misses}")
+    assert sorted(hits) == ["1", "3"] and misses == [2]
+
+    assert cache.invalidate([3]) == 1
+    stats = cache.get_stats()
+    print(f"  Stats: {stats}")
+    assert stats['size'] == 1 and stats['evictions'] == 1
+    assert stats['bytes'] == len("**Inception** (2010)\n".encode('utf-8'))
+
+
+def test_generation_change_is_a_miss():
+    """Blocks rendered before an ingestion are not served afterwards"""
+    print("\n" + "="*70)
+    print("TEST 2: INDEX GENERATION")
+    print("="*70)
+
+    original_path = Config.INDEX_GENERATION_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.INDEX_GENERATION_PATH = os.path.join(tmp, "index_generation")
+        try:
+            cache = GraphContextCache()
+            cache.store(1, "2010", "block")
+            bump_index_generation()
+            hits, misses = cache.lookup_many([1])
+            print(f"  After bump: hits={hits}, misses={misses}")
+            assert not hits and misses == [1]
+            assert cache.get_stats()['invalidations'] == 1
+        finally:
+            Config.INDEX_GENERATION_PATH = original_path
+
+
+class FakeNeo4jService(Neo4jService):
+    """Neo4jService with the driver replaced by an in-memory record source"""
+
+    def __init__(self, records):
+        self.records = records
+        self.fetched = []
+        self.context_cache = GraphContextCache()
+
+    def _fetch_context_records(self, movie_ids):
+        self.fetched.append(list(movie_ids))
+        return [self.records[movie_id] for movie_id in movie_ids if movie_id in self.records]
+
+
+def make_record(movie_id, title, year):
+    return {'Id': movie_id, 'Title': title, 'Year': year, 'Overview': None,
+            'Director': None, 'Genres': [], 'Cast': [], 'DirectorWorks': []}
+
+
+def test_only_misses_hit_neo4j():
+    """Cached movies are served from memory; misses go out in one query"""
+    print("\n" + "="*70)
+    print("TEST 3: BATCHED MISSES")
+    print("="*70)
+
+    service = FakeNeo4jService({
+        1: make_record(1, "Inception", "2010"),
+        2: make_record(2, "Interstellar", "2014"),
+        3: make_record(3, "Tenet", "2020"),
+    })
+    first = service.get_graph_context([1, 2])
+    second = service.get_graph_context([1, 2, 3])
+    print(f"  Neo4j fetches: {service.fetched}")
+    print(f"  Context:\n{second}")
+
+    assert service.fetched == [[1, 2], [3]]
+    assert first == "**Interstellar** (2014)\n\n**Inception** (2010)\n"
+    assert second.index("Tenet") < second.index("Interstellar") < second.index("Inception")
+    assert service.context_cache.get_stats()['hit_ratio'] == 0.4
+
+
+class FakeWriteSession:
+    """session.execute_write(work) with a tx that returns a fixed write summary"""
+
+    def __init__(self, summary):
+        self.summary = summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work):
+        return work(self)
+
+    def run(self, query, movies):
+        return self
+
+    def single(self):
+        return self.summary
+
+
+class FakeWriteDriver:
+    def __init__(self, summary):
+        self.summary = summary
+
+    def session(self):
+        return FakeWriteSession(self.summary)
+
+
+def test_write_invalidates_co_directed():
+    """Rewriting a movie also drops the cached blocks of its director's other movies"""
+    print("\n" + "="*70)
+    print("TEST 4: CO-DIRECTED INVALIDATION")
+    print("="*70)
+
+    service = FakeNeo4jService({})
+    for movie_id in (1, 2, 3):
+        service.context_cache.store(movie_id, "2010", f"block {movie_id}")
+    service.driver = FakeWriteDriver({'written': 1, 'co_directed': [2]})
+
+    service.add_movie_data({'id': 4, 'title': 'Oppenheimer', 'director': 'Christopher Nolan'})
+    hits, misses = service.context_cache.lookup_many([1, 2, 3])
+    print(f"  Still cached: {sorted(hits)}")
+    assert sorted(hits) == ['1', '3'] and misses == [2]
+
+
+if __name__ == "__main__":
+    test_lru_and_invalidation()
+    test_generation_change_is_a_miss()
+    test_only_misses_hit_neo4j()
+    test_write_invalidates_co_directed()
+    print("\n✅ ALL GRAPH CONTEXT CACHE TESTS PASSED")
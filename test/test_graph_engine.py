@@ -0,0 +1,229 @@
+"""
+Test Graph Engine
+Checks CSR construction, k-hop expansion, relationship lookup and path queries
+on a small in-memory catalog
+(runs offline - no Gemini calls)
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import src.graph_engine as graph_engine
+from src.config import Config
+from src.graph_engine import GraphBuilder, GraphEngine, get_graph_engine
+
+
+def build_catalog() -> GraphEngine:
+    builder = GraphBuilder()
+    builder.add_movie({'id': 27205, 'title': 'Inception', 'genres': ['Science Fiction', 'Action'],
+                       'cast': ['Leonardo DiCaprio', 'Tom Hardy'], 'director': 'Christopher Nolan'})
+    builder.add_movie({'id': 157336, 'title': 'Interstellar', 'genres': ['Science Fiction'],
+                       'cast': ['Matthew McConaughey'], 'director': 'Christopher Nolan'})
+    builder.add_movie({'id': 64682, 'title': 'The Great Gatsby', 'genres': ['Drama'],
+                       'cast': ['Leonardo DiCaprio'], 'director': 'Baz Luhrmann'})
+    builder.add_movie({'id': 49026, 'title': 'The Dark Knight Rises', 'genres': ['Action'],
+                       'cast': ['Tom Hardy', 'Christian Bale'], 'director': 'Christopher Nolan'})
+    return GraphEngine(builder, source='test')
+
+
+def test_k_hop_is_nearest_first():
+    """Seeds resolve by Movie.id or name; neighbors come back by hop distance"""
+    print("\n" + "="*70)
+    print("TEST 1: K-HOP")
+    print("="*70)
+
+    engine = build_catalog()
+    stats = engine.get_stats()
+    print(f"  Stats: {stats}")
+    assert stats['nodes'] == 13 and stats['edges']['DIRECTED'] == 4
+
+    one_hop = engine.k_hop([27205], k=1, max_nodes=20)
+    names = {node['name'] for node in one_hop}
+    print(f"  1-hop of Inception: {sorted(names)}")
+    assert names == {'Science Fiction', 'Action', 'Leonardo DiCaprio', 'Tom Hardy', 'Christopher Nolan'}
+
+    two_hop = engine.k_hop(["27205"], k=2, max_nodes=50)
+    distances = [node['distance'] for node in two_hop]
+    assert distances == sorted(distances)
+    assert {'name': 'Interstellar', 'type': 'Movie', 'id': 157336, 'distance': 2} in two_hop
+    assert len(engine.k_hop([27205], k=2, max_nodes=3)) == 3
+    assert engine.k_hop(['Unknown Person'], k=2) == []
+
+
+def test_relationships_between():
+    """Only edges with both endpoints in the set, with their direction"""
+    print("\n" + "="*70)
+    print("TEST 2: RELATIONSHIPS")
+    print("="*70)
+
+    engine = build_catalog()
+    rels = engine.relationships_between(['Christopher Nolan', 27205, 'Tom Hardy', 'Drama'])
+    print(f"  Relationships: {rels}")
+    assert {'relationship': 'DIRECTED', 'source': 'Christopher Nolan', 'target': 'Inception'} in rels
+    assert {'relationship': 'ACTED_IN', 'source': 'Tom Hardy', 'target': 'Inception'} in rels
+    assert len(rels) == 2
+
+
+def test_find_paths():
+    """Shortest typed paths between two people"""
+    print("\n" + "="*70)
+    print("TEST 3: PATHS")
+    print("="*70)
+
+    engine = build_catalog()
+    paths = engine.find_paths('Christian Bale', 'Leonardo DiCaprio', max_length=4)
+    for path in paths:
+        print(f"  {[n['name'] for n in path['path_nodes']]} via {path['path_rels']}")
+    assert paths
+    for path in paths:
+        assert len(path['path_rels']) == 4
+        assert path['path_nodes'][0]['name'] == 'Christian Bale'
+        assert path['path_nodes'][-1]['name'] == 'Leonardo DiCaprio'
+    assert engine.find_paths('Christian Bale', 'Leonardo DiCaprio', max_length=2) == []
+
+
+
+def test_paths_skip_hubs_and_keep_direction():
+    """Degree caps keep hubs out of the middle of a path; directions follow the edges"""
+    print("\n" + "="*70)
+    print("TEST 4: DEGREE CAPS + DIRECTIONS")
+    print("="*70)
+
+    engine = build_catalog()
+    paths = engine.find_paths('Christian Bale', 'Leonardo DiCaprio', max_length=4,
+                              max_paths=10, degree_caps={'Genre': 0})
+    for path in paths:
+        print(f"  {[n['name'] for n in path['path_nodes']]} {path['path_directions']}")
+    assert paths
+    for path in paths:
+        assert all(node['type'] != 'Genre' for node in path['path_nodes'])
+        assert path['path_directions'] == ['->', '<-', '->', '<-']
+
+    # Endpoints are exempt from the caps
+    to_genre = engine.find_paths('Christopher Nolan', 'science fiction', degree_caps={'Genre': 0})
+    assert to_genre and to_genre[0]['length'] == 2
+
+
+
+def test_k_hop_beam_and_hub_caps():
+    """Beam width bounds each hop; hubs past hop 1 aren't expanded; rel types filter edges"""
+    print("\n" + "="*70)
+    print("TEST 5: BEAM + HUB CAPS")
+    print("="*70)
+
+    engine = build_catalog()
+    assert len(engine.k_hop([27205], k=1, beam_width=2)) == 2
+
+    via_genres = engine.k_hop([27205], k=2, rel_types=['BELONGS_TO'], degree_caps={})
+    print(f"  Genre expansion, no caps: {[n['name'] for n in via_genres]}")
+    assert {'Interstellar', 'The Dark Knight Rises'} <= {n['name'] for n in via_genres}
+
+    capped = engine.k_hop([27205], k=2, rel_types=['BELONGS_TO'], degree_caps={'Genre': 0})
+    print(f"  Genre expansion, Genre cap 0: {[n['name'] for n in capped]}")
+    assert {n['type'] for n in capped} == {'Genre'}
+
+    # Seeds are always expanded, even when they are hubs
+    from_genre = engine.k_hop(['Science Fiction'], k=1, degree_caps={'Genre': 0})
+    assert {n['name'] for n in from_genre} == {'Inception', 'Interstellar'}
+
+
+
+def test_personalized_pagerank():
+    """Movies strongly tied to the seeds outrank ones reached only through genres"""
+    print("\n" + "="*70)
+    print("TEST 6: PERSONALIZED PAGERANK")
+    print("="*70)
+
+    engine = build_catalog()
+    ranked = engine.personalized_pagerank(['Christopher Nolan', 'Tom Hardy'], top_k=10)
+    for node in ranked:
+        print(f"  {node['name']:<25} {node['score']:.4f} ({node['iterations']} iterations)")
+
+    names = [node['name'] for node in ranked]
+    assert all(node['type'] == 'Movie' for node in ranked)
+    assert set(names[:2]) == {'Inception', 'The Dark Knight Rises'}
+    assert names.index('Interstellar') < names.index('The Great Gatsby')
+    assert ranked[0]['iterations'] < 50
+    assert engine.personalized_pagerank(['Unknown Person']) == []
+
+
+class FlakySession:
+    def __init__(self, graphdb):
+        self.graphdb = graphdb
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query):
+        if self.graphdb.failures:
+            self.graphdb.failures -= 1
+            raise ConnectionError("Neo4j unavailable")
+        if 'elementId(n)' in query:
+            return [{'eid': 'm1', 'label': 'Movie', 'key': 27205, 'name': 'Inception', 'year': 2010},
+                    {'eid': 'p1', 'label': 'Person', 'key': 'Christopher Nolan',
+                     'name': 'Christopher Nolan', 'year': None}]
+        return [{'src': 'p1', 'rel': 'DIRECTED', 'dst': 'm1'}]
+
+
+class FlakyGraphDB:
+    """Neo4jService stand-in whose first `failures` queries raise"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.driver = self
+
+    def session(self):
+        return FlakySession(self)
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+
+def test_provisional_snapshot_retries_neo4j():
+    """A crawled_data fallback is provisional and replaced once Neo4j answers"""
+    print("\n" + "="*70)
+    print("TEST 7: PROVISIONAL SNAPSHOT")
+    print("="*70)
+
+    original = (Config.GRAPH_ENGINE_DATA_DIR, Config.GRAPH_ENGINE_RETRY_SECONDS, graph_engine._shared_engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, '27205.json'), 'w', encoding='utf-8') as f:
+            json.dump({'movie': {'id': 27205, 'title': 'Inception'}}, f)
+        Config.GRAPH_ENGINE_DATA_DIR = tmp
+        Config.GRAPH_ENGINE_RETRY_SECONDS = 0
+        graph_engine._shared_engine = None
+        try:
+            graphdb = FlakyGraphDB(failures=1)
+            # The first build runs in the background; callers fall back to Cypher meanwhile
+            assert get_graph_engine(graphdb) is None
+            _wait_for(lambda: graph_engine._shared_engine is not None)
+            engine = get_graph_engine(graphdb)
+            print(f"  First load: {engine.get_stats()}")
+            assert engine.source == 'crawled_data' and engine.provisional
+
+            _wait_for(lambda: graph_engine._shared_engine.source == 'neo4j')
+            engine = get_graph_engine(graphdb)
+            print(f"  After retry: {engine.get_stats()}")
+            assert engine.source == 'neo4j' and not engine.provisional
+            assert engine.edge_counts['DIRECTED'] == 1
+        finally:
+            Config.GRAPH_ENGINE_DATA_DIR, Config.GRAPH_ENGINE_RETRY_SECONDS, graph_engine._shared_engine = original
+
+
+if __name__ == "__main__":
+    test_k_hop_is_nearest_first()
+    test_relationships_between()
+    test_find_paths()
+    test_paths_skip_hubs_and_keep_direction()
+    test_k_hop_beam_and_hub_caps()
+    test_personalized_pagerank()
+    test_provisional_snapshot_retries_neo4j()
+    print("\n✅ ALL GRAPH ENGINE TESTS PASSED")
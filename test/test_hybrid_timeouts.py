@@ -0,0 +1,72 @@
+"""
+Test Hybrid Branch Timeouts
+Checks that a slow branch of HybridRetriever.retrieve times out, is reported
+in 'timed_out', and that the other branch and its partial results are fused
+(runs offline - no Gemini, Qdrant or Neo4j calls)
+"""
+
+import time
+
+from src.advanced_retriever import AdaptiveRetriever, HybridRetriever
+
+
+def make_retriever(graph_delay: float) -> HybridRetriever:
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.adaptive_retriever = AdaptiveRetriever(None)
+    retriever.graph_strategy = 'k_hop'
+    retriever.vector_timeout = 1.0
+    retriever.graph_timeout = 0.1
+
+    def neural(query, top_k_vector, partial, filters=None):
+        partial['vector_results'] = [{'title': 'Heat', 'overview': 'About Heat', 'movie_id': 1,
+                                      'score': 0.8, 'source': 'vector'}]
+
+    def symbolic(query, retrieval_depth, partial, query_entities=None, rel_types=None):
+        # Linking finishes in time, traversal does not
+        partial['linked_nodes'] = [{'entity': 'Inception',
+                                    'matched_node': {'name': 'Inception', 'id': 2,
+                                                     'type': 'movie', 'score': 1.0}}]
+        time.sleep(graph_delay)
+        partial['graph_results'] = [{'name': 'Interstellar', 'type': 'Movie', 'id': 3,
+                                     'distance': 1, 'score': None}]
+
+    retriever._neural_branch = neural
+    retriever._symbolic_branch = symbolic
+    return retriever
+
+
+def test_slow_graph_branch_is_cut_off():
+    """The graph branch exceeds graph_timeout; vector + linked results are still fused"""
+    print("\n" + "="*70)
+    print("TEST 1: GRAPH TIMEOUT")
+    print("="*70)
+
+    started = time.perf_counter()
+    result = make_retriever(graph_delay=0.5).retrieve("Who directed Inception?")
+    elapsed = time.perf_counter() - started
+    print(f"  Timed out: {result['timed_out']} after {elapsed:.2f}s, ranked: {result['ranked']}")
+
+    assert result['timed_out'] == ['graph']
+    assert elapsed < 0.4
+    assert result['vector_count'] == 1
+    assert result['linked_entities'] == 1
+    assert result['graph_count'] == 0
+    assert {r['id'] for r in result['ranked']} == {1, 2}
+
+
+def test_branches_in_time():
+    """Nothing times out when both branches finish within their budgets"""
+    print("\n" + "="*70)
+    print("TEST 2: NO TIMEOUT")
+    print("="*70)
+
+    result = make_retriever(graph_delay=0.0).retrieve("Who directed Inception?")
+    assert result['timed_out'] == []
+    assert result['graph_count'] == 1
+    assert set(result['branch_timings']) == {'vector', 'graph'}
+
+
+if __name__ == "__main__":
+    test_slow_graph_branch_is_cut_off()
+    test_branches_in_time()
+    print("\n✅ ALL HYBRID TIMEOUT TESTS PASSED")
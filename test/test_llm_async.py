@@ -0,0 +1,171 @@
+"""
+Test Async Gemini API
+Checks retries, quota throttling, the per-loop concurrency cap, the
+off-loop embedding cache and batched embedding de-duplication with a fake
+model (runs offline - no Gemini calls)
+"""
+
+import asyncio
+import os
+import tempfile
+
+import src.llm_service as llm_service
+from src.config import Config
+from src.embedding_cache import EmbeddingCache
+from src.llm_service import GeminiService
+from src.rate_limiter import RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """generate_content_async that fails `errors` first, then answers after `delay`"""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, generation_config=None, safety_settings=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            return FakeResponse(f"  answer {self.calls}  ")
+        finally:
+            self.in_flight -= 1
+
+
+def _service(model, max_concurrency=8):
+    if not Config.GOOGLE_API_KEY:
+        Config.GOOGLE_API_KEY = "test-key"
+    service = GeminiService()
+    service.model = model
+    service.prefix_cache = None
+    service.embedding_cache = None
+    service.max_concurrency = max_concurrency
+    service.rate_limiter = RateLimiter({Config.CHAT_MODEL: {'rpm': 10000, 'tpm': 10_000_000}})
+    # No real sleeping between retries
+    service.rate_limiter.backoff_delay = lambda *args, **kwargs: 0.0
+    return service
+
+
+def test_retry_and_quota():
+    """Errors are retried; a 429 is recorded as a throttle event"""
+    print("\n" + "="*70)
+    print("TEST 1: RETRY + QUOTA")
+    print("="*70)
+
+    model = FakeModel(errors=[ValueError("boom"), Exception("429 Resource exhausted")])
+    service = _service(model)
+    answer = asyncio.run(service.agenerate_answer("ctx", "Who directed Inception?"))
+    print(f"  Answer after {model.calls} calls: {answer!r}")
+    assert answer == "answer 3"
+    # The prompt is built once, not once per attempt
+    assert service.prompt_builder.get_stats()['prompts_built'] == 1
+    metrics = service.rate_limiter.get_metrics()[Config.CHAT_MODEL]
+    assert metrics['throttle_events'] == 1
+
+    # agenerate() raises anything that is not a quota error
+    failing = _service(FakeModel(errors=[ValueError("blocked")]))
+    try:
+        asyncio.run(failing.agenerate("prompt"))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    exhausted = _service(FakeModel(errors=[Exception("429 quota")] * 3))
+    assert asyncio.run(exhausted.agenerate_answer("ctx", "q")).startswith("Sorry")
+
+
+def test_concurrency_cap_per_loop():
+    """At most max_concurrency calls are in flight, in every event loop"""
+    print("\n" + "="*70)
+    print("TEST 2: CONCURRENCY CAP")
+    print("="*70)
+
+    model = FakeModel(delay=0.02)
+    service = _service(model, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(service.agenerate("prompt") for _ in range(6)))
+
+    # A second asyncio.run gets its own semaphore instead of one bound to a closed loop
+    for _ in range(2):
+        responses = asyncio.run(burst())
+        assert len(responses) == 6
+    print(f"  Max in flight: {model.max_in_flight}")
+    assert model.max_in_flight == 2
+
+
+def test_embedding_cache_off_loop():
+    """aget_embedding serves and fills the SQLite cache"""
+    print("\n" + "="*70)
+    print("TEST 3: ASYNC EMBEDDING CACHE")
+    print("="*70)
+
+    calls = []
+
+    async def fake_embed(model, content, task_type):
+        calls.append(content)
+        return {'embedding': [0.5, 0.25]}
+
+    original = llm_service.genai.embed_content_async
+    llm_service.genai.embed_content_async = fake_embed
+    with tempfile.TemporaryDirectory() as tmp:
+        service = _service(FakeModel())
+        service.embedding_cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite"))
+        try:
+            assert asyncio.run(service.aget_embedding("Inception")) == [0.5, 0.25]
+            assert asyncio.run(service.aget_embedding("Inception")) == [0.5, 0.25]
+            assert calls == ["Inception"]
+        finally:
+            llm_service.genai.embed_content_async = original
+            service.embedding_cache.close()
+
+
+def test_batch_embeddings_send_original_text():
+    """Whitespace variants share one request, which carries the original text"""
+    print("\n" + "="*70)
+    print("TEST 4: BATCH EMBEDDING DEDUP")
+    print("="*70)
+
+    calls = []
+
+    def fake_embed(model, content, task_type):
+        calls.append(list(content))
+        return {'embedding': [[float(len(text))] for text in content]}
+
+    original = llm_service.genai.embed_content
+    llm_service.genai.embed_content = fake_embed
+    with tempfile.TemporaryDirectory() as tmp:
+        service = _service(FakeModel())
+        service.embedding_cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite"))
+        try:
+            texts = ["Inception\n\n  A thief  steals secrets", "Inception A thief steals secrets", "Heat"]
+            embeddings = service.get_embeddings(texts)
+            print(f"  Sent: {calls}")
+            assert calls == [[texts[0], "Heat"]]
+            original_length = float(len(texts[0]))
+            assert embeddings == [[original_length], [original_length], [4.0]]
+            assert service.get_embeddings(texts[1:]) == [[original_length], [4.0]]
+            assert len(calls) == 1
+        finally:
+            llm_service.genai.embed_content = original
+            service.embedding_cache.close()
+
+
+if __name__ == "__main__":
+    test_retry_and_quota()
+    test_concurrency_cap_per_loop()
+    test_embedding_cache_off_loop()
+    test_batch_embeddings_send_original_text()
+    print("\n✅ ALL ASYNC GEMINI TESTS PASSED")
@@ -0,0 +1,60 @@
+"""
+Test Prompt Builder
+Checks the shared static prefix and token-budget trimming
+(runs offline - no Gemini calls)
+"""
+
+from src.prompt_builder import PromptBuilder
+
+
+def test_static_prefix_is_shared():
+    """The static prefix is built once per mode and always leads the prompt"""
+    print("\n" + "="*70)
+    print("TEST 1: STATIC PREFIX")
+    print("="*70)
+
+    builder = PromptBuilder(token_budget=6000, history_budget=600)
+    first = builder.build_answer_prompt("Title: Parasite. Year: 2019.", "When was Parasite released?")
+    second = builder.build_answer_prompt("Title: Titanic. Year: 1997.", "Who directed Titanic?")
+
+    assert first['static_prefix'] is second['static_prefix']
+    assert first['prompt'].startswith(first['static_prefix'])
+    assert "Title: Parasite" in first['dynamic'] and "Title: Parasite" not in first['static_prefix']
+
+    no_context = builder.build_answer_prompt("", "Good romantic movies?", context_provided=False)
+    print(f"  Modes: {first['mode']}, {no_context['mode']}")
+    assert no_context['mode'] == 'no_context'
+    assert "NO CONTEXT MODE" in no_context['static_prefix']
+
+
+def test_budget_trims_history_and_context():
+    """Oldest history and trailing context blocks are dropped to fit the budget"""
+    print("\n" + "="*70)
+    print("TEST 2: TOKEN BUDGET")
+    print("="*70)
+
+    builder = PromptBuilder(token_budget=1500, history_budget=40)
+    context = "\n\n".join(f"Title: Movie {i}. " + "plot " * 80 for i in range(20))
+    history = [
+        {'role': 'user', 'content': 'first question ' * 8},
+        {'role': 'assistant', 'content': 'first answer ' * 8},
+        {'role': 'user', 'content': 'latest question'},
+    ]
+
+    built = builder.build_answer_prompt(context, "Which one is best?", chat_history=history)
+    print(f"  Sections: {built['sections']}")
+
+    assert built['sections']['total'] <= 1500
+    assert "Title: Movie 0." in built['dynamic']
+    assert "Title: Movie 19." not in built['dynamic']
+    assert "latest question" in built['dynamic']
+    assert "first question" not in built['dynamic']
+
+    stats = builder.get_stats()
+    assert stats['context_blocks_dropped'] > 0 and stats['history_messages_dropped'] > 0
+
+
+if __name__ == "__main__":
+    test_static_prefix_is_shared()
+    test_budget_trims_history_and_context()
+    print("\n✅ ALL PROMPT BUILDER TESTS PASSED")
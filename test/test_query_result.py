@@ -0,0 +1,58 @@
+"""
+Test Query Result
+Checks that QueryTrace freezes into an immutable, request-scoped QueryResult
+(runs offline - no Gemini calls)
+"""
+
+import dataclasses
+
+from src.query_result import QueryTrace
+
+
+def test_trace_freezes_into_result():
+    """Hits are deduplicated in rank order and timings include the total"""
+    print("\n" + "="*70)
+    print("TEST 1: TRACE -> RESULT")
+    print("="*70)
+
+    trace = QueryTrace("Who directed Inception?")
+    trace.method = 'basic_retrieval'
+    with trace.stage('retrieval'):
+        trace.add_hit(27205, 0.91, 'Inception')
+        trace.add_hit(155, 0.72, 'The Dark Knight')
+        trace.add_hit(27205, 0.50, 'Inception')
+    trace.contexts = ['**Inception** (2010)']
+
+    result = trace.finish("Christopher Nolan directed Inception.")
+    print(f"  Result: {result.to_dict()}")
+
+    assert str(result) == "Christopher Nolan directed Inception."
+    assert result.ranked_ids == (27205, 155)
+    assert result.scores == (0.91, 0.72)
+    assert result.movies[0] == {'id': 27205, 'title': 'Inception', 'score': 0.91}
+    assert 'retrieval' in result.timings and result.timings['total'] >= result.timings['retrieval']
+
+
+def test_result_is_immutable():
+    """Neither fields nor timing/cache mappings can be modified"""
+    print("\n" + "="*70)
+    print("TEST 2: IMMUTABILITY")
+    print("="*70)
+
+    result = QueryTrace("q").finish("a")
+    try:
+        result.answer = "changed"
+        assert False, "QueryResult must be frozen"
+    except dataclasses.FrozenInstanceError:
+        pass
+    try:
+        result.timings['total'] = 0
+        assert False, "timings must be read-only"
+    except TypeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_trace_freezes_into_result()
+    test_result_is_immutable()
+    print("\n✅ ALL QUERY RESULT TESTS PASSED")
@@ -0,0 +1,110 @@
+"""
+Test Streaming Answers
+Checks query_stream()'s event order, the grounding notice and the SSE endpoint
+with a fake LLM that yields chunks (runs offline - no Gemini, Qdrant or Neo4j calls)
+"""
+
+import json
+import threading
+
+import pytest
+
+from src.rag_pipeline import GraphRAG
+
+
+CONTEXT = "**Inception** (2010)\nDirector: Christopher Nolan\n"
+
+ANSWER_CHUNKS = [
+    "Inception (2010) was directed by Christopher Nolan, ",
+    "a heist thriller about thieves who steal secrets from dreams, ",
+    "starring Leonardo DiCaprio as the extractor Dom Cobb.",
+]
+
+
+class FakeLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_answer_stream(self, context, question, context_provided=True, chat_history=None):
+        yield from self.chunks
+
+
+def make_rag(chunks=ANSWER_CHUNKS) -> GraphRAG:
+    rag = GraphRAG.__new__(GraphRAG)
+    rag.llm = FakeLLM(chunks)
+    rag.answer_cache = None
+    rag.augment_mode = False
+    rag.fallback_llm = None
+    rag._local = threading.local()
+
+    def retrieve(user_question, trace):
+        trace.method = 'basic_retrieval'
+        trace.add_hit(27205, 0.91, 'Inception')
+        trace.contexts = [CONTEXT]
+        return {'graph_context': CONTEXT, 'found_ids': [27205], 'context_is_relevant': True}
+
+    rag._retrieve_context = retrieve
+    return rag
+
+
+def test_event_order():
+    """retrieval, then tokens as they arrive, then done with the full answer"""
+    print("\n" + "="*70)
+    print("TEST 1: EVENT ORDER")
+    print("="*70)
+
+    events = list(make_rag().query_stream("Who directed Inception?"))
+    types = [event['type'] for event in events]
+    print(f"  Events: {types}")
+
+    assert types == ['retrieval', 'token', 'token', 'token', 'done']
+    assert events[0]['movies'] == [{'id': 27205, 'title': 'Inception'}]
+    result = events[-1]['result']
+    assert result.answer == "".join(ANSWER_CHUNKS)
+    assert result.ranked_ids == (27205,)
+    assert 'first_token' in result.timings
+
+
+def test_grounding_notice():
+    """An ungrounded answer gets exactly the validator's warning as a notice"""
+    print("\n" + "="*70)
+    print("TEST 2: GROUNDING NOTICE")
+    print("="*70)
+
+    chunks = ANSWER_CHUNKS + [" It won an Oscar and thắng giải for its visual effects."]
+    rag = make_rag(chunks)
+    events = list(rag.query_stream("Who directed Inception?"))
+    notices = [event['content'] for event in events if event['type'] == 'notice']
+    print(f"  Notices: {notices}")
+
+    warning = rag._grounding_warning("".join(chunks), CONTEXT)
+    assert notices == [warning]
+    # The final result matches what query() would return
+    assert events[-1]['result'].answer == rag._validate_answer_grounding("".join(chunks).strip(), CONTEXT, "")
+
+
+def test_sse_endpoint():
+    """/api/chat/stream frames each event as an SSE data line"""
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import main_api
+
+    original = main_api.rag
+    main_api.rag = make_rag()
+    try:
+        response = TestClient(main_api.app).get("/api/chat/stream", params={'message': "Who directed Inception?"})
+    finally:
+        main_api.rag = original
+
+    payloads = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    print(f"  Payloads: {len(payloads)}")
+    assert payloads[0]['movies'] == [{'id': 27205, 'title': 'Inception'}]
+    assert "".join(p.get('content', '') for p in payloads) == "".join(ANSWER_CHUNKS)
+    assert payloads[-1]['done'] and payloads[-1]['method'] == 'basic_retrieval'
+
+
+if __name__ == "__main__":
+    test_event_order()
+    test_grounding_notice()
+    test_sse_endpoint()
+    print("\n✅ ALL STREAMING TESTS PASSED")
@@ -0,0 +1,82 @@
+"""
+Test Rate Limiter
+Checks token buckets, retry-after parsing and shared throttling
+(runs offline - no Gemini calls)
+"""
+
+import time
+
+from src.rate_limiter import RateLimiter, parse_retry_after, is_quota_error
+
+
+def test_request_bucket_blocks_when_empty():
+    """Once the RPM bucket is drained, reserve() reports a wait"""
+    print("\n" + "="*70)
+    print("TEST 1: RPM BUCKET")
+    print("="*70)
+
+    limiter = RateLimiter({'chat': {'rpm': 2, 'tpm': 1000}})
+    assert limiter.reserve('chat') == 0
+    assert limiter.reserve('chat') == 0
+    wait = limiter.reserve('chat')
+    print(f"  Third request must wait {wait:.1f}s")
+    assert 0 < wait <= 30
+
+
+def test_token_bucket_limits_large_prompts():
+    """TPM bucket gates requests by estimated prompt size"""
+    print("\n" + "="*70)
+    print("TEST 2: TPM BUCKET")
+    print("="*70)
+
+    limiter = RateLimiter({'chat': {'rpm': 100, 'tpm': 600}})
+    assert limiter.reserve('chat', tokens=500) == 0
+    wait = limiter.reserve('chat', tokens=500)
+    print(f"  Second 500-token request must wait {wait:.1f}s")
+    assert wait > 0
+
+
+def test_throttle_pauses_model_for_everyone():
+    """A 429 pauses the model for all callers and honors retry-after"""
+    print("\n" + "="*70)
+    print("TEST 3: SHARED THROTTLE")
+    print("="*70)
+
+    limiter = RateLimiter({'embed': {'rpm': 1000, 'tpm': 100000}})
+    error = Exception("429 Resource has been exhausted. retry_delay { seconds: 7 }")
+    assert is_quota_error(error)
+    assert parse_retry_after(error) == 7
+
+    delay = limiter.on_throttle('embed', attempt=0, error=error)
+    print(f"  Backoff delay: {delay:.1f}s")
+    assert delay >= 7
+    assert limiter.reserve('embed') > 0
+
+    metrics = limiter.get_metrics()['embed']
+    print(f"  Metrics: {metrics}")
+    assert metrics['throttle_events'] == 1
+
+
+def test_acquire_records_queue_wait():
+    """acquire() sleeps until a slot frees up and records the wait"""
+    print("\n" + "="*70)
+    print("TEST 4: QUEUE WAIT METRICS")
+    print("="*70)
+
+    limiter = RateLimiter({'fast': {'rpm': 600, 'tpm': 100000}})  # 10 req/s
+    limiter._get_model('fast').requests.tokens = 0
+
+    start = time.monotonic()
+    limiter.acquire('fast')
+    elapsed = time.monotonic() - start
+    metrics = limiter.get_metrics()['fast']
+    print(f"  Waited {elapsed:.2f}s, metrics: {metrics}")
+    assert metrics['waits'] == 1 and metrics['total_wait_s'] > 0
+
+
+if __name__ == "__main__":
+    test_request_bucket_blocks_when_empty()
+    test_token_bucket_limits_large_prompts()
+    test_throttle_pauses_model_for_everyone()
+    test_acquire_records_queue_wait()
+    print("\n✅ ALL RATE LIMITER TESTS PASSED")
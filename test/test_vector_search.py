@@ -0,0 +1,170 @@
+"""
+Test Vector Search Options
+Checks that QdrantService.search pushes score thresholds, payload projection
+and vector exclusion to Qdrant, batched search_many and structured
+year/genre filters from the query processor
+(runs offline - no Gemini calls)
+"""
+
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+from src.gazetteer import Gazetteer
+from src.query_processor import QueryProcessor
+from src.vector_db import QdrantService
+
+
+class FakeQdrantClient:
+    """Records query_points calls and answers with canned points"""
+
+    def __init__(self, points):
+        self.points = points
+        self.calls = []
+
+    def query_points(self, collection_name, query, **options):
+        self.calls.append(options)
+        threshold = options.get('score_threshold')
+        points = [p for p in self.points if threshold is None or p.score >= threshold]
+        return SimpleNamespace(points=points[:options['limit']])
+
+    def query_batch_points(self, collection_name, requests):
+        self.calls.append({'batch': len(requests)})
+        responses = []
+        for request in requests:
+            threshold = request.score_threshold
+            # Stand-in ranking: the first vector component reorders the canned points
+            points = [p for p in self.points if threshold is None or p.score >= threshold]
+            if request.query[0] < 0:
+                points = points[::-1]
+            responses.append(SimpleNamespace(points=points[:request.limit]))
+        return responses
+
+
+def make_service(points) -> QdrantService:
+    service = QdrantService.__new__(QdrantService)
+    service.client = FakeQdrantClient(points)
+    service.collection_name = 'movies'
+    return service
+
+
+POINTS = [
+    SimpleNamespace(id=27205, score=0.82, payload={'movie_id': 27205, 'title': 'Inception'}),
+    SimpleNamespace(id=157336, score=0.61, payload={'movie_id': 157336, 'title': 'Interstellar'}),
+    SimpleNamespace(id=99, score=0.40, payload={}),
+]
+
+
+def test_search_options():
+    """Threshold, projection and with_vectors reach the client"""
+    print("\n" + "="*70)
+    print("TEST 1: SEARCH OPTIONS")
+    print("="*70)
+
+    service = make_service(POINTS)
+    hits = service.search([0.1, 0.2], top_k=8, score_threshold=0.5, payload_fields=['movie_id', 'title'])
+    print(f"  Call: {service.client.calls[-1]}")
+    assert [h.id for h in hits] == [27205, 157336]
+    assert service.client.calls[-1] == {'query_filter': None, 'limit': 8, 'score_threshold': 0.5,
+                                        'with_payload': ['movie_id', 'title'], 'with_vectors': False}
+
+    service.search([0.1, 0.2])
+    assert service.client.calls[-1]['with_payload'] is True
+    assert service.client.calls[-1]['score_threshold'] is None
+    service.search([0.1, 0.2], payload_fields=None, with_vectors=True)
+    assert service.client.calls[-1]['with_payload'] is False
+    assert service.client.calls[-1]['with_vectors'] is True
+
+
+def test_search_many():
+    """One batched request; results stay aligned with the inputs"""
+    print("\n" + "="*70)
+    print("TEST 2: BATCHED SEARCH")
+    print("="*70)
+
+    service = make_service(POINTS)
+    results = service.search_many([[0.1, 0.2], None, [-0.1, 0.2]], top_k=2, score_threshold=0.5)
+    print(f"  Calls: {service.client.calls}")
+    assert service.client.calls == [{'batch': 2}]
+    assert [[h.id for h in hits] for hits in results] == [[27205, 157336], [], [157336, 27205]]
+    assert service.search_many([]) == []
+    assert service.search_many([None]) == [[]]
+    assert len(service.client.calls) == 1
+
+
+def test_structured_filters():
+    """Year ranges and genres become Qdrant range/any conditions"""
+    print("\n" + "="*70)
+    print("TEST 3: STRUCTURED FILTERS")
+    print("="*70)
+
+    service = make_service(POINTS)
+    service.search([0.1, 0.2], filters={'year': {'gte': 2010}, 'genres': ['Action', 'Thriller']})
+    query_filter = service.client.calls[-1]['query_filter']
+    print(f"  Filter: {query_filter}")
+    year, genres = query_filter.must
+    assert year.key == 'year' and year.range.gte == 2010 and year.range.lte is None
+    assert genres.key == 'genres' and genres.match.any == ['Action', 'Thriller']
+
+    assert QdrantService.build_filter({}) is None
+    assert QdrantService.build_filter({'year': {}}) is None
+    assert QdrantService.build_filter({'year': 1999}).must[0].range.lte == 1999
+    assert QdrantService.build_filter({'min_rating': 7}).must[0].range.gte == 7.0
+    assert QdrantService.payload_year("2010-07-15") == 2010
+    assert QdrantService.payload_year("Unknown") is None
+
+
+def test_year_ranges_from_queries():
+    """The query processor turns year phrases and catalog genres into filters"""
+    print("\n" + "="*70)
+    print("TEST 4: QUERY FILTERS")
+    print("="*70)
+
+    processor = QueryProcessor.__new__(QueryProcessor)
+    processor.gazetteer = None
+    cases = {
+        "phim siêu anh hùng ra mắt từ 2010 đến nay": {'gte': 2010},
+        "thrillers from 2010 to 2015": {'gte': 2010, 'lte': 2015},
+        "phim sau năm 2010": {'gte': 2011},
+        "war movies before 2000": {'lte': 1999},
+        "best 90s action movies": {'gte': 1990, 'lte': 1999},
+        "phim kinh dị thập niên 80": {'gte': 1980, 'lte': 1989},
+        "Tìm phim giống Inception năm 2010": {'gte': 2010, 'lte': 2010},
+        "phim của Christopher Nolan": None,
+        "sci-fi movies released in 1999": {'gte': 1999, 'lte': 1999},
+        # A bare year is not a hard filter
+        "thrillers like 2012": None,
+    }
+    for query, expected in cases.items():
+        year_range = processor._extract_year_range(query)
+        print(f"  {query:<45} {year_range}")
+        assert year_range == expected
+
+    # Years that are part of a catalog title are not release years
+    with tempfile.TemporaryDirectory() as tmp:
+        for movie_id, title in ((335984, 'Blade Runner 2049'), (530915, '1917'), (27205, 'Inception')):
+            with open(os.path.join(tmp, f'{movie_id}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'movie': {'id': movie_id, 'title': title}}, f)
+        processor.gazetteer = Gazetteer(data_dir=tmp).build()
+        assert processor._extract_year_range("phim giống Blade Runner 2049") is None
+        assert processor._extract_year_range("movies like 1917 in 2019") == {'gte': 2019, 'lte': 2019}
+        assert processor._extract_year_range("who directed Inception (2010)?") is None
+        assert processor._extract_year_range("phim như Blade Runner 2049 từ 2015") == {'gte': 2015}
+    processor.gazetteer = None
+
+    entities = [
+        {'text': 'hành động', 'type': 'GENRE', 'id': 'Action', 'source': 'gazetteer'},
+        {'text': 'thể loại', 'type': 'GENRE', 'source': 'keyword'},
+        {'text': '2010', 'type': 'YEAR', 'source': 'pattern'},
+    ]
+    structured = processor._structure_query("phim hành động từ 2010", entities, [])
+    assert structured['filters'] == {'year': '2010', 'year_range': {'gte': 2010}, 'genres': ['Action']}
+
+
+if __name__ == "__main__":
+    test_search_options()
+    test_search_many()
+    test_structured_filters()
+    test_year_ranges_from_queries()
+    print("\n✅ ALL VECTOR SEARCH TESTS PASSED")